@@ -0,0 +1,30 @@
+"""add http cache validators to feeds
+
+Revision ID: 9d0e1f2a3b4c
+Revises: 3c4d5e6f7a8b
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d0e1f2a3b4c'
+down_revision: Union[str, Sequence[str], None] = '3c4d5e6f7a8b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add etag and last_modified columns to feeds table."""
+    op.add_column('feeds', sa.Column('etag', sa.String(), nullable=True))
+    op.add_column('feeds', sa.Column('last_modified', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove etag and last_modified columns from feeds table."""
+    op.drop_column('feeds', 'last_modified')
+    op.drop_column('feeds', 'etag')
@@ -0,0 +1,32 @@
+"""add adaptive polling fields to feeds
+
+Revision ID: a1b2c3d4e5f6
+Revises: 9d0e1f2a3b4c
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1b2c3d4e5f6'
+down_revision: Union[str, Sequence[str], None] = '9d0e1f2a3b4c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add poll_interval and empty_fetch_count to feeds, index feed_items by feed and publish time."""
+    op.add_column('feeds', sa.Column('poll_interval', sa.Integer(), nullable=True))
+    op.add_column('feeds', sa.Column('empty_fetch_count', sa.Integer(), nullable=False, server_default='0'))
+    op.create_index('ix_feed_items_feed_id_published_at', 'feed_items', ['feed_id', 'published_at'])
+
+
+def downgrade() -> None:
+    """Remove adaptive polling fields and the feed_items index."""
+    op.drop_index('ix_feed_items_feed_id_published_at', table_name='feed_items')
+    op.drop_column('feeds', 'empty_fetch_count')
+    op.drop_column('feeds', 'poll_interval')
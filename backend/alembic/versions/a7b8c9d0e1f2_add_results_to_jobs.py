@@ -0,0 +1,28 @@
+"""add results to jobs
+
+Revision ID: a7b8c9d0e1f2
+Revises: f6a7b8c9d0e1
+Create Date: 2026-10-16 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7b8c9d0e1f2'
+down_revision: Union[str, Sequence[str], None] = 'f6a7b8c9d0e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add per-feed results to jobs."""
+    op.add_column('jobs', sa.Column('results', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove per-feed results from jobs."""
+    op.drop_column('jobs', 'results')
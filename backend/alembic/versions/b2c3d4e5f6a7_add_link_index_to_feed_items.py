@@ -0,0 +1,28 @@
+"""add link index to feed items
+
+Revision ID: b2c3d4e5f6a7
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2c3d4e5f6a7'
+down_revision: Union[str, Sequence[str], None] = 'a1b2c3d4e5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index feed_items.link so link-based dedup no longer scans the table."""
+    op.create_index('ix_feed_items_link', 'feed_items', ['link'])
+
+
+def downgrade() -> None:
+    """Drop the feed_items.link index."""
+    op.drop_index('ix_feed_items_link', table_name='feed_items')
@@ -0,0 +1,36 @@
+"""add websub fields to feeds
+
+Revision ID: b8c9d0e1f2a3
+Revises: a7b8c9d0e1f2
+Create Date: 2026-10-16 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8c9d0e1f2a3'
+down_revision: Union[str, Sequence[str], None] = 'a7b8c9d0e1f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add WebSub subscription state to feeds."""
+    op.add_column('feeds', sa.Column('websub_hub', sa.String(), nullable=True))
+    op.add_column('feeds', sa.Column('websub_topic', sa.String(), nullable=True))
+    op.add_column('feeds', sa.Column('websub_secret', sa.String(), nullable=True))
+    op.add_column('feeds', sa.Column('websub_status', sa.String(), nullable=True))
+    op.add_column('feeds', sa.Column('websub_expires_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove WebSub subscription state from feeds."""
+    op.drop_column('feeds', 'websub_expires_at')
+    op.drop_column('feeds', 'websub_status')
+    op.drop_column('feeds', 'websub_secret')
+    op.drop_column('feeds', 'websub_topic')
+    op.drop_column('feeds', 'websub_hub')
@@ -0,0 +1,30 @@
+"""add fetch backoff fields to feeds
+
+Revision ID: c3d4e5f6a7b8
+Revises: b2c3d4e5f6a7
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d4e5f6a7b8'
+down_revision: Union[str, Sequence[str], None] = 'b2c3d4e5f6a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add consecutive_failures and retry_at to feeds."""
+    op.add_column('feeds', sa.Column('consecutive_failures', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('feeds', sa.Column('retry_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove fetch backoff fields from feeds."""
+    op.drop_column('feeds', 'retry_at')
+    op.drop_column('feeds', 'consecutive_failures')
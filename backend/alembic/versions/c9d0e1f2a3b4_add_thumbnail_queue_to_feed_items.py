@@ -0,0 +1,41 @@
+"""add thumbnail queue state to feed_items
+
+Revision ID: c9d0e1f2a3b4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-10-16 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d0e1f2a3b4'
+down_revision: Union[str, Sequence[str], None] = 'b8c9d0e1f2a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add thumbnail queue state to feed_items and enqueue items still missing a thumbnail."""
+    op.add_column('feed_items', sa.Column('thumbnail_status', sa.String(), nullable=True))
+    op.add_column('feed_items', sa.Column('thumbnail_attempts', sa.Integer(), nullable=True, server_default='0'))
+    op.add_column('feed_items', sa.Column('thumbnail_retry_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE feed_items SET thumbnail_status = 'done' WHERE thumbnail_image IS NOT NULL")
+    op.execute(
+        "UPDATE feed_items SET thumbnail_status = 'pending' "
+        "WHERE thumbnail_image IS NULL AND cover_image IS NOT NULL"
+    )
+    op.create_index(
+        'ix_feed_items_thumbnail_status_published_at', 'feed_items', ['thumbnail_status', 'published_at']
+    )
+
+
+def downgrade() -> None:
+    """Remove thumbnail queue state from feed_items."""
+    op.drop_index('ix_feed_items_thumbnail_status_published_at', table_name='feed_items')
+    op.drop_column('feed_items', 'thumbnail_retry_at')
+    op.drop_column('feed_items', 'thumbnail_attempts')
+    op.drop_column('feed_items', 'thumbnail_status')
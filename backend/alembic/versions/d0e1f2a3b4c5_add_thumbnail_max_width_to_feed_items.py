@@ -0,0 +1,28 @@
+"""add thumbnail_max_width to feed_items
+
+Revision ID: d0e1f2a3b4c5
+Revises: c9d0e1f2a3b4
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd0e1f2a3b4c5'
+down_revision: Union[str, Sequence[str], None] = 'c9d0e1f2a3b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Record the largest width /thumb can serve for each item."""
+    op.add_column('feed_items', sa.Column('thumbnail_max_width', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove thumbnail_max_width from feed_items."""
+    op.drop_column('feed_items', 'thumbnail_max_width')
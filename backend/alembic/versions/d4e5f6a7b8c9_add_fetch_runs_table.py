@@ -0,0 +1,48 @@
+"""add fetch_runs table
+
+Revision ID: d4e5f6a7b8c9
+Revises: c3d4e5f6a7b8
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e5f6a7b8c9'
+down_revision: Union[str, Sequence[str], None] = 'c3d4e5f6a7b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create fetch_runs to keep per-fetch history."""
+    op.create_table(
+        'fetch_runs',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('feed_id', sa.String(), sa.ForeignKey('feeds.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=False),
+        sa.Column('duration_ms', sa.Integer(), nullable=False),
+        sa.Column('fetch_ms', sa.Integer(), nullable=True),
+        sa.Column('parse_ms', sa.Integer(), nullable=True),
+        sa.Column('http_status', sa.Integer(), nullable=True),
+        sa.Column('bytes', sa.Integer(), nullable=True),
+        sa.Column('not_modified', sa.Boolean(), nullable=True),
+        sa.Column('entries_seen', sa.Integer(), nullable=True),
+        sa.Column('new_items', sa.Integer(), nullable=True),
+        sa.Column('images_processed', sa.Integer(), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+    )
+    op.create_index('ix_fetch_runs_feed_id_started_at', 'fetch_runs', ['feed_id', 'started_at'])
+    op.create_index('ix_fetch_runs_started_at', 'fetch_runs', ['started_at'])
+
+
+def downgrade() -> None:
+    """Drop fetch_runs."""
+    op.drop_index('ix_fetch_runs_started_at', table_name='fetch_runs')
+    op.drop_index('ix_fetch_runs_feed_id_started_at', table_name='fetch_runs')
+    op.drop_table('fetch_runs')
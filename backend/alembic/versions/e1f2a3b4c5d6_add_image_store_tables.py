@@ -0,0 +1,44 @@
+"""add image_contents and image_sources tables
+
+Revision ID: e1f2a3b4c5d6
+Revises: d0e1f2a3b4c5
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f2a3b4c5d6'
+down_revision: Union[str, Sequence[str], None] = 'd0e1f2a3b4c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the content-addressed thumbnail store and its URL mapping."""
+    op.create_table(
+        'image_contents',
+        sa.Column('hash', sa.String(), primary_key=True),
+        sa.Column('phash', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_image_contents_phash', 'image_contents', ['phash'])
+    op.create_table(
+        'image_sources',
+        sa.Column('url', sa.String(), primary_key=True),
+        sa.Column('content_hash', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_image_sources_content_hash', 'image_sources', ['content_hash'])
+
+
+def downgrade() -> None:
+    """Drop image_sources and image_contents."""
+    op.drop_index('ix_image_sources_content_hash', table_name='image_sources')
+    op.drop_table('image_sources')
+    op.drop_index('ix_image_contents_phash', table_name='image_contents')
+    op.drop_table('image_contents')
@@ -0,0 +1,28 @@
+"""add fetch_claimed_until to feeds
+
+Revision ID: f2a3b4c5d6e7
+Revises: e1f2a3b4c5d6
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a3b4c5d6e7'
+down_revision: Union[str, Sequence[str], None] = 'e1f2a3b4c5d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add the cross-process fetch claim to feeds."""
+    op.add_column('feeds', sa.Column('fetch_claimed_until', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove fetch_claimed_until from feeds."""
+    op.drop_column('feeds', 'fetch_claimed_until')
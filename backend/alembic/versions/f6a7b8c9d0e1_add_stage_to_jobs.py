@@ -0,0 +1,30 @@
+"""add stage and images_processed to jobs
+
+Revision ID: f6a7b8c9d0e1
+Revises: e5f6a7b8c9d0
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a7b8c9d0e1'
+down_revision: Union[str, Sequence[str], None] = 'e5f6a7b8c9d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add stage and images_processed to jobs."""
+    op.add_column('jobs', sa.Column('stage', sa.String(), nullable=True))
+    op.add_column('jobs', sa.Column('images_processed', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove feed creation progress fields from jobs."""
+    op.drop_column('jobs', 'images_processed')
+    op.drop_column('jobs', 'stage')
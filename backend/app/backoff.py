@@ -0,0 +1,66 @@
+"""
+抓取失败退避与熔断
+
+每个 Feed 记录连续失败次数 consecutive_failures 和下次允许抓取的时间 retry_at：
+
+- 失败后不在抓取线程内 sleep 重试，而是把下次抓取推迟到 retry_at，
+  退避时间按 FETCH_BACKOFF_BASE_SECONDS × 2^(n-1) 增长，上限 FETCH_BACKOFF_MAX_MINUTES
+- 连续失败达到 CIRCUIT_BREAKER_THRESHOLD 次后熔断：retry_at 推迟 CIRCUIT_BREAKER_OPEN_MINUTES，
+  到期后只做一次探测抓取（半开），成功则恢复，失败则继续熔断
+- 抓取成功时清零
+
+调度器优先使用 retry_at 作为下次抓取时间；手动抓取不受限制。
+"""
+import os
+import random
+from datetime import datetime, timedelta
+
+from app.database import Feed
+
+# 第一次失败后的重试等待（秒），之后每次翻倍
+FETCH_BACKOFF_BASE_SECONDS = int(os.getenv("FETCH_BACKOFF_BASE_SECONDS", "60"))
+# 退避等待上限（分钟）
+FETCH_BACKOFF_MAX_MINUTES = int(os.getenv("FETCH_BACKOFF_MAX_MINUTES", "120"))
+# 连续失败多少次后熔断，0 表示不熔断
+CIRCUIT_BREAKER_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", "5"))
+# 熔断后多久进行一次探测抓取（分钟）
+CIRCUIT_BREAKER_OPEN_MINUTES = int(os.getenv("CIRCUIT_BREAKER_OPEN_MINUTES", "360"))
+
+# 退避时间随机抖动比例，避免同一主机上的多个 Feed 同时重试
+_BACKOFF_JITTER = 0.1
+
+
+def is_circuit_open(failures: int) -> bool:
+    """连续失败次数是否已达到熔断阈值"""
+    return CIRCUIT_BREAKER_THRESHOLD > 0 and failures >= CIRCUIT_BREAKER_THRESHOLD
+
+
+def compute_retry_delay(failures: int) -> timedelta:
+    """根据连续失败次数计算下次抓取前的等待时间"""
+    if is_circuit_open(failures):
+        seconds = CIRCUIT_BREAKER_OPEN_MINUTES * 60
+    else:
+        seconds = min(FETCH_BACKOFF_BASE_SECONDS * 2 ** max(failures - 1, 0), FETCH_BACKOFF_MAX_MINUTES * 60)
+    return timedelta(seconds=seconds * (1 + random.uniform(-_BACKOFF_JITTER, _BACKOFF_JITTER)))
+
+
+def record_fetch_failure(feed: Feed, error: str, now: datetime | None = None):
+    """记录一次抓取失败并计算 retry_at（不提交事务）"""
+    now = now or datetime.utcnow()
+    feed.consecutive_failures = (feed.consecutive_failures or 0) + 1
+    feed.last_fetch_error = error[:500]  # 限制错误信息长度
+    feed.last_fetched_at = now
+    feed.retry_at = now + compute_retry_delay(feed.consecutive_failures)
+
+    if feed.consecutive_failures == CIRCUIT_BREAKER_THRESHOLD:
+        print(f"Circuit opened for feed {feed.title} after {feed.consecutive_failures} failures, "
+              f"next probe at {feed.retry_at:%Y-%m-%d %H:%M:%S}")
+
+
+def record_fetch_success(feed: Feed):
+    """抓取成功，清除失败计数和退避（不提交事务）"""
+    if is_circuit_open(feed.consecutive_failures or 0):
+        print(f"Circuit closed for feed {feed.title}")
+    feed.consecutive_failures = 0
+    feed.retry_at = None
+    feed.last_fetch_error = None
@@ -1,15 +1,31 @@
-from sqlalchemy import create_engine, Column, String, Integer, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import create_engine, inspect, Column, String, Integer, Boolean, DateTime, Text, ForeignKey, Index, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from contextlib import contextmanager
 from datetime import datetime
 import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/rss_wall.db")
+# prepare_database 的进程间锁
+MIGRATION_LOCK_FILE = os.path.join(os.getenv("DATA_DIR", "./data"), "migrate.lock")
+
+# 新建 Feed 的默认抓取间隔（分钟）
+DEFAULT_UPDATE_INTERVAL = int(os.getenv("FETCH_INTERVAL_MINUTES", "30"))
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# 进程内共享的写库锁：网络和解析可以并行，写库必须串行，避免 SQLite 写锁竞争
+db_write_lock = threading.Lock()
+
 
 class Feed(Base):
     __tablename__ = "feeds"
@@ -21,9 +37,21 @@ class Feed(Base):
     description = Column(Text)
     favicon = Column(String)
     category = Column(String)
-    update_interval = Column(Integer, default=30)
+    update_interval = Column(Integer, default=DEFAULT_UPDATE_INTERVAL)  # 抓取间隔（分钟）
+    poll_interval = Column(Integer)  # 自适应计算出的实际抓取间隔（分钟），为 None 时使用 update_interval
+    empty_fetch_count = Column(Integer, default=0)  # 连续没有新条目的抓取次数
     last_fetched_at = Column(DateTime)
     last_fetch_error = Column(String)  # 上次抓取失败的错误信息，成功时为 None
+    consecutive_failures = Column(Integer, default=0)  # 连续抓取失败次数，见 app.backoff
+    retry_at = Column(DateTime)  # 失败退避 / 熔断期间的下次抓取时间，成功时为 None
+    fetch_claimed_until = Column(DateTime)  # 正在抓取该 Feed 的进程持有的租约，见 app.fetcher
+    etag = Column(String)  # 上游返回的 ETag，用于条件请求 If-None-Match
+    last_modified = Column(String)  # 上游返回的 Last-Modified，用于条件请求 If-Modified-Since
+    websub_hub = Column(String)  # Feed 声明的 WebSub hub，见 app.websub
+    websub_topic = Column(String)  # 订阅的 topic（Feed 的 rel="self" 地址）
+    websub_secret = Column(String)  # 校验推送签名的 HMAC secret
+    websub_status = Column(String)  # pending / subscribed / failed / denied
+    websub_expires_at = Column(DateTime)  # subscribed 时为租约到期时间，其余状态为下次重试时间
     is_active = Column(Boolean, default=True)
     enabled_integrations = Column(Text)  # JSON 数组，存储启用的集成 ID，null 表示全部启用
     click_action = Column(String, default='modal')  # 卡片点击行为: 'modal'=打开详情弹窗, 'link'=直接跳转URL
@@ -31,6 +59,7 @@ class Feed(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     items = relationship("FeedItem", back_populates="feed", cascade="all, delete-orphan")
+    fetch_runs = relationship("FetchRun", cascade="all, delete-orphan")
 
 
 class FeedItem(Base):
@@ -40,11 +69,16 @@ class FeedItem(Base):
     feed_id = Column(String, ForeignKey("feeds.id", ondelete="CASCADE"), nullable=False)
     title = Column(String, nullable=False)
     guid = Column(String, unique=True, nullable=True)  # RSS GUID, 优先用于去重
-    link = Column(String, nullable=False)  # 移除 unique 约束,因为 link 可能会变化
+    link = Column(String, nullable=False, index=True)  # 移除 unique 约束,因为 link 可能会变化；索引用于去重查询
     description = Column(Text)
     content = Column(Text)
     cover_image = Column(String)
     thumbnail_image = Column(String)
+    # 缩略图队列状态（见 app.thumbnails）: pending=等待生成, done=已生成, failed=多次失败后放弃；没有封面时为空
+    thumbnail_status = Column(String)
+    thumbnail_attempts = Column(Integer, default=0)  # 已失败的次数
+    thumbnail_retry_at = Column(DateTime)  # 失败后下次重试的时间
+    thumbnail_max_width = Column(Integer)  # /thumb 可提供的最大宽度（见 app.image_variants）
     author = Column(String)
     categories = Column(String)  # JSON string
     published_at = Column(DateTime, nullable=False)
@@ -59,6 +93,79 @@ class FeedItem(Base):
 
     feed = relationship("Feed", back_populates="items")
 
+    __table_args__ = (
+        Index('ix_feed_items_feed_id_published_at', 'feed_id', 'published_at'),
+        Index('ix_feed_items_thumbnail_status_published_at', 'thumbnail_status', 'published_at'),
+    )
+
+
+class FetchRun(Base):
+    """单次抓取记录，见 app.fetch_history"""
+    __tablename__ = "fetch_runs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    feed_id = Column(String, ForeignKey("feeds.id", ondelete="CASCADE"), nullable=False)
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=False)
+    duration_ms = Column(Integer, nullable=False)  # 抓取 + 解析 + 入库总耗时
+    fetch_ms = Column(Integer)  # 网络请求耗时
+    parse_ms = Column(Integer)  # 解析耗时
+    http_status = Column(Integer)  # 网络错误时为 None
+    bytes = Column(Integer)  # 响应正文大小，304 时为 0
+    not_modified = Column(Boolean, default=False)
+    entries_seen = Column(Integer, default=0)  # Feed 中的条目数
+    new_items = Column(Integer, default=0)
+    images_processed = Column(Integer, default=0)  # 入库后台任务成功生成的缩略图数量
+    error = Column(String)
+
+    __table_args__ = (
+        Index('ix_fetch_runs_feed_id_started_at', 'feed_id', 'started_at'),
+        Index('ix_fetch_runs_started_at', 'started_at'),
+    )
+
+
+class ImageContent(Base):
+    """按内容寻址的缩略图（UPLOAD_DIR/{hash}.webp），见 app.image_store"""
+    __tablename__ = "image_contents"
+
+    hash = Column(String, primary_key=True)  # 原图字节的 sha256
+    phash = Column(String, index=True)  # 感知哈希（16 位十六进制 dHash），THUMBNAIL_PHASH 关闭时为空
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ImageSource(Base):
+    """图片 URL 到内容的映射，不同 URL 的相同图片共用一个缩略图"""
+    __tablename__ = "image_sources"
+
+    url = Column(String, primary_key=True)
+    content_hash = Column(String, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class Job(Base):
+    """后台任务（手动刷新等）的状态，见 app.jobs"""
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True, index=True)
+    type = Column(String, nullable=False)  # feed_refresh / refresh_all / feed_create / opml_import
+    feed_id = Column(String)  # feed_refresh 时为对应的 Feed
+    status = Column(String, nullable=False, default="running")  # running / succeeded / failed
+    stage = Column(String)  # feed_create 的当前阶段：fetch / favicon / thumbnails / done
+    total = Column(Integer, default=0)  # 需要抓取的 Feed 数
+    completed = Column(Integer, default=0)  # 已完成（含失败）的 Feed 数
+    failed = Column(Integer, default=0)
+    new_items = Column(Integer, default=0)
+    not_modified = Column(Integer, default=0)
+    images_processed = Column(Integer, default=0)
+    error = Column(String)
+    results = Column(JSON)  # opml_import 中每个 Feed 的首次抓取结果
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_jobs_created_at', 'created_at'),
+    )
+
 
 class FeedReadStatus(Base):
     __tablename__ = "feed_read_status"
@@ -117,3 +224,72 @@ def init_db():
     For schema changes, use: alembic revision --autogenerate -m "description"
     """
     Base.metadata.create_all(bind=engine)
+
+
+@contextmanager
+def _migration_lock():
+    """多个进程（uvicorn --workers N、worker 进程）同时启动时串行执行建表和迁移"""
+    os.makedirs(os.path.dirname(os.path.abspath(MIGRATION_LOCK_FILE)), exist_ok=True)
+    fd = os.open(MIGRATION_LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        yield
+    finally:
+        os.close(fd)  # 关闭文件时释放锁
+
+
+# 旧版本启动时先 create_all 再迁移：全新安装的表结构已经是基线版本（3c4d5e6f7a8b），
+# 但 7a8b9c0d1e2f 因为 komga_status 已存在而失败，alembic_version 停在更早的版本
+_BASELINE_REVISION = "3c4d5e6f7a8b"
+_STUCK_BASELINE_REVISIONS = ("455744e62a02", "7a8b9c0d1e2f")
+
+
+def _repair_baseline_stamp(alembic_cfg):
+    """停在基线之前、但表结构已经是基线版本的数据库直接标记为基线版本，之后的迁移照常执行"""
+    from alembic import command
+    from alembic.migration import MigrationContext
+
+    with engine.connect() as conn:
+        revision = MigrationContext.configure(conn).get_current_revision()
+    if revision not in _STUCK_BASELINE_REVISIONS:
+        return
+
+    inspector = inspect(engine)
+    feed_item_columns = {column['name'] for column in inspector.get_columns('feed_items')}
+    feed_columns = {column['name'] for column in inspector.get_columns('feeds')}
+    if {'komga_status', 'komga_sync_at'} <= feed_item_columns and 'click_action' in feed_columns:
+        command.stamp(alembic_cfg, _BASELINE_REVISION)
+        print(f"Database schema already at {_BASELINE_REVISION}, stamped from {revision}")
+
+
+def prepare_database():
+    """
+    建表并执行 Alembic 迁移（API 和 worker 进程启动时调用）
+
+    - 空数据库：按当前模型建表，标记为最新版本，不再执行迁移
+    - 已有数据库：只执行 Alembic 迁移。不能先 create_all，否则新表会在迁移之前被创建，
+      迁移失败后之后的迁移全部不会执行
+
+    迁移失败时抛出异常，进程启动失败，避免在旧的表结构上运行。
+    """
+    from alembic.config import Config
+    from alembic import command
+
+    # Get the backend directory path
+    backend_dir = os.path.dirname(os.path.dirname(__file__))
+    alembic_cfg = Config(os.path.join(backend_dir, "alembic.ini"))
+
+    with _migration_lock():
+        if not inspect(engine).get_table_names():
+            init_db()
+            command.stamp(alembic_cfg, "head")
+            print("Database tables initialized")
+            return
+
+        _repair_baseline_stamp(alembic_cfg)
+        print("Running database migrations...")
+        command.upgrade(alembic_cfg, "head")
+        print("Database migrations completed successfully")
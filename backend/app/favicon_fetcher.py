@@ -1,8 +1,9 @@
-import requests
 from urllib.parse import urlparse, urljoin
 from bs4 import BeautifulSoup
 import base64
 
+from app.http_client import http_get
+
 
 def get_favicon_url(site_url: str) -> str | None:
     """
@@ -30,7 +31,7 @@ def get_favicon_url(site_url: str) -> str | None:
         for path in common_paths:
             try:
                 favicon_url = urljoin(base_url, path)
-                response = requests.get(favicon_url, headers=headers, timeout=5)
+                response = http_get(favicon_url, headers=headers, timeout=5)
                 if response.status_code == 200 and len(response.content) > 0:
                     # Convert to data URL to avoid CORS issues
                     content_type = response.headers.get('Content-Type', 'image/x-icon')
@@ -41,7 +42,7 @@ def get_favicon_url(site_url: str) -> str | None:
         
         # Try to parse HTML for favicon link
         try:
-            response = requests.get(site_url, headers=headers, timeout=5)
+            response = http_get(site_url, headers=headers, timeout=5)
             if response.status_code == 200:
                 soup = BeautifulSoup(response.text, 'html.parser')
                 
@@ -50,7 +51,7 @@ def get_favicon_url(site_url: str) -> str | None:
                 if icon_link and icon_link.get('href'):
                     favicon_url = urljoin(base_url, icon_link['href'])
                     try:
-                        icon_response = requests.get(favicon_url, headers=headers, timeout=5)
+                        icon_response = http_get(favicon_url, headers=headers, timeout=5)
                         if icon_response.status_code == 200:
                             content_type = icon_response.headers.get('Content-Type', 'image/x-icon')
                             b64_data = base64.b64encode(icon_response.content).decode('utf-8')
@@ -0,0 +1,148 @@
+"""
+抓取历史
+
+每次抓取（定时或手动）在 fetch_runs 表中记录一行：耗时、HTTP 状态、响应大小、
+解析耗时、条目数、新条目数、生成的缩略图数和错误信息。
+
+- FETCH_HISTORY_RETENTION_DAYS 之前的记录会被定期清理
+- 每个 Feed 最多保留 FETCH_HISTORY_MAX_PER_FEED 条记录
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database import Feed, FetchRun, db_write_lock
+
+FETCH_HISTORY_RETENTION_DAYS = int(os.getenv("FETCH_HISTORY_RETENTION_DAYS", "30"))
+FETCH_HISTORY_MAX_PER_FEED = int(os.getenv("FETCH_HISTORY_MAX_PER_FEED", "500"))
+
+
+def _ms(seconds: Optional[float]) -> Optional[int]:
+    return None if seconds is None else int(round(seconds * 1000))
+
+
+def build_fetch_run(
+    feed_id: str,
+    started_at: datetime,
+    result: Optional[Dict[str, Any]] = None,
+    error: Optional[str] = None,
+    http_status: Optional[int] = None,
+) -> FetchRun:
+    """
+    根据 parse_rss_feed 的结果（失败时为 None）构建一条抓取记录（不写库）。
+    new_items 由入库流水线填写，images_processed 由后台任务累加。
+    """
+    result = result or {}
+    fetch_run = FetchRun(
+        feed_id=feed_id,
+        started_at=started_at,
+        fetch_ms=_ms(result.get('fetch_seconds')),
+        parse_ms=_ms(result.get('parse_seconds')),
+        http_status=result.get('http_status', http_status),
+        bytes=result.get('bytes'),
+        not_modified=result.get('not_modified', False),
+        entries_seen=result.get('total_entries', 0),
+        new_items=0,
+        images_processed=0,
+        error=error[:500] if error else None,
+    )
+    finish_fetch_run(fetch_run)
+    return fetch_run
+
+
+def finish_fetch_run(fetch_run: FetchRun):
+    """记录结束时间和总耗时"""
+    fetch_run.finished_at = datetime.utcnow()
+    fetch_run.duration_ms = _ms((fetch_run.finished_at - fetch_run.started_at).total_seconds())
+
+
+def add_images_processed(db: Session, run_id: int, count: int):
+    """累加某次抓取生成的缩略图数量"""
+    if not run_id or count <= 0:
+        return
+    with db_write_lock:
+        db.query(FetchRun).filter(FetchRun.id == run_id).update(
+            {FetchRun.images_processed: FetchRun.images_processed + count},
+            synchronize_session=False,
+        )
+        db.commit()
+
+
+def prune_fetch_history(db: Session):
+    """按保留天数和每个 Feed 的条数上限清理抓取记录"""
+    deleted = 0
+    with db_write_lock:
+        if FETCH_HISTORY_RETENTION_DAYS > 0:
+            cutoff = datetime.utcnow() - timedelta(days=FETCH_HISTORY_RETENTION_DAYS)
+            deleted += db.query(FetchRun).filter(FetchRun.started_at < cutoff).delete(synchronize_session=False)
+
+        if FETCH_HISTORY_MAX_PER_FEED > 0:
+            for (feed_id,) in db.query(Feed.id).all():
+                boundary = db.query(FetchRun.started_at).filter(
+                    FetchRun.feed_id == feed_id
+                ).order_by(
+                    FetchRun.started_at.desc()
+                ).offset(FETCH_HISTORY_MAX_PER_FEED).first()
+                if boundary:
+                    deleted += db.query(FetchRun).filter(
+                        FetchRun.feed_id == feed_id,
+                        FetchRun.started_at <= boundary.started_at,
+                    ).delete(synchronize_session=False)
+
+        db.commit()
+    if deleted:
+        print(f"Pruned {deleted} fetch history rows")
+
+
+def _percentile(values: list[int], pct: float) -> Optional[int]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def get_fetch_stats(db: Session, hours: int = 24, top: int = 10) -> Dict[str, Any]:
+    """
+    汇总最近 hours 小时的抓取记录：整体耗时分布和最耗时的 Feed。
+    Feed 按总耗时排序，即占用抓取时间最多的 Feed 排在前面。
+    """
+    since = datetime.utcnow() - timedelta(hours=hours)
+    rows = db.query(
+        FetchRun.feed_id, FetchRun.duration_ms, FetchRun.error, FetchRun.not_modified, FetchRun.new_items
+    ).filter(FetchRun.started_at >= since).all()
+
+    per_feed: Dict[str, list] = {}
+    for row in rows:
+        per_feed.setdefault(row.feed_id, []).append(row)
+
+    titles = dict(db.query(Feed.id, Feed.title).filter(Feed.id.in_(list(per_feed))).all()) if per_feed else {}
+
+    feeds = []
+    for feed_id, feed_rows in per_feed.items():
+        durations = [row.duration_ms for row in feed_rows]
+        feeds.append({
+            'feed_id': feed_id,
+            'title': titles.get(feed_id, feed_id),
+            'runs': len(feed_rows),
+            'failures': sum(1 for row in feed_rows if row.error),
+            'total_ms': sum(durations),
+            'p50_ms': _percentile(durations, 50),
+            'p95_ms': _percentile(durations, 95),
+            'max_ms': max(durations),
+        })
+    feeds.sort(key=lambda f: f['total_ms'], reverse=True)
+
+    durations = [row.duration_ms for row in rows]
+    return {
+        'hours': hours,
+        'runs': len(rows),
+        'failures': sum(1 for row in rows if row.error),
+        'not_modified': sum(1 for row in rows if row.not_modified),
+        'new_items': sum(row.new_items or 0 for row in rows),
+        'p50_ms': _percentile(durations, 50),
+        'p95_ms': _percentile(durations, 95),
+        'max_ms': max(durations) if durations else None,
+        'slowest_feeds': feeds[:top],
+    }
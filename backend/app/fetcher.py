@@ -0,0 +1,313 @@
+"""
+Feed 抓取引擎
+
+- 网络请求和 RSS 解析在共享线程池中并发执行，并发数由 FETCH_CONCURRENCY 控制
+- 同一个 Feed 同一时间只会有一个抓取任务：进程内由 submit_feed_fetch 去重，
+  跨进程（uvicorn --workers N、独立 worker 进程）通过 feeds.fetch_claimed_until 上的租约去重，
+  租约被其他进程持有时等待其完成，结果取自它写入的 fetch_runs 记录
+- 抓取失败不在线程内等待重试，而是记录退避时间（见 app.backoff），不占用抓取线程
+- 新条目通过 app.ingest 的入库流水线写入，缩略图和 Komga 查询在后台执行
+- Feed 声明了 WebSub hub 时抓取成功后发起订阅，推送的内容同样在抓取线程池中入库（见 app.websub）
+- 每个 Feed 抓取完成后输出耗时，全量抓取结束后输出总耗时
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, Feed, FetchRun, db_write_lock
+from app.rss_parser import parse_rss_feed, parse_feed_content
+from app.polling import update_poll_interval
+from app.backoff import record_fetch_failure, record_fetch_success
+from app.fetch_history import build_fetch_run, finish_fetch_run
+from app.ingest import ingest_entries, get_known_guids
+from app.websub import maybe_subscribe
+
+# 同时抓取的 Feed 数量上限
+FETCH_CONCURRENCY = max(1, int(os.getenv("FETCH_CONCURRENCY", "8")))
+
+# 抓取租约的时长（秒），持有租约的进程崩溃时最多这么久之后其他进程可以重新抓取
+FETCH_CLAIM_SECONDS = 300
+
+# 共享抓取线程池及正在进行的抓取任务（feed_id -> Future）
+_executor: ThreadPoolExecutor | None = None
+_in_flight: dict[str, Future] = {}
+_in_flight_lock = threading.RLock()
+
+
+def _claim_fetch(db: Session, feed_id: str) -> bool:
+    """认领 Feed 的抓取租约，其他进程正在抓取时返回 False"""
+    now = datetime.utcnow()
+    with db_write_lock:
+        claimed = db.query(Feed).filter(
+            Feed.id == feed_id,
+            or_(Feed.fetch_claimed_until == None, Feed.fetch_claimed_until < now),
+        ).update({Feed.fetch_claimed_until: now + timedelta(seconds=FETCH_CLAIM_SECONDS)}, synchronize_session=False)
+        db.commit()
+    return claimed == 1
+
+
+def _release_fetch(feed_id: str):
+    db = SessionLocal()
+    try:
+        with db_write_lock:
+            db.query(Feed).filter(Feed.id == feed_id).update({Feed.fetch_claimed_until: None}, synchronize_session=False)
+            db.commit()
+    except Exception as e:
+        # 租约到期后自动失效
+        print(f"Failed to release fetch claim for feed {feed_id}: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def _wait_for_other_fetch(db: Session, feed_id: str, stats: dict, interval: float = 1.0):
+    """其他进程正在抓取同一个 Feed：等待租约释放，统计信息取自它写入的抓取记录"""
+    waiting_since = datetime.utcnow()
+    deadline = time.monotonic() + FETCH_CLAIM_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(interval)
+        db.expire_all()
+        claimed_until = db.query(Feed.fetch_claimed_until).filter(Feed.id == feed_id).scalar()
+        if claimed_until is None or claimed_until < datetime.utcnow():
+            break
+
+    fetch_run = db.query(FetchRun).filter(
+        FetchRun.feed_id == feed_id,
+        FetchRun.finished_at >= waiting_since,
+    ).order_by(FetchRun.finished_at.desc()).first()
+    if fetch_run is not None:
+        stats['new_items'] = fetch_run.new_items or 0
+        stats['not_modified'] = bool(fetch_run.not_modified)
+        stats['error'] = fetch_run.error
+    print(f"[{stats['title']}] fetched by another process")
+
+
+def fetch_single_feed(feed_id: str) -> dict:
+    """
+    抓取单个 Feed 并写入新条目。在抓取线程池中执行。
+
+    Returns:
+        本次抓取的统计信息：title / new_items / not_modified / fetch_seconds / ingest_seconds / error，
+        以及解析出的 feed_info（抓取失败时为 None）
+    """
+    stats = {
+        'feed_id': feed_id,
+        'title': feed_id,
+        'new_items': 0,
+        'not_modified': False,
+        'fetch_seconds': 0.0,
+        'ingest_seconds': 0.0,
+        'error': None,
+        'feed_info': None,
+    }
+
+    claimed = False
+    db = SessionLocal()
+    try:
+        feed = db.query(Feed).filter(Feed.id == feed_id).first()
+        if not feed:
+            stats['error'] = "Feed not found"
+            return stats
+        stats['title'] = feed.title
+
+        if not _claim_fetch(db, feed_id):
+            _wait_for_other_fetch(db, feed_id, stats)
+            return stats
+        claimed = True
+
+        # 网络请求 + 解析（并发执行，不持有写库锁）
+        started_at = datetime.utcnow()
+        fetch_started = time.monotonic()
+        try:
+            result = parse_rss_feed(
+                feed.url,
+                etag=feed.etag,
+                last_modified=feed.last_modified,
+                known_guids=get_known_guids(db, feed.id),
+            )
+        except Exception as e:
+            stats['fetch_seconds'] = time.monotonic() - fetch_started
+            stats['error'] = str(e)
+            print(f"Error fetching feed {feed.title}: {e}")
+            with db_write_lock:
+                try:
+                    # 不在抓取线程内重试，由调度器在 retry_at 之后重新抓取
+                    record_fetch_failure(feed, str(e))
+                    db.add(build_fetch_run(feed.id, started_at, error=str(e), http_status=getattr(e, 'http_status', None)))
+                    db.commit()
+                except:
+                    db.rollback()
+            return stats
+        stats['fetch_seconds'] = time.monotonic() - fetch_started
+        stats['not_modified'] = result['not_modified']
+        stats['feed_info'] = result.get('feed_info')
+
+        def update_feed_state(item_ids: list[str]):
+            # 根据发布频率调整抓取间隔
+            update_poll_interval(db, feed, len(item_ids), result['total_entries'])
+
+            # Update feed's last_fetched_at and clear error / backoff
+            feed.last_fetched_at = datetime.utcnow()
+            record_fetch_success(feed)
+            feed.etag = result.get('etag')
+            feed.last_modified = result.get('last_modified')
+            finish_fetch_run(fetch_run)
+
+        fetch_run = build_fetch_run(feed.id, started_at, result)
+        ingest_started = time.monotonic()
+        try:
+            # 304 Not Modified 时 entries 为空，只更新抓取状态
+            item_ids = ingest_entries(
+                db, feed.id, result['entries'], before_commit=update_feed_state, fetch_run=fetch_run
+            )
+        except Exception as e:
+            stats['error'] = str(e)
+            print(f"Error storing items for feed {feed.title}: {e}")
+            with db_write_lock:
+                try:
+                    record_fetch_failure(feed, str(e))
+                    db.add(build_fetch_run(feed.id, started_at, result, error=str(e)))
+                    db.commit()
+                except:
+                    db.rollback()
+            return stats
+        stats['new_items'] = len(item_ids)
+        stats['ingest_seconds'] = time.monotonic() - ingest_started
+
+        try:
+            maybe_subscribe(db, feed.id, result.get('feed_info'))
+        except Exception as e:
+            print(f"WebSub subscription check failed for feed {feed.title}: {e}")
+        return stats
+    except Exception as e:
+        stats['error'] = str(e)
+        print(f"Error processing feed {stats['title']}: {e}")
+        db.rollback()
+        return stats
+    finally:
+        db.close()
+        if claimed:
+            _release_fetch(feed_id)
+
+
+def ingest_pushed_content(feed_id: str, content: bytes, content_type: Optional[str] = None):
+    """WebSub 推送的内容：解析后进入与抓取相同的去重 / 入库流程"""
+    db = SessionLocal()
+    try:
+        feed = db.query(Feed).filter(Feed.id == feed_id).first()
+        if not feed:
+            return
+        parsed = parse_feed_content(content, get_known_guids(db, feed.id), content_type)
+
+        def update_feed_state(item_ids: list[str]):
+            # 推送也算一次成功的更新，兜底轮询从现在开始计时
+            feed.last_fetched_at = datetime.utcnow()
+            record_fetch_success(feed)
+
+        item_ids = ingest_entries(db, feed.id, parsed['entries'], before_commit=update_feed_state)
+        print(f"[{feed.title}] WebSub push: {len(item_ids)} new items")
+    except Exception as e:
+        print(f"Error ingesting WebSub push for feed {feed_id}: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def submit_pushed_content(feed_id: str, content: bytes, content_type: Optional[str] = None) -> Future:
+    """在抓取线程池中处理推送内容，回调请求可以立即返回"""
+    return get_fetch_executor().submit(ingest_pushed_content, feed_id, content, content_type)
+
+
+def _log_fetch_stats(stats: dict):
+    """输出单个 Feed 的抓取耗时"""
+    if stats['error']:
+        status = f"error: {stats['error']}"
+    elif stats['not_modified']:
+        status = "not modified"
+    else:
+        status = f"{stats['new_items']} new items"
+    print(f"[{stats['title']}] fetch {stats['fetch_seconds']:.2f}s, ingest {stats['ingest_seconds']:.2f}s, {status}")
+
+
+def _run_feed_fetch(feed_id: str) -> dict:
+    stats = fetch_single_feed(feed_id)
+    _log_fetch_stats(stats)
+    return stats
+
+
+def get_fetch_executor() -> ThreadPoolExecutor:
+    """获取共享的抓取线程池（首次调用时创建）"""
+    global _executor
+    with _in_flight_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY, thread_name_prefix="feed-fetch")
+        return _executor
+
+
+def submit_feed_fetch(feed_id: str) -> Future:
+    """
+    提交一个 Feed 抓取任务到共享线程池。
+    如果该 Feed 已经在抓取中，直接返回正在进行的任务，不会重复抓取。
+    Future 的结果为 fetch_single_feed 返回的统计信息。
+    """
+    with _in_flight_lock:
+        future = _in_flight.get(feed_id)
+        if future is not None:
+            return future
+        future = get_fetch_executor().submit(_run_feed_fetch, feed_id)
+        _in_flight[feed_id] = future
+
+    def _release(_):
+        with _in_flight_lock:
+            if _in_flight.get(feed_id) is future:
+                del _in_flight[feed_id]
+
+    future.add_done_callback(_release)
+    return future
+
+
+def is_feed_fetching(feed_id: str) -> bool:
+    """该 Feed 是否正在抓取中"""
+    with _in_flight_lock:
+        return feed_id in _in_flight
+
+
+def fetch_all_feeds():
+    """Fetch all active feeds concurrently and wait for them to finish"""
+    try:
+        db = SessionLocal()
+    except Exception as e:
+        print(f"Failed to get database connection for feed fetching: {e}")
+        return
+
+    try:
+        feed_ids = [feed_id for (feed_id,) in db.query(Feed.id).filter(Feed.is_active == True).all()]
+    finally:
+        db.close()
+
+    print(f"Fetching {len(feed_ids)} feeds (concurrency: {FETCH_CONCURRENCY})...")
+    cycle_started = time.monotonic()
+    results = []
+
+    futures = [submit_feed_fetch(feed_id) for feed_id in feed_ids]
+    for future in as_completed(futures):
+        results.append(future.result())
+
+    wall_seconds = time.monotonic() - cycle_started
+    failed = sum(1 for stats in results if stats['error'])
+    not_modified = sum(1 for stats in results if stats['not_modified'])
+    new_items = sum(stats['new_items'] for stats in results)
+    print(f"Fetch cycle finished in {wall_seconds:.1f}s: {len(results) - failed} succeeded "
+          f"({not_modified} not modified), {failed} failed, {new_items} new items")
+
+    slowest = sorted(results, key=lambda s: s['fetch_seconds'] + s['ingest_seconds'], reverse=True)[:5]
+    if slowest:
+        print("Slowest feeds: " + ", ".join(
+            f"{s['title']} ({s['fetch_seconds'] + s['ingest_seconds']:.1f}s)" for s in slowest
+        ))
@@ -0,0 +1,258 @@
+"""
+共享 HTTP 客户端与按主机限流
+
+所有出站请求复用进程内共享的连接池（keep-alive + TLS 会话复用），不再每次请求新建连接：
+
+- get_http_client()：同步 httpx.Client（线程安全），供抓取线程使用：
+  Feed、图片、favicon、Komga 查询
+- get_async_client()：httpx.AsyncClient，供事件循环中的代理接口使用
+
+连接池大小由 HTTP_MAX_CONNECTIONS / HTTP_MAX_KEEPALIVE 设置，HTTP2=true 时启用 HTTP/2
+（需要安装 h2：pip install "httpx[http2]"）。客户端在 FastAPI 启动时创建，关闭时释放。
+
+fetch_rss_content、download_and_process_image 和 get_favicon_url 共用同一组限流器：
+每个主机一个并发上限（信号量）+ 一个令牌桶（每秒请求数）。
+达到限制的请求会排队等待，而不是直接失败。
+限流器在进程内生效：`uvicorn --workers N`、独立 worker 进程或 THUMBNAIL_WORKER_MODE=process 的
+缩略图子进程各自计数，对同一主机的实际上限是配置值乘以发起请求的进程数。
+
+默认值通过 HOST_MAX_CONCURRENCY / HOST_RATE_LIMIT / HOST_RATE_BURST 设置，
+单个主机可以通过 HOST_LIMITS（JSON）覆盖，例如：
+
+    HOST_LIMITS='{"rsshub.example.com": {"concurrency": 8, "rate": 10}, "i.pximg.net": {"concurrency": 2, "rate": 1}}'
+
+http_get_bytes 流式读取响应正文并限制大小：Content-Length 超出上限时不读取正文，
+边读边计数，超出上限或总耗时超过 max_seconds 时立即中止，避免异常上游占满内存。
+"""
+import importlib.util
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+from urllib.parse import urlparse
+
+import httpx
+
+# 连接池：最大连接数 / 最大空闲 keep-alive 连接数 / 空闲连接保留时间（秒）
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+# 是否启用 HTTP/2（需要 h2 包）
+HTTP2 = os.getenv("HTTP2", "false").lower() in ("1", "true", "yes")
+
+# 每个主机同时进行的请求数上限
+HOST_MAX_CONCURRENCY = max(1, int(os.getenv("HOST_MAX_CONCURRENCY", "4")))
+# 每个主机每秒请求数上限，0 表示不限制
+HOST_RATE_LIMIT = float(os.getenv("HOST_RATE_LIMIT", "5"))
+# 令牌桶容量（允许的突发请求数）
+HOST_RATE_BURST = int(os.getenv("HOST_RATE_BURST", "0")) or max(1, int(HOST_RATE_LIMIT))
+
+
+def _load_host_overrides() -> dict[str, dict]:
+    raw = os.getenv("HOST_LIMITS", "").strip()
+    if not raw:
+        return {}
+    try:
+        overrides = json.loads(raw)
+        return {host.lower(): limits for host, limits in overrides.items() if isinstance(limits, dict)}
+    except (ValueError, AttributeError) as e:
+        print(f"Warning: Invalid HOST_LIMITS, ignoring: {e}")
+        return {}
+
+
+HOST_LIMITS = _load_host_overrides()
+
+
+class TokenBucket:
+    """线程安全的令牌桶，acquire 在没有令牌时阻塞等待"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostLimiter:
+    """单个主机的并发上限 + 速率限制"""
+
+    def __init__(self, host: str, concurrency: int, rate: float, burst: int):
+        self.host = host
+        self.concurrency = concurrency
+        self._semaphore = threading.BoundedSemaphore(concurrency)
+        self._bucket = TokenBucket(rate, burst)
+
+    @contextmanager
+    def slot(self):
+        self._semaphore.acquire()
+        try:
+            self._bucket.acquire()
+            yield
+        finally:
+            self._semaphore.release()
+
+
+_limiters: dict[str, HostLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _host_key(url: str) -> str:
+    parsed = urlparse(url)
+    return (parsed.netloc or url).lower()
+
+
+def get_host_limiter(url: str) -> HostLimiter:
+    """获取 URL 所属主机的限流器（首次访问时按配置创建）"""
+    host = _host_key(url)
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            # 覆盖配置可以写 host:port 或只写 host
+            override = HOST_LIMITS.get(host) or HOST_LIMITS.get(host.split(':')[0]) or {}
+            rate = float(override.get('rate', HOST_RATE_LIMIT))
+            if 'burst' in override:
+                burst = int(override['burst'])
+            elif 'rate' in override:
+                burst = max(1, int(rate))
+            else:
+                burst = HOST_RATE_BURST
+            limiter = HostLimiter(
+                host,
+                concurrency=max(1, int(override.get('concurrency', HOST_MAX_CONCURRENCY))),
+                rate=rate,
+                burst=burst,
+            )
+            _limiters[host] = limiter
+        return limiter
+
+
+@contextmanager
+def host_slot(url: str):
+    """占用目标主机的一个请求名额，超出限制时阻塞排队"""
+    with get_host_limiter(url).slot():
+        yield
+
+
+def _http2_enabled() -> bool:
+    if HTTP2 and importlib.util.find_spec("h2") is None:
+        print('Warning: HTTP2=true but the h2 package is not installed, falling back to HTTP/1.1 (pip install "httpx[http2]")')
+        return False
+    return HTTP2
+
+
+def _client_options() -> dict:
+    return {
+        'limits': httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        'http2': _http2_enabled(),
+        'follow_redirects': True,
+        'timeout': 30.0,
+    }
+
+
+_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_clients_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """获取共享的同步 HTTP 客户端（首次调用时创建）"""
+    global _client
+    with _clients_lock:
+        if _client is None:
+            _client = httpx.Client(**_client_options())
+        return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    获取共享的异步 HTTP 客户端（首次调用时创建）。
+    连接池绑定首次使用它的事件循环，只能在 FastAPI 的事件循环中使用。
+    """
+    global _async_client
+    with _clients_lock:
+        if _async_client is None:
+            _async_client = httpx.AsyncClient(**_client_options())
+        return _async_client
+
+
+def open_http_clients():
+    """创建共享客户端（FastAPI 启动时调用）"""
+    get_http_client()
+    get_async_client()
+
+
+async def close_http_clients():
+    """关闭共享客户端，释放连接（FastAPI 关闭时调用）"""
+    global _client, _async_client
+    with _clients_lock:
+        client, async_client = _client, _async_client
+        _client = _async_client = None
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.aclose()
+
+
+def http_get(url: str, **kwargs) -> httpx.Response:
+    """带按主机限流的 GET，复用共享连接池"""
+    with host_slot(url):
+        return get_http_client().get(url, **kwargs)
+
+
+class ResponseTooLarge(httpx.HTTPError):
+    """响应正文超过大小上限（或下载超时）"""
+
+
+def http_get_bytes(
+    url: str,
+    max_bytes: int,
+    max_seconds: Optional[float] = None,
+    **kwargs,
+) -> tuple[httpx.Response, bytes]:
+    """
+    带按主机限流的流式 GET，返回 (response, 正文)。
+
+    max_bytes <= 0 表示不限制大小；max_seconds 为读取正文的总时长上限
+    （httpx 的 timeout 只限制单次读取，无法阻止持续慢速输出的响应）。
+
+    Raises:
+        ResponseTooLarge: Content-Length 或实际读取的字节数超过 max_bytes，或读取超时
+    """
+    with host_slot(url):
+        with get_http_client().stream("GET", url, **kwargs) as response:
+            declared = response.headers.get("Content-Length")
+            if max_bytes > 0 and declared and declared.isdigit() and int(declared) > max_bytes:
+                raise ResponseTooLarge(f"Response too large: Content-Length {declared} > {max_bytes} bytes")
+
+            started = time.monotonic()
+            chunks = []
+            received = 0
+            for chunk in response.iter_bytes():
+                received += len(chunk)
+                if max_bytes > 0 and received > max_bytes:
+                    raise ResponseTooLarge(f"Response too large: more than {max_bytes} bytes")
+                if max_seconds is not None and time.monotonic() - started > max_seconds:
+                    raise ResponseTooLarge(f"Response body not finished after {max_seconds:.0f}s")
+                chunks.append(chunk)
+            return response, b"".join(chunks)
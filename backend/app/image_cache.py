@@ -0,0 +1,305 @@
+"""
+图片缓存索引
+
+UPLOAD_DIR 中每个文件的大小和最后访问时间记录在 DATA_DIR/cache_index.db 中
+（独立的 SQLite 文件，不占用主库的写锁，缩略图子进程也能直接写入），总大小由触发器维护：
+
+- 新文件写入后 record_file 登记，总大小超过 CACHE_SIZE_LIMIT_MB 时按最后访问时间从旧到新删除，
+  直到低于上限的 90%，只读取被删除的那些行，不再遍历整个目录
+- /uploads 和 /thumb 的访问先在内存中合并（cache_access_middleware），最多 _TOUCH_FLUSH_SECONDS 秒后批量写入
+- 索引与磁盘不一致时（升级前的缓存、手动删除了文件）从磁盘重建：
+
+    python -m app.image_cache reconcile [--evict]
+
+  leader 进程启动时如果索引为空会自动重建一次
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+
+from app.metrics import IMAGE_CACHE_BYTES, IMAGE_CACHE_EVICTIONS, IMAGE_CACHE_EVICTED_BYTES
+
+DATA_DIR = os.getenv("DATA_DIR", "./data")
+UPLOAD_DIR = os.path.join(DATA_DIR, "uploads")
+CACHE_INDEX_FILE = os.path.join(DATA_DIR, "cache_index.db")
+
+# 缓存大小限制（单位：MB），默认 1GB，设置为 0 表示无限制
+CACHE_SIZE_LIMIT_MB = int(os.getenv("CACHE_SIZE_LIMIT_MB", "1000"))
+
+# 清理到上限的多少（留出一些余量，避免每写入一个文件就清理一次）
+_CLEANUP_TARGET_RATIO = 0.9
+# 每批读取 / 删除的行数
+_EVICT_BATCH = 200
+# 访问记录在内存中合并的最长时间（秒）
+_TOUCH_FLUSH_SECONDS = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_files (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_cache_files_accessed_at ON cache_files (accessed_at);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total_bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stats (id, total_bytes) VALUES (1, 0);
+CREATE TRIGGER IF NOT EXISTS cache_files_insert AFTER INSERT ON cache_files BEGIN
+    UPDATE cache_stats SET total_bytes = total_bytes + NEW.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_files_delete AFTER DELETE ON cache_files BEGIN
+    UPDATE cache_stats SET total_bytes = total_bytes - OLD.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_files_update AFTER UPDATE OF size ON cache_files BEGIN
+    UPDATE cache_stats SET total_bytes = total_bytes - OLD.size + NEW.size WHERE id = 1;
+END;
+"""
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+_touched: dict[str, float] = {}
+_touched_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def _connect() -> sqlite3.Connection:
+    """每个线程（和进程）一个连接，autocommit，多语句操作显式开启事务"""
+    global _schema_ready
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.pid == os.getpid():
+        return conn
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    conn = sqlite3.connect(CACHE_INDEX_FILE, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with _schema_lock:
+        if not _schema_ready:
+            conn.executescript(_SCHEMA)
+            _schema_ready = True
+    _local.conn = conn
+    _local.pid = os.getpid()
+    return conn
+
+
+def total_size() -> int:
+    row = _connect().execute("SELECT total_bytes FROM cache_stats WHERE id = 1").fetchone()
+    return row[0] if row else 0
+
+
+def record_file(path: str):
+    """登记新写入（或被覆盖）的缓存文件，超过上限时清理"""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return
+    _connect().execute(
+        "INSERT INTO cache_files (name, size, accessed_at) VALUES (?, ?, ?) "
+        "ON CONFLICT (name) DO UPDATE SET size = excluded.size, accessed_at = excluded.accessed_at",
+        (os.path.basename(path), size, time.time()),
+    )
+    enforce_limit()
+
+
+def touch(name: str) -> bool:
+    """记录一次访问（只写内存）。返回 True 表示应调用 flush_touches 写入索引"""
+    with _touched_lock:
+        _touched[name] = time.time()
+        return time.monotonic() - _last_flush >= _TOUCH_FLUSH_SECONDS
+
+
+def flush_touches():
+    """把内存中的访问记录写入索引"""
+    global _last_flush
+    with _touched_lock:
+        pending = list(_touched.items())
+        _touched.clear()
+        _last_flush = time.monotonic()
+    if pending:
+        _connect().executemany(
+            "UPDATE cache_files SET accessed_at = MAX(accessed_at, ?) WHERE name = ?",
+            [(accessed_at, name) for name, accessed_at in pending],
+        )
+
+
+def enforce_limit():
+    """总大小超过 CACHE_SIZE_LIMIT_MB 时按最后访问时间清理"""
+    current = total_size()
+    IMAGE_CACHE_BYTES.set(current)
+    if CACHE_SIZE_LIMIT_MB <= 0:
+        return
+    limit_bytes = CACHE_SIZE_LIMIT_MB * 1024 * 1024
+    if current > limit_bytes:
+        print(f"Cache size ({current / 1024 / 1024:.2f} MB) exceeds limit ({CACHE_SIZE_LIMIT_MB} MB), cleaning up...")
+        flush_touches()
+        evict(int(limit_bytes * _CLEANUP_TARGET_RATIO))
+
+
+def evict(target_bytes: int):
+    """从最久未访问的文件开始删除，直到总大小不超过 target_bytes"""
+    conn = _connect()
+    deleted_count = 0
+    deleted_size = 0
+    while True:
+        # 写事务串行化多个进程的清理，避免重复删除同一批文件
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = conn.execute("SELECT total_bytes FROM cache_stats WHERE id = 1").fetchone()[0]
+            if current <= target_bytes:
+                conn.execute("COMMIT")
+                break
+            rows = conn.execute(
+                "SELECT name, size FROM cache_files ORDER BY accessed_at LIMIT ?", (_EVICT_BATCH,)
+            ).fetchall()
+            if not rows:
+                conn.execute("COMMIT")
+                break
+
+            evicted = []
+            for name, size in rows:
+                if current <= target_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(UPLOAD_DIR, name))
+                except FileNotFoundError:
+                    pass  # 已被手动删除，同样从索引中移除
+                except OSError as e:
+                    print(f"Failed to delete cache file {name}: {e}")
+                    continue
+                evicted.append((name,))
+                current -= size
+                deleted_count += 1
+                deleted_size += size
+            conn.executemany("DELETE FROM cache_files WHERE name = ?", evicted)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if not evicted:
+            break
+
+    IMAGE_CACHE_BYTES.set(total_size())
+    if deleted_count > 0:
+        IMAGE_CACHE_EVICTIONS.inc(deleted_count)
+        IMAGE_CACHE_EVICTED_BYTES.inc(deleted_size)
+        print(f"Cache cleanup: deleted {deleted_count} files, freed {deleted_size / 1024 / 1024:.2f} MB")
+
+
+def reconcile() -> dict:
+    """
+    从磁盘重建索引：删除已不存在的文件的记录，登记索引中没有的文件
+    （最后访问时间取文件的 atime / mtime 中较新的一个），重新计算总大小。
+    """
+    on_disk = {}
+    with os.scandir(UPLOAD_DIR) as entries:
+        for entry in entries:
+            if not entry.is_file() or entry.name.endswith('.tmp'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            on_disk[entry.name] = (stat.st_size, max(stat.st_atime, stat.st_mtime))
+
+    flush_touches()
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        indexed = {name: accessed_at for name, accessed_at in conn.execute("SELECT name, accessed_at FROM cache_files")}
+        # 扫描之后新写入的文件不在 on_disk 中，删除前再确认一次
+        removed = [
+            (name,) for name in indexed
+            if name not in on_disk and not os.path.exists(os.path.join(UPLOAD_DIR, name))
+        ]
+        conn.executemany("DELETE FROM cache_files WHERE name = ?", removed)
+        conn.executemany(
+            "INSERT INTO cache_files (name, size, accessed_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET size = excluded.size",
+            [(name, size, indexed.get(name, accessed_at)) for name, (size, accessed_at) in on_disk.items()],
+        )
+        conn.execute("UPDATE cache_stats SET total_bytes = (SELECT COALESCE(SUM(size), 0) FROM cache_files) WHERE id = 1")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    stats = {
+        'files': len(on_disk),
+        'added': sum(1 for name in on_disk if name not in indexed),
+        'removed': len(removed),
+        'total_bytes': total_size(),
+    }
+    IMAGE_CACHE_BYTES.set(stats['total_bytes'])
+    return stats
+
+
+def reconcile_if_empty():
+    """索引为空而目录中有文件时（首次启用索引）重建，由 leader 进程启动时在后台线程中调用"""
+    try:
+        if _connect().execute("SELECT 1 FROM cache_files LIMIT 1").fetchone() is not None:
+            IMAGE_CACHE_BYTES.set(total_size())
+            return
+        if not os.path.isdir(UPLOAD_DIR) or not any(os.scandir(UPLOAD_DIR)):
+            return
+        print("Image cache index is empty, rebuilding from disk...")
+        stats = reconcile()
+        print(f"Image cache index rebuilt: {stats['files']} files, {stats['total_bytes'] / 1024 / 1024:.2f} MB")
+        enforce_limit()
+    except Exception as e:
+        print(f"Failed to rebuild image cache index: {e}")
+
+
+def start_reconcile_if_empty():
+    threading.Thread(target=reconcile_if_empty, name="cache-reconcile", daemon=True).start()
+
+
+def _cached_name(path: str) -> Optional[str]:
+    """/uploads/{name} -> name"""
+    prefix = "/uploads/"
+    if path.startswith(prefix) and '/' not in path[len(prefix):]:
+        return path[len(prefix):]
+    return None
+
+
+async def cache_access_middleware(request: Request, call_next):
+    """记录 /uploads 下文件的访问，用于按最后访问时间清理"""
+    response = await call_next(request)
+    if request.method == "GET" and response.status_code in (200, 304):
+        name = _cached_name(request.url.path)
+        if name and touch(name):
+            await run_in_threadpool(flush_touches)
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图片缓存索引")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    reconcile_parser = subparsers.add_parser('reconcile', help='从磁盘重建索引')
+    reconcile_parser.add_argument('--evict', action='store_true', help='重建后按 CACHE_SIZE_LIMIT_MB 清理')
+    subparsers.add_parser('stats', help='显示索引中的文件数和总大小')
+    args = parser.parse_args()
+
+    if args.command == 'reconcile':
+        started = time.perf_counter()
+        stats = reconcile()
+        print(f"Reconciled {stats['files']} files in {time.perf_counter() - started:.1f}s: "
+              f"{stats['added']} added, {stats['removed']} removed, "
+              f"total {stats['total_bytes'] / 1024 / 1024:.2f} MB")
+        if args.evict:
+            enforce_limit()
+    else:
+        count = _connect().execute("SELECT COUNT(*) FROM cache_files").fetchone()[0]
+        print(f"{count} files, {total_size() / 1024 / 1024:.2f} MB (limit {CACHE_SIZE_LIMIT_MB} MB)")
+
+
+if __name__ == "__main__":
+    main()
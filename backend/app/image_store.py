@@ -0,0 +1,92 @@
+"""
+按内容寻址的缩略图存储
+
+缩略图以原图字节的 sha256 命名（UPLOAD_DIR/{hash}.webp），image_sources 记录图片 URL 到内容的映射，
+FeedItem.thumbnail_image 指向共用的文件：
+
+- 已知 URL 且缩略图仍在缓存中时不发请求
+- 新 URL 下载后先计算内容哈希，与已有图片相同时只登记映射，不解码也不重新编码
+- THUMBNAIL_PHASH=true 时额外计算感知哈希（dHash），汉明距离不超过 THUMBNAIL_PHASH_DISTANCE 的图片
+  （同一张图重新压缩或缩放后的版本）视为同一张，复用已有的缩略图
+- 升级前以 md5(url) 命名的缩略图继续有效
+
+缩略图进程（THUMBNAIL_WORKER_MODE=process）中也会调用，写入时使用各自进程的 db_write_lock。
+"""
+import os
+from typing import Optional
+
+from sqlalchemy import or_, func
+from sqlalchemy.exc import IntegrityError
+
+from app.database import SessionLocal, ImageContent, ImageSource, db_write_lock
+
+# 是否计算感知哈希，合并重新压缩 / 缩放过的重复图片（从缩略图计算，不额外解码；相近的图片需要解码但不编码）
+THUMBNAIL_PHASH = os.getenv("THUMBNAIL_PHASH", "false").lower() in ("1", "true", "yes")
+# 感知哈希的最大汉明距离（64 位），最大为 3：哈希分成 4 段，距离不超过 3 时至少有一段完全相同，
+# 先按段筛选候选再计算距离
+THUMBNAIL_PHASH_DISTANCE = min(3, max(0, int(os.getenv("THUMBNAIL_PHASH_DISTANCE", "2"))))
+
+_PHASH_BANDS = 4
+_PHASH_BAND_CHARS = 4  # 每段 16 位 = 4 个十六进制字符
+
+
+def lookup(url: str) -> Optional[str]:
+    """URL 对应的内容哈希，没有记录时返回 None"""
+    db = SessionLocal()
+    try:
+        return db.query(ImageSource.content_hash).filter(ImageSource.url == url).scalar()
+    finally:
+        db.close()
+
+
+def record(url: str, content_hash: str, phash: Optional[str] = None):
+    """登记 URL 到内容的映射（内容不存在时一并登记）"""
+    db = SessionLocal()
+    try:
+        # 其他进程同时登记同一张图片时插入冲突，重新读取后再试一次
+        for attempt in range(2):
+            try:
+                with db_write_lock:
+                    if db.get(ImageContent, content_hash) is None:
+                        db.add(ImageContent(hash=content_hash, phash=phash))
+                    source = db.get(ImageSource, url)
+                    if source is None:
+                        db.add(ImageSource(url=url, content_hash=content_hash))
+                    else:
+                        source.content_hash = content_hash
+                    db.commit()
+                return
+            except IntegrityError:
+                db.rollback()
+                if attempt:
+                    raise
+    except Exception as e:
+        # 映射丢失只会让下次多下载一次
+        print(f"Failed to record image source {url}: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def _distance(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+def find_similar(phash: str) -> list[str]:
+    """感知哈希相近的已有图片，按距离从近到远排列"""
+    db = SessionLocal()
+    try:
+        if THUMBNAIL_PHASH_DISTANCE == 0:
+            rows = db.query(ImageContent.hash, ImageContent.phash).filter(ImageContent.phash == phash).all()
+        else:
+            bands = [
+                func.substr(ImageContent.phash, i * _PHASH_BAND_CHARS + 1, _PHASH_BAND_CHARS)
+                == phash[i * _PHASH_BAND_CHARS:(i + 1) * _PHASH_BAND_CHARS]
+                for i in range(_PHASH_BANDS)
+            ]
+            rows = db.query(ImageContent.hash, ImageContent.phash).filter(or_(*bands)).all()
+    finally:
+        db.close()
+
+    matches = [(_distance(phash, candidate), content_hash) for content_hash, candidate in rows]
+    return [content_hash for distance, content_hash in sorted(matches) if distance <= THUMBNAIL_PHASH_DISTANCE]
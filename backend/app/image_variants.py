@@ -0,0 +1,151 @@
+"""
+多尺寸缩略图
+
+GET /thumb/{hash}?w=480 返回指定宽度的缩略图，前端根据 FeedItemResponse.thumbnail_widths 生成 srcset：
+
+- 请求的宽度向上取整到 THUMBNAIL_WIDTHS 中最近的档位，避免任意宽度把缓存撑满
+- 优先从 THUMBNAIL_KEEP_SOURCE 保存的源图生成，没有源图时从已缓存的最大尺寸（通常是默认缩略图）缩小，
+  不会放大：可用的最大宽度见 feed_items.thumbnail_max_width
+- 生成的尺寸保存在 UPLOAD_DIR 中（{hash}.w{width}.webp），和默认缩略图一样受缓存大小限制
+- 同一个尺寸同时被多次请求时只生成一次，其余请求等待结果（进程内）；
+  多进程同时生成时先写临时文件再原子替换，结果相同
+"""
+import os
+import re
+import threading
+from concurrent.futures import Future
+from typing import Optional
+
+from PIL import Image
+
+from app.image_cache import UPLOAD_DIR
+from app.rss_parser import THUMBNAIL_WIDTHS, create_thumbnail, save_to_cache, max_size_for_width, source_path
+
+THUMB_PATH = "/thumb"
+
+_HASH_RE = re.compile(r'^[0-9a-f]{16,64}$')
+_THUMBNAIL_RE = re.compile(r'^/uploads/([0-9a-f]{16,64})\.webp$')
+
+# 正在生成的尺寸（文件路径 -> Future），实现 single-flight
+_rendering: dict[str, Future] = {}
+_rendering_lock = threading.Lock()
+
+
+def is_valid_hash(image_hash: str) -> bool:
+    return bool(_HASH_RE.match(image_hash))
+
+
+def image_hash_of(thumbnail_image: Optional[str]) -> Optional[str]:
+    """从 thumbnail_image（/uploads/{hash}.webp）中取出 hash"""
+    match = _THUMBNAIL_RE.match(thumbnail_image or '')
+    return match.group(1) if match else None
+
+
+def snap_width(width: int) -> int:
+    """向上取整到最近的档位，超过最大档位时取最大档位"""
+    for candidate in THUMBNAIL_WIDTHS:
+        if candidate >= width:
+            return candidate
+    return THUMBNAIL_WIDTHS[-1]
+
+
+def _base_path(image_hash: str) -> str:
+    return os.path.join(UPLOAD_DIR, f"{image_hash}.webp")
+
+
+def _variant_path(image_hash: str, width: int) -> str:
+    return os.path.join(UPLOAD_DIR, f"{image_hash}.w{width}.webp")
+
+
+def _image_width(path: str) -> Optional[int]:
+    """只读取文件头"""
+    try:
+        with Image.open(path) as img:
+            return img.width
+    except (OSError, ValueError):
+        return None
+
+
+def max_width(image_hash: Optional[str]) -> Optional[int]:
+    """某个缩略图可提供的最大宽度：有源图时为源图宽度，否则为默认缩略图的宽度"""
+    if not image_hash:
+        return None
+    for path in (source_path(image_hash), _base_path(image_hash)):
+        if os.path.exists(path):
+            return _image_width(path)
+    return None
+
+
+def available_widths(thumbnail_max_width: Optional[int]) -> Optional[list[int]]:
+    """
+    小于最大宽度的档位，再加上最大宽度本身（超过最大档位时为最大档位）。
+    最大宽度落在两个档位之间时，请求上一个档位返回的就是这个宽度的图片。
+    """
+    if not thumbnail_max_width:
+        return None
+    largest = min(thumbnail_max_width, THUMBNAIL_WIDTHS[-1])
+    return [width for width in THUMBNAIL_WIDTHS if width < largest] + [largest]
+
+
+def _largest_cached(image_hash: str) -> Optional[tuple[str, int]]:
+    """源图，或者默认缩略图和已生成尺寸中最大的一个"""
+    path = source_path(image_hash)
+    width = _image_width(path) if os.path.exists(path) else None
+    if width:
+        return path, width
+
+    best = None
+    candidates = [_base_path(image_hash)] + [_variant_path(image_hash, w) for w in THUMBNAIL_WIDTHS]
+    for path in candidates:
+        if not os.path.exists(path):
+            continue
+        width = _image_width(path)
+        if width and (best is None or width > best[1]):
+            best = (path, width)
+    return best
+
+
+def _render(image_hash: str, width: int, path: str) -> Optional[str]:
+    source = _largest_cached(image_hash)
+    if source is None:
+        return None
+    source_file, source_width = source
+    if source_width <= width:
+        # 不放大，直接返回已有的最大尺寸
+        return source_file
+
+    with open(source_file, 'rb') as f:
+        img = create_thumbnail(f.read(), max_size=max_size_for_width(width))
+    save_to_cache(img, path)
+    return path
+
+
+def get_variant(image_hash: str, width: int) -> Optional[str]:
+    """
+    返回指定宽度（取整到档位）的缩略图文件路径，需要时生成。
+    没有任何已缓存的图片时返回 None。
+    """
+    width = snap_width(width)
+    path = _variant_path(image_hash, width)
+    if os.path.exists(path):
+        return path
+
+    with _rendering_lock:
+        future = _rendering.get(path)
+        owner = future is None
+        if owner:
+            future = Future()
+            _rendering[path] = future
+    if not owner:
+        return future.result()
+
+    try:
+        result = _render(image_hash, width, path)
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _rendering_lock:
+            _rendering.pop(path, None)
@@ -0,0 +1,269 @@
+"""
+条目入库流水线
+
+创建 Feed、手动抓取和定时抓取共用同一个入库流程：
+
+1. 去重：一次 IN 查询批量取出已存在的 guid / link，而不是每个条目查询两次
+2. 构建行：把解析结果转换为 feed_items 行
+3. 批量写入：insert().values 的 executemany，持有 db_write_lock
+4. 后续任务：有封面的条目以 thumbnail_status='pending' 写入，由缩略图队列（app.thumbnails）
+   生成缩略图；Komga 状态查询在后台线程池中执行，不阻塞调用方
+
+解析阶段可以先用 get_known_guids 跳过已知条目。
+"""
+import json
+import os
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, FeedItem, FetchRun, db_write_lock
+from app.thumbnails import initial_status, thumbnail_queue
+from app.komga import get_komga_api_url, is_hentai_assistant_compatible_url, query_komga_status, apply_komga_results
+
+# 条目清理配置：每个 Feed 最多保留的条目数，默认 1000 条，设为 0 表示不限制
+MAX_ITEMS_PER_FEED = int(os.getenv("MAX_ITEMS_PER_FEED", "1000"))
+
+# 单条 IN 查询最多携带的参数数量（SQLite 旧版本上限为 999）
+_IN_CHUNK_SIZE = 500
+
+# Komga 状态查询的后台线程池（只是一次 HTTP 请求，不需要很多线程）
+_followup_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ingest-followup")
+
+
+def _chunks(values: list, size: int = _IN_CHUNK_SIZE) -> Iterator[list]:
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def get_known_guids(db: Session, feed_id: str) -> set[str]:
+    """某个 Feed 已入库条目的 guid 集合，用于解析时跳过已知条目"""
+    return {
+        guid for (guid,) in db.query(FeedItem.guid).filter(
+            FeedItem.feed_id == feed_id,
+            FeedItem.guid != None
+        )
+    }
+
+
+def find_existing_keys(db: Session, guids: Iterable[str], links: Iterable[str]) -> tuple[set[str], set[str]]:
+    """
+    批量查询数据库中已存在的 guid 和 link。
+
+    Returns:
+        (已存在的 guid 集合, 已存在的 link 集合)
+    """
+    existing_guids = set()
+    for chunk in _chunks(list(guids)):
+        existing_guids.update(
+            guid for (guid,) in db.query(FeedItem.guid).filter(FeedItem.guid.in_(chunk))
+        )
+
+    existing_links = set()
+    for chunk in _chunks(list(links)):
+        existing_links.update(
+            link for (link,) in db.query(FeedItem.link).filter(FeedItem.link.in_(chunk))
+        )
+
+    return existing_guids, existing_links
+
+
+def filter_new_entries(db: Session, entries: list[Dict[str, Any]]) -> list[Dict[str, Any]]:
+    """
+    过滤掉已存在的条目（guid 或 link 任一匹配即视为已存在），
+    同一批次内重复的条目也只保留第一个。
+    """
+    if not entries:
+        return []
+
+    guids = {entry['guid'] for entry in entries if entry.get('guid')}
+    links = {entry['link'] for entry in entries if entry.get('link')}
+    existing_guids, existing_links = find_existing_keys(db, guids, links)
+
+    new_entries = []
+    for entry in entries:
+        guid = entry.get('guid')
+        link = entry.get('link')
+        if guid and guid in existing_guids:
+            continue
+        if link and link in existing_links:
+            continue
+        new_entries.append(entry)
+        # 同一批次内后续重复的条目视为已存在
+        if guid:
+            existing_guids.add(guid)
+        if link:
+            existing_links.add(link)
+
+    return new_entries
+
+
+def build_item_rows(feed_id: str, entries: list[Dict[str, Any]]) -> list[Dict[str, Any]]:
+    """把解析结果转换为 feed_items 行（缩略图由缩略图队列生成）"""
+    now = datetime.utcnow()
+    return [
+        {
+            'id': str(uuid.uuid4()),
+            'feed_id': feed_id,
+            'title': entry_data['title'],
+            'guid': entry_data.get('guid'),
+            'link': entry_data['link'],
+            'description': entry_data.get('description'),
+            'content': entry_data.get('content'),
+            'cover_image': entry_data.get('cover_image'),
+            'thumbnail_image': None,
+            'thumbnail_status': initial_status(entry_data.get('cover_image')),
+            'thumbnail_attempts': 0,
+            'author': entry_data.get('author'),
+            'categories': json.dumps(entry_data.get('categories', [])),
+            'published_at': entry_data['published_at'],
+            'created_at': now,
+            'updated_at': now,
+        }
+        for entry_data in entries
+    ]
+
+
+def cleanup_old_items(db: Session, feed_id: str):
+    """
+    清理指定 Feed 的旧条目，只保留最新的 MAX_ITEMS_PER_FEED 条。
+    采用消极策略：只在超过限制的 120% 时才清理，避免频繁操作。
+    """
+    if MAX_ITEMS_PER_FEED <= 0:
+        return  # 不限制
+
+    item_count = db.query(FeedItem).filter(FeedItem.feed_id == feed_id).count()
+
+    # 只有超过限制的 120% 才触发清理（消极策略）
+    threshold = int(MAX_ITEMS_PER_FEED * 1.2)
+    if item_count <= threshold:
+        return
+
+    # 获取需要删除的条目（最旧的）
+    items_to_delete = item_count - MAX_ITEMS_PER_FEED
+    old_items = db.query(FeedItem).filter(
+        FeedItem.feed_id == feed_id
+    ).order_by(
+        FeedItem.published_at.asc()
+    ).limit(items_to_delete).all()
+
+    if old_items:
+        deleted_ids = [item.id for item in old_items]
+        db.query(FeedItem).filter(FeedItem.id.in_(deleted_ids)).delete(synchronize_session=False)
+        db.commit()
+        print(f"Cleaned up {len(deleted_ids)} old items from feed {feed_id}")
+
+
+def ingest_entries(
+    db: Session,
+    feed_id: str,
+    entries: list[Dict[str, Any]],
+    before_commit: Optional[Callable[[list[str]], None]] = None,
+    fetch_run: Optional[FetchRun] = None,
+) -> list[str]:
+    """
+    入库流水线：去重 → 构建行 → 批量写入 → 提交 → 清理旧条目 → 提交后续任务。
+
+    Args:
+        db: 数据库会话
+        feed_id: 条目所属 Feed
+        entries: parse_rss_feed 返回的 entries
+        before_commit: 在同一事务中提交前调用，参数为新条目 ID 列表，
+                       用于更新 Feed 的抓取状态等
+        fetch_run: 本次抓取记录（见 app.fetch_history），与条目在同一事务中写入，
+                   缩略图生成后累加 images_processed
+
+    Returns:
+        新写入的条目 ID 列表
+    """
+    with db_write_lock:
+        try:
+            rows = build_item_rows(feed_id, filter_new_entries(db, entries))
+            if rows:
+                db.execute(insert(FeedItem), rows)
+            item_ids = [row['id'] for row in rows]
+            thumbnail_ids = [row['id'] for row in rows if row['thumbnail_status']]
+            if before_commit:
+                db.flush()
+                before_commit(item_ids)
+            fetch_run_id = None
+            if fetch_run is not None:
+                fetch_run.new_items = len(item_ids)
+                db.add(fetch_run)
+                db.flush()
+                fetch_run_id = fetch_run.id
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        # 清理旧条目（消极策略，超过 120% 才清理）
+        if item_ids:
+            cleanup_old_items(db, feed_id)
+
+    enqueue_followups(feed_id, item_ids, fetch_run_id, thumbnail_ids)
+    return item_ids
+
+
+def enqueue_followups(
+    feed_id: str,
+    item_ids: list[str],
+    fetch_run_id: Optional[int] = None,
+    thumbnail_ids: Optional[list[str]] = None,
+) -> Optional[Future]:
+    """
+    唤醒缩略图队列（缩略图由 app.thumbnails 按发布时间从新到旧生成），
+    并把 Komga 状态查询提交到后台线程池。thumbnail_ids 为进入缩略图队列的条目。
+    """
+    if not item_ids:
+        return None
+    if thumbnail_ids:
+        thumbnail_queue.notify(thumbnail_ids, fetch_run_id)
+    return _followup_executor.submit(_run_followups, feed_id, item_ids)
+
+
+def _run_followups(feed_id: str, item_ids: list[str]):
+    db = SessionLocal()
+    try:
+        check_komga_status(db, item_ids)
+    except Exception as e:
+        print(f"Error processing follow-ups for feed {feed_id}: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def check_komga_status(db: Session, item_ids: list[str]):
+    """查询新添加条目的 Komga 状态，失败不影响主流程"""
+    try:
+        api_url = get_komga_api_url(db)
+        if not api_url:
+            return
+
+        items = []
+        for chunk in _chunks(item_ids):
+            items.extend(db.query(FeedItem).filter(FeedItem.id.in_(chunk)).all())
+
+        # 过滤出支持的域名
+        compatible_items = [
+            item for item in items
+            if is_hentai_assistant_compatible_url(item.link)
+        ]
+        if not compatible_items:
+            print(f"No compatible URLs found in {len(items)} new items")
+            return
+
+        print(f"Querying Komga status for {len(compatible_items)}/{len(items)} compatible items...")
+        result = query_komga_status(api_url, [item.link for item in compatible_items])
+        with db_write_lock:
+            updated_count = apply_komga_results(compatible_items, result)
+            db.commit()
+        if updated_count > 0:
+            print(f"Updated Komga status for {updated_count} items")
+    except Exception as e:
+        print(f"Error querying Komga status: {e}")
+        db.rollback()
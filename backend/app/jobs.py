@@ -0,0 +1,307 @@
+"""
+后台任务
+
+POST /api/feeds/{id}/fetch 和 POST /api/feeds/fetch-all 不再在请求中等待抓取完成，
+而是创建一条 jobs 记录并立即返回任务 ID，客户端通过 GET /api/jobs/{id} 查询进度。
+
+POST /api/feeds 只保存 Feed 就返回，首次抓取入库、favicon 和缩略图作为 feed_create
+任务的各个阶段（stage: fetch → favicon → thumbnails → done）在后台执行。
+OPML 导入的 Feed 同样在后台完成首次抓取和 favicon（opml_import 任务），
+每个 Feed 的结果记录在 results 中。
+
+- 抓取提交到与调度器共用的抓取线程池（app.fetcher.submit_feed_fetch），
+  已经在抓取中的 Feed 直接复用正在进行的抓取，不会重复请求；
+  其他进程（例如 leader 的调度器）正在抓取时等待其完成，不再重复抓取（见 app.fetcher）
+- 任务状态写在数据库中，多进程部署时任意进程都能查询
+- 进程在任务完成前退出时任务会停留在 running，超过 JOB_RETENTION_HOURS 后被清理
+"""
+import os
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, Feed, FeedItem, Job, db_write_lock
+from app.favicon_fetcher import get_favicon_url
+from app.fetcher import submit_feed_fetch
+from app.thumbnails import STATUS_DONE, wait_for_feed
+
+# 已完成任务的保留时间（小时）
+JOB_RETENTION_HOURS = int(os.getenv("JOB_RETENTION_HOURS", "24"))
+# 同时执行的新建 Feed 任务数（抓取本身仍受 FETCH_CONCURRENCY 限制）
+JOB_WORKERS = max(1, int(os.getenv("JOB_WORKERS", "4")))
+# 新建 Feed 任务等待首批缩略图的最长时间（秒），超时后任务照常结束，缩略图继续在队列中生成
+JOB_THUMBNAIL_WAIT_SECONDS = 300
+
+_job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+
+
+def _create_job(db: Session, job_type: str, feed_ids: list[str], feed_id: Optional[str] = None) -> Job:
+    job = Job(
+        id=str(uuid.uuid4()),
+        type=job_type,
+        feed_id=feed_id,
+        status="running" if feed_ids else "succeeded",
+        total=len(feed_ids),
+        completed=0,
+        failed=0,
+        new_items=0,
+        not_modified=0,
+        finished_at=None if feed_ids else datetime.utcnow(),
+    )
+    with db_write_lock:
+        db.add(job)
+        db.commit()
+    db.refresh(job)
+
+    # 任务记录提交之后再提交抓取，回调里才能查到任务
+    for target_id in feed_ids:
+        future = submit_feed_fetch(target_id)
+        future.add_done_callback(lambda f, job_id=job.id: _on_fetch_done(job_id, f))
+    return job
+
+
+def start_feed_refresh(db: Session, feed_id: str) -> Job:
+    """刷新单个 Feed"""
+    return _create_job(db, "feed_refresh", [feed_id], feed_id=feed_id)
+
+
+def start_refresh_all(db: Session) -> Job:
+    """刷新所有启用的 Feed"""
+    feed_ids = [feed_id for (feed_id,) in db.query(Feed.id).filter(Feed.is_active == True).all()]
+    return _create_job(db, "refresh_all", feed_ids)
+
+
+def _fetch_result(future: Future) -> dict:
+    try:
+        return future.result()
+    except Exception as e:
+        return {'error': str(e), 'new_items': 0, 'not_modified': False, 'feed_info': None}
+
+
+def _apply_fetch_stats(job: Job, stats: dict):
+    job.completed += 1
+    job.new_items += stats['new_items']
+    if stats['not_modified']:
+        job.not_modified += 1
+    if stats['error']:
+        job.failed += 1
+        job.error = stats['error'][:500]
+
+
+def _finish(job: Job):
+    job.status = "failed" if job.failed else "succeeded"
+    job.finished_at = datetime.utcnow()
+
+
+def _on_fetch_done(job_id: str, future: Future):
+    """累加单个 Feed 的抓取结果，全部完成后结束任务"""
+    stats = _fetch_result(future)
+
+    db = SessionLocal()
+    try:
+        with db_write_lock:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if not job:
+                return
+            _apply_fetch_stats(job, stats)
+            if job.completed >= job.total:
+                # 单个 Feed 的任务以抓取结果为准；全量刷新只要跑完就算成功，失败数见 failed
+                job.status = "failed" if job.type == "feed_refresh" and job.failed else "succeeded"
+                job.finished_at = datetime.utcnow()
+            db.commit()
+    except Exception as e:
+        print(f"Failed to update job {job_id}: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def start_feed_create(db: Session, feed: Feed) -> Job:
+    """新建 Feed 之后的首次抓取、favicon 和缩略图"""
+    job = Job(
+        id=str(uuid.uuid4()),
+        type="feed_create",
+        feed_id=feed.id,
+        status="running",
+        stage="fetch",
+        total=1,
+        completed=0,
+        failed=0,
+        new_items=0,
+        not_modified=0,
+        images_processed=0,
+    )
+    with db_write_lock:
+        db.add(job)
+        db.commit()
+    db.refresh(job)
+    _job_executor.submit(_run_feed_create, job.id, feed.id, feed.title)
+    return job
+
+
+def _apply_first_fetch(db: Session, feed_id: str, placeholder_title: Optional[str], stats: dict) -> Optional[Feed]:
+    """
+    用首次抓取解析出的信息补全 Feed。标题只在仍是 placeholder_title 时替换
+    （期间被用户改过或导入时自带的标题保留）。Feed 已被删除时返回 None。
+    """
+    feed = db.query(Feed).filter(Feed.id == feed_id).first()
+    feed_info = stats.get('feed_info')
+    if feed is not None and feed_info:
+        if placeholder_title is not None and feed.title == placeholder_title and feed_info.get('title'):
+            feed.title = feed_info['title']
+        feed.site_url = feed_info.get('site_url') or feed.site_url
+        feed.description = feed.description or feed_info.get('description')
+    return feed
+
+
+def _resolve_favicon(db: Session, feed_id: str, site_url: Optional[str]):
+    """获取 favicon（最多几次 5 秒超时的探测，不持有写库锁）"""
+    favicon_url = None
+    if site_url:
+        try:
+            favicon_url = get_favicon_url(site_url)
+        except Exception as e:
+            print(f"Warning: Failed to fetch favicon: {e}")
+    with db_write_lock:
+        feed = db.query(Feed).filter(Feed.id == feed_id).first()
+        if feed is not None and favicon_url:
+            feed.favicon = favicon_url
+            db.commit()
+
+
+def _run_feed_create(job_id: str, feed_id: str, placeholder_title: str):
+    db = SessionLocal()
+    try:
+        # 1. 首次抓取 + 入库（与调度器共用抓取线程池，缩略图由缩略图队列生成）
+        stats = _fetch_result(submit_feed_fetch(feed_id))
+        with db_write_lock:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            _apply_fetch_stats(job, stats)
+            feed = _apply_first_fetch(db, feed_id, placeholder_title, stats)
+            if feed is None:
+                job.error = "Feed was deleted"
+                job.stage = "done"
+                _finish(job)
+                db.commit()
+                return
+            job.stage = "favicon"
+            db.commit()
+            site_url = feed.site_url
+
+        # 2. favicon
+        _resolve_favicon(db, feed_id, site_url)
+        with db_write_lock:
+            job.stage = "thumbnails"
+            db.commit()
+
+        # 3. 等待首次入库的条目完成第一次缩略图尝试（新条目在队列中优先处理）
+        if not wait_for_feed(db, feed_id, JOB_THUMBNAIL_WAIT_SECONDS):
+            print(f"Feed creation job {job_id}: thumbnails still pending after {JOB_THUMBNAIL_WAIT_SECONDS}s")
+        images_processed = db.query(FeedItem.id).filter(
+            FeedItem.feed_id == feed_id,
+            FeedItem.thumbnail_status == STATUS_DONE,
+        ).count()
+        with db_write_lock:
+            job.images_processed = images_processed
+            job.stage = "done"
+            _finish(job)
+            db.commit()
+    except Exception as e:
+        print(f"Error running feed creation job {job_id}: {e}")
+        db.rollback()
+        _mark_failed(db, job_id, str(e))
+    finally:
+        db.close()
+
+
+def _mark_failed(db: Session, job_id: str, error: str):
+    with db_write_lock:
+        db.query(Job).filter(Job.id == job_id).update({
+            Job.status: "failed",
+            Job.error: error[:500],
+            Job.finished_at: datetime.utcnow(),
+        }, synchronize_session=False)
+        db.commit()
+
+
+def start_opml_import(db: Session, feeds: list[Feed], placeholder_titles: dict[str, str]) -> Job:
+    """
+    OPML 导入的 Feed 已经在一个事务中写入，这里对每个 Feed 执行首次抓取和 favicon，
+    最多同时处理 JOB_WORKERS 个，结果逐个记录在 job.results 中。
+
+    placeholder_titles: feed_id -> 根据 URL 生成的标题（OPML 中没有标题的 Feed），
+    首次抓取后替换为 Feed 自身的标题
+    """
+    job = Job(
+        id=str(uuid.uuid4()),
+        type="opml_import",
+        status="running" if feeds else "succeeded",
+        total=len(feeds),
+        completed=0,
+        failed=0,
+        new_items=0,
+        not_modified=0,
+        results=[],
+        finished_at=None if feeds else datetime.utcnow(),
+    )
+    with db_write_lock:
+        db.add(job)
+        db.commit()
+    db.refresh(job)
+
+    for feed in feeds:
+        _job_executor.submit(_run_import_feed, job.id, feed.id, feed.url, placeholder_titles.get(feed.id))
+    return job
+
+
+def _run_import_feed(job_id: str, feed_id: str, url: str, placeholder_title: Optional[str]):
+    db = SessionLocal()
+    title = url
+    try:
+        stats = _fetch_result(submit_feed_fetch(feed_id))
+        with db_write_lock:
+            feed = _apply_first_fetch(db, feed_id, placeholder_title, stats)
+            db.commit()
+        if feed is not None:
+            title = feed.title
+            _resolve_favicon(db, feed_id, feed.site_url)
+    except Exception as e:
+        print(f"Error importing feed {url} for job {job_id}: {e}")
+        db.rollback()
+        stats = {'error': str(e), 'new_items': 0, 'not_modified': False}
+
+    try:
+        with db_write_lock:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            _apply_fetch_stats(job, stats)
+            job.results = (job.results or []) + [{
+                'feedId': feed_id,
+                'url': url,
+                'title': title,
+                'success': not stats['error'],
+                'newItems': stats['new_items'],
+                'error': stats['error'],
+            }]
+            if job.completed >= job.total:
+                # 和全量刷新一样，跑完即成功，失败的 Feed 见 failed 和 results
+                job.status = "succeeded"
+                job.finished_at = datetime.utcnow()
+            db.commit()
+    except Exception as e:
+        print(f"Failed to update job {job_id}: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def prune_jobs(db: Session):
+    """清理超过保留时间的任务"""
+    cutoff = datetime.utcnow() - timedelta(hours=JOB_RETENTION_HOURS)
+    with db_write_lock:
+        deleted = db.query(Job).filter(Job.created_at < cutoff).delete(synchronize_session=False)
+        db.commit()
+    if deleted:
+        print(f"Pruned {deleted} jobs")
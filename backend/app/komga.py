@@ -0,0 +1,165 @@
+"""
+Hentai Assistant / Komga 库存查询
+
+抓取流程和 API 路由共用的 Komga 相关工具函数。
+"""
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.database import FeedItem, PresetIntegration
+from app.http_client import get_http_client
+
+# Hentai Assistant 支持的域名列表（统一配置）
+HENTAI_ASSISTANT_DOMAINS = [
+    'e-hentai.org',
+    'exhentai.org',
+    'hdoujin.org',
+    'nhentai.net',
+]
+
+
+def is_hentai_assistant_compatible_url(url: str) -> bool:
+    """
+    检查 URL 是否属于 Hentai Assistant 支持的域名。
+
+    Args:
+        url: 要检查的 URL
+
+    Returns:
+        如果 URL 匹配支持的域名则返回 True，否则返回 False
+    """
+    if not url:
+        return False
+
+    url_lower = url.lower()
+    return any(domain in url_lower for domain in HENTAI_ASSISTANT_DOMAINS)
+
+
+def get_komga_api_url(db: Session) -> Optional[str]:
+    """
+    返回可用于 Komga 查询的 Hentai Assistant API URL。
+    预设未启用、未配置 API URL 或关闭了 Komga 查询开关时返回 None。
+    """
+    ha_preset = db.query(PresetIntegration).filter(
+        PresetIntegration.id == 'hentai-assistant',
+        PresetIntegration.enabled == True
+    ).first()
+
+    if not ha_preset or not ha_preset.api_url:
+        return None
+
+    # 检查 Komga 查询开关是否启用
+    enable_komga_query = True  # 默认启用
+    if ha_preset.config:
+        try:
+            config = json.loads(ha_preset.config)
+            enable_komga_query = config.get('enable_komga_query', True)
+        except:
+            pass
+
+    return ha_preset.api_url if enable_komga_query else None
+
+
+def query_komga_status(api_url: str, urls: list[str]) -> dict:
+    """
+    调用 Hentai Assistant 的 Komga 索引查询接口（同步，使用共享连接池）。
+
+    Args:
+        api_url: Hentai Assistant API 基础 URL
+        urls: 要查询的 URL 列表
+
+    Returns:
+        查询结果字典，包含 summary 和 results
+    """
+    if not api_url or not urls:
+        return {"summary": {"total": 0, "found": 0, "missing": 0}, "results": {}}
+
+    query_url = f"{api_url.rstrip('/')}/api/komga/index/query"
+
+    try:
+        response = get_http_client().post(
+            query_url,
+            json={"urls": urls},
+            headers={"Content-Type": "application/json"},
+            timeout=30.0,
+        )
+        response.raise_for_status()
+        return response.json()
+    except Exception as e:
+        print(f"Error querying Komga status: {e}")
+        return {"summary": {"total": 0, "found": 0, "missing": 0}, "results": {}}
+
+
+def apply_komga_results(items: list[FeedItem], result: dict) -> int:
+    """
+    将 Komga 查询结果写入条目（不提交事务）。
+
+    Returns:
+        查询结果中包含的条目数
+    """
+    now = datetime.utcnow()
+    updated_count = 0
+
+    for item in items:
+        if not item.link:
+            continue
+
+        item_result = result.get("results", {}).get(item.link)
+        if item_result is not None:
+            # 1 = 已收录, 2 = 未收录, 3 = 下载中
+            # Komga API 返回的字段名是 "found"，不是 "status"
+            if item_result.get("found"):
+                # 已入库，更新为 1
+                item.komga_status = 1
+            elif item.komga_status == 3:
+                # 原状态是"下载中"且仍未入库，保持为 3（继续等待）
+                pass
+            else:
+                # 普通情况，标记为不在库
+                item.komga_status = 2
+            item.komga_sync_at = now
+            updated_count += 1
+        else:
+            # 查询失败或未返回结果
+            if item.komga_status != 3:
+                # 只有非"下载中"状态才标记为不在库
+                item.komga_status = 2
+            item.komga_sync_at = now
+
+    return updated_count
+
+
+async def update_items_komga_status(db: Session, items: list[FeedItem], api_url: str):
+    """
+    批量更新条目的 Komga 状态。
+
+    Args:
+        db: 数据库会话
+        items: 要更新的 FeedItem 列表
+        api_url: Hentai Assistant API 基础 URL
+    """
+    if not items or not api_url:
+        return
+
+    # 收集所有需要查询的 URL
+    urls = [item.link for item in items if item.link]
+    if not urls:
+        return
+
+    # 调用 Komga 查询接口
+    try:
+        result = await run_in_threadpool(query_komga_status, api_url, urls)
+    except Exception as e:
+        print(f"Failed to query Komga status: {e}")
+        return
+
+    # 更新数据库
+    updated_count = apply_komga_results(items, result)
+
+    if updated_count > 0:
+        db.commit()
+        print(f"Updated Komga status for {updated_count} items")
@@ -0,0 +1,99 @@
+"""
+后台任务的单 leader 选举
+
+`uvicorn --workers N` 会启动多个进程，每个进程都会执行 startup 事件。
+为了避免多个进程同时调度抓取、重复处理图片，只有持有 DATA_DIR 下文件锁的进程
+（leader）运行调度器，其余进程只处理 API 请求。
+
+- 文件锁由操作系统在进程退出（包括崩溃、被 kill）时自动释放
+- 非 leader 进程每隔 LEADER_RETRY_SECONDS 尝试获取一次锁，leader 退出后自动接管
+- 共享同一个 DATA_DIR 的多个容器之间同样有效（同一主机上的挂载目录）
+"""
+import os
+import threading
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DATA_DIR = os.getenv("DATA_DIR", "./data")
+LEADER_LOCK_FILE = os.getenv("LEADER_LOCK_FILE", os.path.join(DATA_DIR, "scheduler.lock"))
+# 非 leader 进程尝试接管的间隔（秒）
+LEADER_RETRY_SECONDS = int(os.getenv("LEADER_RETRY_SECONDS", "15"))
+
+
+def _try_lock(fd: int) -> bool:
+    """非阻塞地获取排他锁"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+class LeaderElection:
+    """基于文件锁的 leader 选举，当选后调用 on_elected"""
+
+    def __init__(self, lock_path: str = LEADER_LOCK_FILE, retry_seconds: int = LEADER_RETRY_SECONDS):
+        self.lock_path = lock_path
+        self.retry_seconds = retry_seconds
+        self._fd: Optional[int] = None
+        self._on_elected: Optional[Callable[[], None]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fd is not None
+
+    def _acquire(self) -> bool:
+        os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        if not _try_lock(fd):
+            os.close(fd)
+            return False
+
+        # 记录 leader 的 PID，便于排查
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        print(f"Process {os.getpid()} became the background job leader")
+        return True
+
+    def start(self, on_elected: Callable[[], None]):
+        """尝试成为 leader；失败时在后台线程中定期重试"""
+        self._on_elected = on_elected
+        self._stop.clear()
+        if self._acquire():
+            on_elected()
+            return
+
+        print(f"Process {os.getpid()} is serving API requests only, "
+              f"another process holds {self.lock_path}")
+        self._thread = threading.Thread(target=self._wait_for_leadership, name="leader-election", daemon=True)
+        self._thread.start()
+
+    def _wait_for_leadership(self):
+        while not self._stop.wait(self.retry_seconds):
+            if self._acquire():
+                try:
+                    self._on_elected()
+                except Exception as e:
+                    print(f"Failed to start background jobs after taking over leadership: {e}")
+                return
+
+    def stop(self):
+        """停止等待并释放锁（进程退出时锁也会自动释放）"""
+        self._stop.set()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+leader_election = LeaderElection()
@@ -1,43 +1,36 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, UploadFile, File, Request, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, PlainTextResponse, Response, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
-from apscheduler.schedulers.background import BackgroundScheduler
 from typing import Optional
 import uuid
 import json
 import os
 from datetime import datetime
 
-from app.database import get_db, init_db, Feed, FeedItem, FeedReadStatus, Integration, PresetIntegration
-from app.schemas import FeedCreate, FeedUpdate, FeedResponse, FeedItemResponse, FeedBriefResponse, ItemsListResponse, IntegrationCreate, IntegrationUpdate, IntegrationResponse, PresetIntegrationUpdate, PresetIntegrationResponse
-from app.rss_parser import parse_rss_feed, download_and_process_image
+from app.database import get_db, prepare_database, SessionLocal, Feed, FeedItem, FetchRun, Job, FeedReadStatus, Integration, PresetIntegration
+from app.schemas import FeedCreate, FeedUpdate, FeedResponse, FeedItemResponse, FeedBriefResponse, ItemsListResponse, IntegrationCreate, IntegrationUpdate, IntegrationResponse, PresetIntegrationUpdate, PresetIntegrationResponse, FetchRunResponse, FetchStatsResponse, JobResponse
+from app.rss_parser import parse_rss_feed, download_and_process_image, shutdown_parse_pool, THUMBNAIL_WIDTH
 from app.favicon_fetcher import get_favicon_url
 from app.auth import auth_router, auth_middleware
+from app.scheduler import feed_scheduler
+from app.leader import leader_election
+from app.thumbnails import thumbnail_queue, STATUS_DONE
+from app.image_variants import THUMB_PATH, available_widths, get_variant, image_hash_of, is_valid_hash, max_width
+from app.fetch_history import get_fetch_stats, build_fetch_run, finish_fetch_run
+from app.ingest import ingest_entries, get_known_guids
+from app.komga import update_items_komga_status
+from app.jobs import start_feed_create, start_feed_refresh, start_refresh_all, start_opml_import
+from app.opml import parse_opml, iter_opml
+from app.fetcher import submit_pushed_content
+from app.websub import CALLBACK_PATH, MAX_PUSH_BYTES, verify_intent, verify_signature, unsubscribe
+from app.backoff import record_fetch_success
+from app.http_client import open_http_clients, close_http_clients, get_async_client
+from app.metrics import metrics_middleware, metrics_endpoint
+from app.image_cache import cache_access_middleware, flush_touches, start_reconcile_if_empty, touch
 
-# Hentai Assistant 支持的域名列表（统一配置）
-HENTAI_ASSISTANT_DOMAINS = [
-    'e-hentai.org',
-    'exhentai.org',
-    'hdoujin.org',
-    'nhentai.net',
-]
-
-def is_hentai_assistant_compatible_url(url: str) -> bool:
-    """
-    检查 URL 是否属于 Hentai Assistant 支持的域名。
-    
-    Args:
-        url: 要检查的 URL
-    
-    Returns:
-        如果 URL 匹配支持的域名则返回 True，否则返回 False
-    """
-    if not url:
-        return False
-    
-    url_lower = url.lower()
-    return any(domain in url_lower for domain in HENTAI_ASSISTANT_DOMAINS)
 
 app = FastAPI(title="RSS Image Wall API")
 
@@ -53,355 +46,60 @@ app.add_middleware(
 # Auth middleware（在 CORS 之后添加，确保 Cookie 跨域正常）
 app.middleware("http")(auth_middleware)
 
+# 记录缩略图的访问时间，缓存按最后访问时间清理
+app.middleware("http")(cache_access_middleware)
+
+# 请求耗时指标（最外层，包含认证失败的请求）
+app.middleware("http")(metrics_middleware)
+
 # Auth routes
 app.include_router(auth_router)
 
+# Prometheus 指标，设置 METRICS_TOKEN 后需要 Bearer Token
+app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+
 # Static files
 DATA_DIR = os.getenv("DATA_DIR", "./data")
 UPLOAD_DIR = os.path.join(DATA_DIR, "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
 
-# 条目清理配置：每个 Feed 最多保留的条目数，默认 1000 条，设为 0 表示不限制
-MAX_ITEMS_PER_FEED = int(os.getenv("MAX_ITEMS_PER_FEED", "1000"))
 
+# 是否在 API 进程中运行后台任务（抓取调度、缩略图等），拆分部署时设为 false
+BACKGROUND_JOBS = os.getenv("BACKGROUND_JOBS", "true").lower() in ("1", "true", "yes")
 
-# Initialize database
-@app.on_event("startup")
-def startup_event():
-    # First, ensure basic tables exist (safe fallback)
-    try:
-        init_db()
-        print("Database tables initialized")
-    except Exception as e:
-        print(f"Warning: Basic table creation had issues: {e}")
-    
-    # Then run Alembic migrations for schema updates
-    try:
-        from alembic.config import Config
-        from alembic import command
-        import os
-        
-        # Get the backend directory path
-        backend_dir = os.path.dirname(os.path.dirname(__file__))
-        alembic_cfg = Config(os.path.join(backend_dir, "alembic.ini"))
-        
-        print("Running database migrations...")
-        command.upgrade(alembic_cfg, "head")
-        print("Database migrations completed successfully")
-    except Exception as e:
-        print(f"Note: Database migration skipped or failed: {e}")
-        print("Using current database schema")
-    
-    # Fetch feeds on startup
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(fetch_all_feeds, 'interval', minutes=int(os.getenv("FETCH_INTERVAL_MINUTES", "30")))
-    scheduler.start()
-    
-    # Initial fetch after 2 seconds (wrapped in try-except to prevent startup blocking)
-    def safe_initial_fetch():
-        try:
-            fetch_all_feeds()
-        except Exception as e:
-            print(f"Error during initial feed fetch (non-blocking): {e}")
-    
-    import threading
-    threading.Timer(2.0, safe_initial_fetch).start()
 
-
-def cleanup_old_items(db: Session, feed_id: str):
-    """
-    清理指定 Feed 的旧条目，只保留最新的 MAX_ITEMS_PER_FEED 条。
-    采用消极策略：只在超过限制的 120% 时才清理，避免频繁操作。
-    """
-    if MAX_ITEMS_PER_FEED <= 0:
-        return  # 不限制
-    
-    item_count = db.query(FeedItem).filter(FeedItem.feed_id == feed_id).count()
-    
-    # 只有超过限制的 120% 才触发清理（消极策略）
-    threshold = int(MAX_ITEMS_PER_FEED * 1.2)
-    if item_count <= threshold:
-        return
-    
-    # 获取需要删除的条目（最旧的）
-    items_to_delete = item_count - MAX_ITEMS_PER_FEED
-    old_items = db.query(FeedItem).filter(
-        FeedItem.feed_id == feed_id
-    ).order_by(
-        FeedItem.published_at.asc()
-    ).limit(items_to_delete).all()
-    
-    if old_items:
-        deleted_ids = [item.id for item in old_items]
-        db.query(FeedItem).filter(FeedItem.id.in_(deleted_ids)).delete(synchronize_session=False)
-        db.commit()
-        print(f"Cleaned up {len(deleted_ids)} old items from feed {feed_id}")
-
-
-def process_feed_images(feed_id: str):
-    """Background task to process images for a feed"""
-    db = next(get_db())
-    try:
-        items = db.query(FeedItem).filter(
-            FeedItem.feed_id == feed_id,
-            FeedItem.thumbnail_image == None,
-            FeedItem.cover_image != None
-        ).all()
-        
-        for item in items:
-            try:
-                thumbnail_path = download_and_process_image(item.cover_image)
-                if thumbnail_path:
-                    item.thumbnail_image = thumbnail_path
-                    db.commit()
-            except Exception as e:
-                print(f"Error processing image for item {item.id}: {e}")
-                db.rollback()
-    finally:
-        db.close()
-
-
-def retry_failed_images(db: Session, feed_id: str, max_retries: int = 5):
-    """
-    重试下载之前失败的图片。
-    只处理有 cover_image 但没有 thumbnail_image 的条目。
-    每次最多重试 max_retries 个，避免阻塞太久。
-    """
-    failed_items = db.query(FeedItem).filter(
-        FeedItem.feed_id == feed_id,
-        FeedItem.cover_image != None,
-        FeedItem.thumbnail_image == None
-    ).limit(max_retries).all()
-    
-    if not failed_items:
-        return
-    
-    retried = 0
-    success = 0
-    for item in failed_items:
-        try:
-            thumbnail_path = download_and_process_image(item.cover_image)
-            if thumbnail_path:
-                item.thumbnail_image = thumbnail_path
-                success += 1
-            retried += 1
-        except Exception as e:
-            print(f"Retry failed for item {item.id}: {e}")
-            retried += 1
-    
-    if retried > 0:
-        db.commit()
-        print(f"Retried {retried} failed images, {success} succeeded for feed {feed_id}")
-
-
-async def query_komga_status(api_url: str, urls: list[str]) -> dict:
-    """
-    调用 Hentai Assistant 的 Komga 索引查询接口。
-    
-    Args:
-        api_url: Hentai Assistant API 基础 URL
-        urls: 要查询的 URL 列表
-    
-    Returns:
-        查询结果字典，包含 summary 和 results
-    """
-    import httpx
-    
-    if not api_url or not urls:
-        return {"summary": {"total": 0, "found": 0, "missing": 0}, "results": {}}
-    
-    query_url = f"{api_url.rstrip('/')}/api/komga/index/query"
-    
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                query_url,
-                json={"urls": urls},
-                headers={"Content-Type": "application/json"}
-            )
-            response.raise_for_status()
-            return response.json()
-    except Exception as e:
-        print(f"Error querying Komga status: {e}")
-        return {"summary": {"total": 0, "found": 0, "missing": 0}, "results": {}}
+def start_background_jobs():
+    """当选 leader 后启动抓取调度器和缩略图队列"""
+    feed_scheduler.start()
+    thumbnail_queue.start()
+    start_reconcile_if_empty()
 
 
-async def update_items_komga_status(db: Session, items: list[FeedItem], api_url: str):
-    """
-    批量更新条目的 Komga 状态。
-    
-    Args:
-        db: 数据库会话
-        items: 要更新的 FeedItem 列表
-        api_url: Hentai Assistant API 基础 URL
-    """
-    if not items or not api_url:
-        return
-    
-    # 收集所有需要查询的 URL
-    urls = [item.link for item in items if item.link]
-    if not urls:
-        return
-    
-    # 调用 Komga 查询接口
-    try:
-        result = await query_komga_status(api_url, urls)
-    except Exception as e:
-        print(f"Failed to query Komga status: {e}")
-        return
-    
-    # 更新数据库
-    now = datetime.utcnow()
-    updated_count = 0
+# Initialize database
+@app.on_event("startup")
+def startup_event():
+    prepare_database()
     
-    for item in items:
-        if not item.link:
-            continue
-        
-        item_result = result.get("results", {}).get(item.link)
-        if item_result is not None:
-            # 1 = 已收录, 2 = 未收录, 3 = 下载中
-            # Komga API 返回的字段名是 "found"，不是 "status"
-            if item_result.get("found"):
-                # 已入库，更新为 1
-                item.komga_status = 1
-            elif item.komga_status == 3:
-                # 原状态是"下载中"且仍未入库，保持为 3（继续等待）
-                pass
-            else:
-                # 普通情况，标记为不在库
-                item.komga_status = 2
-            item.komga_sync_at = now
-            updated_count += 1
-        else:
-            # 查询失败或未返回结果
-            if item.komga_status != 3:
-                # 只有非"下载中"状态才标记为不在库
-                item.komga_status = 2
-            item.komga_sync_at = now
+    # 共享 HTTP 连接池（Feed、图片、favicon、Komga、代理共用）
+    open_http_clients()
     
-    if updated_count > 0:
-        db.commit()
-        print(f"Updated Komga status for {updated_count} items")
+    # 按 Feed 的 update_interval 调度抓取（启动时已过期的 Feed 会分散抓取），并运行缩略图队列
+    # 多进程部署时只有 leader 进程运行调度器和缩略图队列，其他进程只处理 API 请求
+    # BACKGROUND_JOBS=false 时由独立的 worker 进程（python -m app.worker）负责
+    if BACKGROUND_JOBS:
+        leader_election.start(on_elected=start_background_jobs)
+    else:
+        print("Background jobs disabled (BACKGROUND_JOBS=false), run `python -m app.worker` separately")
 
 
-def fetch_all_feeds():
-    """Background task to fetch all active feeds"""
-    try:
-        db = next(get_db())
-    except Exception as e:
-        print(f"Failed to get database connection for feed fetching: {e}")
-        return
-    
-    try:
-        feeds = db.query(Feed).filter(Feed.is_active == True).all()
-        print(f"Fetching {len(feeds)} feeds...")
-        
-        for feed in feeds:
-            try:
-                print(f"Fetching feed: {feed.title}")
-                result = parse_rss_feed(feed.url)
-                
-                new_items = 0
-                new_items_list = []  # 收集本次新添加的条目
-                for entry_data in result['entries']:
-                    # Check if item already exists (优先使用 guid,后备使用 link)
-                    existing = None
-                    if entry_data.get('guid'):
-                        existing = db.query(FeedItem).filter(FeedItem.guid == entry_data['guid']).first()
-                    if not existing and entry_data.get('link'):
-                        existing = db.query(FeedItem).filter(FeedItem.link == entry_data['link']).first()
-                    if existing:
-                        continue
-                    
-                    # Download and process image
-                    thumbnail_path = None
-                    if entry_data.get('cover_image'):
-                        thumbnail_path = download_and_process_image(entry_data['cover_image'])
-                    
-                    # Create new item
-                    item = FeedItem(
-                        id=str(uuid.uuid4()),
-                        feed_id=feed.id,
-                        title=entry_data['title'],
-                        guid=entry_data.get('guid'),
-                        link=entry_data['link'],
-                        description=entry_data.get('description'),
-                        content=entry_data.get('content'),
-                        cover_image=entry_data.get('cover_image'),
-                        thumbnail_image=thumbnail_path,
-                        author=entry_data.get('author'),
-                        categories=json.dumps(entry_data.get('categories', [])),
-                        published_at=entry_data['published_at'],
-                    )
-                    db.add(item)
-                    new_items_list.append(item)  # 收集新添加的条目
-                    new_items += 1
-                
-                # Update feed's last_fetched_at and clear error
-                feed.last_fetched_at = datetime.utcnow()
-                feed.last_fetch_error = None  # 清除错误状态
-                db.commit()
-                
-                print(f"Added {new_items} new items from {feed.title}")
-                
-                # 查询新记录的 Komga 状态（仅本次新添加的记录）
-                if new_items > 0 and new_items_list:
-                    try:
-                        # 检查 Hentai Assistant 预设是否启用
-                        ha_preset = db.query(PresetIntegration).filter(
-                            PresetIntegration.id == 'hentai-assistant',
-                            PresetIntegration.enabled == True
-                        ).first()
-                        
-                        if ha_preset and ha_preset.api_url:
-                            # 检查 Komga 查询开关是否启用
-                            enable_komga_query = True  # 默认启用
-                            if ha_preset.config:
-                                try:
-                                    config = json.loads(ha_preset.config)
-                                    enable_komga_query = config.get('enable_komga_query', True)
-                                except:
-                                    pass
-                            
-                            if enable_komga_query:
-                                # 过滤出支持的域名
-                                compatible_items = [
-                                    item for item in new_items_list 
-                                    if is_hentai_assistant_compatible_url(item.link)
-                                ]
-                                
-                                if compatible_items:
-                                    print(f"Querying Komga status for {len(compatible_items)}/{len(new_items_list)} compatible items...")
-                                    update_items_komga_status(db, compatible_items, ha_preset.api_url)
-                                else:
-                                    print(f"No compatible URLs found in {len(new_items_list)} new items")
-                            else:
-                                print("Komga query is disabled in settings")
-                    except Exception as e:
-                        print(f"Error querying Komga status: {e}")
-                        # 不影响主流程，继续执行
-                
-                # 重试之前失败的图片（每次最多 5 个）
-                retry_failed_images(db, feed.id)
-                
-                # 清理旧条目（消极策略，超过 120% 才清理）
-                cleanup_old_items(db, feed.id)
-                
-            except Exception as e:
-                error_msg = str(e)
-                print(f"Error fetching feed {feed.title}: {error_msg}")
-                db.rollback()
-                # 记录错误状态
-                try:
-                    feed.last_fetch_error = error_msg[:500]  # 限制错误信息长度
-                    feed.last_fetched_at = datetime.utcnow()
-                    db.commit()
-                except:
-                    db.rollback()
-    finally:
-        db.close()
+@app.on_event("shutdown")
+async def shutdown_event():
+    feed_scheduler.shutdown()
+    thumbnail_queue.shutdown()
+    leader_election.stop()
+    shutdown_parse_pool()
+    await close_http_clients()
 
 
 # API Routes
@@ -411,6 +109,43 @@ def health_check():
     return {"status": "ok"}
 
 
+def _feed_response(
+    feed: Feed, items_count: Optional[int] = None, unread_count: Optional[int] = None, **extra
+) -> FeedResponse:
+    """从 ORM 对象构建 FeedResponse，列表、新建和更新接口返回相同的字段"""
+    # Parse enabled_integrations from JSON
+    enabled_integrations = None
+    if feed.enabled_integrations:
+        try:
+            enabled_integrations = json.loads(feed.enabled_integrations)
+        except:
+            enabled_integrations = None
+    
+    return FeedResponse(
+        id=feed.id,
+        title=feed.title,
+        url=feed.url,
+        site_url=feed.site_url,
+        description=feed.description,
+        favicon=feed.favicon,
+        category=feed.category,
+        update_interval=feed.update_interval,
+        poll_interval=feed.poll_interval,
+        last_fetched_at=feed.last_fetched_at,
+        last_fetch_error=feed.last_fetch_error,
+        consecutive_failures=feed.consecutive_failures or 0,
+        retry_at=feed.retry_at,
+        websub_status=feed.websub_status,
+        is_active=feed.is_active,
+        created_at=feed.created_at,
+        items_count=items_count,
+        unread_count=unread_count,
+        enabled_integrations=enabled_integrations,
+        click_action=feed.click_action or 'modal',
+        **extra,
+    )
+
+
 @app.get("/api/feeds", response_model=list[FeedResponse])
 def get_feeds(db: Session = Depends(get_db)):
     """Get all feeds with item counts and unread counts"""
@@ -426,40 +161,14 @@ def get_feeds(db: Session = Depends(get_db)):
             FeedItem.is_read == False
         ).count()
         
-        # Parse enabled_integrations from JSON
-        enabled_integrations = None
-        if feed.enabled_integrations:
-            try:
-                enabled_integrations = json.loads(feed.enabled_integrations)
-            except:
-                enabled_integrations = None
-        
-        feed_dict = {
-            "id": feed.id,
-            "title": feed.title,
-            "url": feed.url,
-            "site_url": feed.site_url,
-            "description": feed.description,
-            "favicon": feed.favicon,
-            "category": feed.category,
-            "update_interval": feed.update_interval,
-            "last_fetched_at": feed.last_fetched_at,
-            "last_fetch_error": feed.last_fetch_error,
-            "is_active": feed.is_active,
-            "created_at": feed.created_at,
-            "items_count": items_count,
-            "unread_count": unread_count,
-            "enabled_integrations": enabled_integrations,
-            "click_action": feed.click_action or 'modal',
-        }
-        result.append(FeedResponse(**feed_dict))
+        result.append(_feed_response(feed, items_count, unread_count))
     
     return result
 
 
 @app.post("/api/feeds", response_model=FeedResponse)
 def create_feed(feed_data: FeedCreate, db: Session = Depends(get_db)):
-    """Create a new feed and parse its content"""
+    """Create a new feed; the first fetch, favicon and thumbnails run as a background job"""
     from urllib.parse import urlparse
     
     # Check if feed already exists
@@ -467,39 +176,9 @@ def create_feed(feed_data: FeedCreate, db: Session = Depends(get_db)):
     if existing:
         raise HTTPException(status_code=400, detail="Feed URL already exists")
     
-    warning_message = None
-    fetch_error = None  # 用于记录到数据库的错误信息
-    feed_info = None
-    entries = []
-    
-    # Try to parse RSS feed
     try:
-        result = parse_rss_feed(feed_data.url)
-        feed_info = result['feed_info']
-        entries = result['entries']
-    except Exception as e:
-        # RSS 解析失败，但仍然创建订阅
-        error_str = str(e)
-        fetch_error = error_str[:500]  # 限制错误信息长度
-        warning_message = f"订阅已添加，但获取内容时出现问题: {error_str}。系统将在后续自动重试获取内容。"
-        print(f"Warning: Failed to parse RSS feed {feed_data.url}: {e}")
-        
-        # 使用 URL 生成默认信息
+        # 先用 URL 生成默认信息，首次抓取后由后台任务替换为 Feed 自身的标题和描述
         parsed_url = urlparse(feed_data.url)
-        feed_info = {
-            'title': parsed_url.netloc or feed_data.url,
-            'site_url': f"{parsed_url.scheme}://{parsed_url.netloc}" if parsed_url.netloc else None,
-            'description': None,
-        }
-    
-    try:
-        # Fetch favicon
-        favicon_url = None
-        if feed_info.get('site_url'):
-            try:
-                favicon_url = get_favicon_url(feed_info['site_url'])
-            except Exception as e:
-                print(f"Warning: Failed to fetch favicon: {e}")
         
         # Serialize enabled_integrations if provided
         enabled_integrations_json = None
@@ -509,88 +188,159 @@ def create_feed(feed_data: FeedCreate, db: Session = Depends(get_db)):
         # Create feed
         feed = Feed(
             id=str(uuid.uuid4()),
-            title=feed_info['title'],
+            title=parsed_url.netloc or feed_data.url,
             url=feed_data.url,
-            site_url=feed_info.get('site_url'),
-            description=feed_info.get('description'),
-            favicon=favicon_url,
+            site_url=f"{parsed_url.scheme}://{parsed_url.netloc}" if parsed_url.netloc else None,
             category=feed_data.category,
-            last_fetch_error=fetch_error,  # 记录首次抓取的错误状态
             enabled_integrations=enabled_integrations_json,
         )
         db.add(feed)
         db.commit()
         db.refresh(feed)
-        
-        # Parse and store entries (without processing images)
-        for entry_data in entries:
-            item = FeedItem(
-                id=str(uuid.uuid4()),
-                feed_id=feed.id,
-                title=entry_data['title'],
-                guid=entry_data.get('guid'),
-                link=entry_data['link'],
-                description=entry_data.get('description'),
-                content=entry_data.get('content'),
-                cover_image=entry_data.get('cover_image'),
-                thumbnail_image=None,  # Will be processed in background
-                author=entry_data.get('author'),
-                categories=json.dumps(entry_data.get('categories', [])),
-                published_at=entry_data['published_at'],
-            )
-            db.add(item)
-        
-        db.commit()
-        
-        # Process images in background (only if we have entries)
-        if entries:
-            import threading
-            threading.Thread(target=process_feed_images, args=(feed.id,)).start()
-        
-        # Parse enabled_integrations for response
-        response_enabled_integrations = None
-        if feed.enabled_integrations:
-            try:
-                response_enabled_integrations = json.loads(feed.enabled_integrations)
-            except:
-                response_enabled_integrations = None
-        
-        return FeedResponse(
-            id=feed.id,
-            title=feed.title,
-            url=feed.url,
-            site_url=feed.site_url,
-            description=feed.description,
-            favicon=feed.favicon,
-            category=feed.category,
-            update_interval=feed.update_interval,
-            last_fetched_at=feed.last_fetched_at,
-            last_fetch_error=feed.last_fetch_error,  # 返回错误状态
-            is_active=feed.is_active,
-            created_at=feed.created_at,
-            items_count=len(entries),
-            warning=warning_message,
-            enabled_integrations=response_enabled_integrations,
-            click_action=feed.click_action or 'modal',
-        )
-        
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=f"Failed to create feed: {str(e)}")
+    
+    # 首次抓取入库、favicon、缩略图在后台执行，进度见 GET /api/jobs/{id}
+    job = start_feed_create(db, feed)
+    
+    return _feed_response(feed, items_count=0, job_id=job.id)
+
+
+@app.post("/api/opml/import")
+def import_opml(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """
+    导入 OPML：所有新订阅在一个事务中写入，已存在的 URL 跳过；
+    首次抓取和 favicon 在后台并发执行，进度和每个 Feed 的结果见 GET /api/jobs/{id}
+    """
+    from urllib.parse import urlparse
+    
+    try:
+        entries = parse_opml(file.file.read())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    existing_urls = {url for (url,) in db.query(Feed.url).all()}
+    feeds = []
+    placeholder_titles = {}
+    skipped = []
+    for entry in entries:
+        if entry['url'] in existing_urls:
+            skipped.append(entry['url'])
+            continue
+        parsed_url = urlparse(entry['url'])
+        feed = Feed(
+            id=str(uuid.uuid4()),
+            title=entry['title'] or parsed_url.netloc,
+            url=entry['url'],
+            site_url=entry['site_url'] or f"{parsed_url.scheme}://{parsed_url.netloc}",
+            category=entry['category'],
+        )
+        if not entry['title']:
+            placeholder_titles[feed.id] = feed.title
+        feeds.append(feed)
+    
+    try:
+        db.add_all(feeds)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Failed to import feeds: {str(e)}")
+    
+    job = start_opml_import(db, feeds, placeholder_titles)
+    return {
+        "success": True,
+        "imported": len(feeds),
+        "skipped": skipped,
+        "jobId": job.id,
+    }
+
+
+@app.get("/api/opml/export")
+def export_opml():
+    """导出所有订阅为 OPML（流式输出）"""
+    def generate():
+        # 响应开始发送时请求的依赖已经清理，这里使用独立的会话
+        db = SessionLocal()
+        try:
+            feeds = db.query(Feed.title, Feed.url, Feed.site_url, Feed.category).order_by(
+                Feed.category, Feed.title
+            ).yield_per(200)
+            yield from iter_opml(feeds)
+        finally:
+            db.close()
+    
+    filename = f"rss-wall-{datetime.utcnow().strftime('%Y%m%d')}.opml"
+    return StreamingResponse(
+        generate(),
+        media_type="text/x-opml",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @app.delete("/api/feeds/{feed_id}")
-def delete_feed(feed_id: str, db: Session = Depends(get_db)):
+def delete_feed(feed_id: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """Delete a feed and its items"""
     feed = db.query(Feed).filter(Feed.id == feed_id).first()
     if not feed:
         raise HTTPException(status_code=404, detail="Feed not found")
     
+    # 取消 WebSub 订阅（响应返回后执行）
+    if feed.websub_hub and feed.websub_status in ('pending', 'subscribed'):
+        background_tasks.add_task(unsubscribe, feed.id, feed.websub_hub, feed.websub_topic)
+    
     db.delete(feed)
     db.commit()
     return {"success": True}
 
 
+@app.get(CALLBACK_PATH + "/{feed_id}", include_in_schema=False)
+def websub_verify(feed_id: str, request: Request, db: Session = Depends(get_db)):
+    """WebSub hub 验证订阅意图：确认时原样返回 hub.challenge"""
+    params = request.query_params
+    try:
+        lease_seconds = int(params.get("hub.lease_seconds") or 0)
+    except ValueError:
+        lease_seconds = 0
+    
+    if not verify_intent(db, feed_id, params.get("hub.mode", ""), params.get("hub.topic", ""), lease_seconds):
+        raise HTTPException(status_code=404, detail="Unknown subscription")
+    return PlainTextResponse(params.get("hub.challenge", ""))
+
+
+def _accept_websub_push(feed_id: str, body: bytes, signature: Optional[str], content_type: Optional[str]) -> Response:
+    db = SessionLocal()
+    try:
+        feed = db.query(Feed).filter(Feed.id == feed_id).first()
+        if not feed:
+            # 410 让 hub 停止推送
+            return Response(status_code=410)
+        secret = feed.websub_secret
+    finally:
+        db.close()
+    
+    # 签名不对时按规范仍返回 2xx，但丢弃内容
+    if not verify_signature(secret, body, signature):
+        print(f"Ignoring WebSub push with invalid signature for feed {feed_id}")
+        return Response(status_code=202)
+    
+    submit_pushed_content(feed_id, body, content_type)
+    return Response(status_code=202)
+
+
+@app.post(CALLBACK_PATH + "/{feed_id}", include_in_schema=False)
+async def websub_push(feed_id: str, request: Request):
+    """WebSub hub 推送的 Feed 内容，校验签名后在后台入库"""
+    if int(request.headers.get("content-length") or 0) > MAX_PUSH_BYTES:
+        return Response(status_code=413)
+    body = await request.body()
+    if len(body) > MAX_PUSH_BYTES:
+        return Response(status_code=413)
+    return await run_in_threadpool(
+        _accept_websub_push, feed_id, body, request.headers.get("X-Hub-Signature"), request.headers.get("Content-Type")
+    )
+
+
 @app.post("/api/items/mark-read")
 def mark_items_as_read(
     item_ids: list[str],
@@ -789,6 +539,8 @@ def get_favorite_items(
             "content": item.content,
             "cover_image": item.cover_image,
             "thumbnail_image": item.thumbnail_image,
+            "thumbnail_status": item.thumbnail_status,
+            "thumbnail_widths": available_widths(item.thumbnail_max_width),
             "author": item.author,
             "categories": item.categories,
             "published_at": item.published_at,
@@ -820,15 +572,28 @@ def update_feed(feed_id: str, feed_data: FeedUpdate, db: Session = Depends(get_d
     try:
         # If URL is being updated, parse the new feed
         if feed_data.url and feed_data.url != feed.url:
-            result = parse_rss_feed(feed_data.url)
+            started_at = datetime.utcnow()
+            result = parse_rss_feed(feed_data.url, known_guids=get_known_guids(db, feed.id))
             feed_info = result['feed_info']
             
-            feed.url = feed_data.url
-            # Only auto-update title if not manually provided
-            if feed_data.title is None:
-                feed.title = feed_info['title']
-            feed.site_url = feed_info.get('site_url')
-            feed.description = feed_info.get('description')
+            def apply_new_url(item_ids: list[str]):
+                feed.url = feed_data.url
+                # Only auto-update title if not manually provided
+                if feed_data.title is None:
+                    feed.title = feed_info['title']
+                feed.site_url = feed_info.get('site_url')
+                feed.description = feed_info.get('description')
+                feed.last_fetched_at = datetime.utcnow()
+                feed.etag = result.get('etag')
+                feed.last_modified = result.get('last_modified')
+                # 新地址可以正常获取，清除旧地址的失败计数和熔断
+                record_fetch_success(feed)
+                finish_fetch_run(fetch_run)
+            
+            # 新地址的当前条目和它的 ETag / Last-Modified 在同一事务中写入，
+            # 否则下次条件请求返回 304，这些条目永远不会入库
+            fetch_run = build_fetch_run(feed.id, started_at, result)
+            ingest_entries(db, feed.id, result['entries'], before_commit=apply_new_url, fetch_run=fetch_run)
             
             # Fetch new favicon
             if feed_info.get('site_url'):
@@ -851,96 +616,78 @@ def update_feed(feed_id: str, feed_data: FeedUpdate, db: Session = Depends(get_d
             if feed_data.click_action in ('modal', 'link'):
                 feed.click_action = feed_data.click_action
         
+        # Update update_interval if provided (1 分钟 ~ 7 天)
+        if feed_data.update_interval is not None:
+            if 1 <= feed_data.update_interval <= 10080:
+                feed.update_interval = feed_data.update_interval
+        
         db.commit()
         db.refresh(feed)
         
         items_count = db.query(FeedItem).filter(FeedItem.feed_id == feed.id).count()
+        unread_count = db.query(FeedItem).filter(
+            FeedItem.feed_id == feed.id,
+            FeedItem.is_read == False
+        ).count()
         
-        # Parse enabled_integrations from JSON
-        enabled_integrations = None
-        if feed.enabled_integrations:
-            try:
-                enabled_integrations = json.loads(feed.enabled_integrations)
-            except:
-                enabled_integrations = None
-        
-        return FeedResponse(
-            id=feed.id,
-            title=feed.title,
-            url=feed.url,
-            site_url=feed.site_url,
-            description=feed.description,
-            favicon=feed.favicon,
-            category=feed.category,
-            update_interval=feed.update_interval,
-            last_fetched_at=feed.last_fetched_at,
-            is_active=feed.is_active,
-            created_at=feed.created_at,
-            items_count=items_count,
-            enabled_integrations=enabled_integrations,
-            click_action=feed.click_action or 'modal',
-        )
+        return _feed_response(feed, items_count, unread_count)
         
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=f"Failed to update feed: {str(e)}")
 
 
-@app.post("/api/feeds/{feed_id}/fetch")
+@app.post("/api/feeds/fetch-all", response_model=JobResponse, status_code=202)
+def refresh_all_feeds(db: Session = Depends(get_db)):
+    """刷新所有启用的 Feed，立即返回任务，进度通过 GET /api/jobs/{id} 查询"""
+    return start_refresh_all(db)
+
+
+@app.post("/api/feeds/{feed_id}/fetch", response_model=JobResponse, status_code=202)
 def fetch_feed(feed_id: str, db: Session = Depends(get_db)):
     """Manually trigger feed fetch"""
     feed = db.query(Feed).filter(Feed.id == feed_id).first()
     if not feed:
         raise HTTPException(status_code=404, detail="Feed not found")
     
-    try:
-        result = parse_rss_feed(feed.url)
-        new_items = 0
-        
-        for entry_data in result['entries']:
-            # Check if item already exists (优先使用 guid,后备使用 link)
-            existing = None
-            if entry_data.get('guid'):
-                existing = db.query(FeedItem).filter(FeedItem.guid == entry_data['guid']).first()
-            if not existing and entry_data.get('link'):
-                existing = db.query(FeedItem).filter(FeedItem.link == entry_data['link']).first()
-            if existing:
-                continue
-            
-            thumbnail_path = None
-            if entry_data.get('cover_image'):
-                thumbnail_path = download_and_process_image(entry_data['cover_image'])
-            
-            item = FeedItem(
-                id=str(uuid.uuid4()),
-                feed_id=feed.id,
-                title=entry_data['title'],
-                guid=entry_data.get('guid'),
-                link=entry_data['link'],
-                description=entry_data.get('description'),
-                content=entry_data.get('content'),
-                cover_image=entry_data.get('cover_image'),
-                thumbnail_image=thumbnail_path,
-                author=entry_data.get('author'),
-                categories=json.dumps(entry_data.get('categories', [])),
-                published_at=entry_data['published_at'],
-            )
-            db.add(item)
-            new_items += 1
-        
-        feed.last_fetched_at = datetime.utcnow()
-        feed.last_fetch_error = None  # 清除错误状态
-        db.commit()
-        
-        return {"success": True, "newItems": new_items}
-        
-    except Exception as e:
-        error_msg = str(e)
-        # 记录错误状态
-        feed.last_fetch_error = error_msg[:500]
-        feed.last_fetched_at = datetime.utcnow()
-        db.commit()
-        raise HTTPException(status_code=400, detail=f"Failed to fetch feed: {error_msg}")
+    # 与定时抓取共用抓取线程池；该 Feed 正在抓取时任务直接跟随正在进行的抓取
+    return start_feed_refresh(db, feed_id)
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+def get_job(job_id: str, db: Session = Depends(get_db)):
+    """查询后台任务状态"""
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/api/feeds/{feed_id}/fetch-history", response_model=list[FetchRunResponse])
+def get_feed_fetch_history(
+    feed_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """最近的抓取记录（新到旧）"""
+    if not db.query(Feed.id).filter(Feed.id == feed_id).first():
+        raise HTTPException(status_code=404, detail="Feed not found")
+    
+    return db.query(FetchRun).filter(
+        FetchRun.feed_id == feed_id
+    ).order_by(
+        FetchRun.started_at.desc()
+    ).limit(limit).all()
+
+
+@app.get("/api/stats/fetch", response_model=FetchStatsResponse)
+def get_fetch_statistics(
+    hours: int = Query(24, ge=1, le=24 * 90),
+    top: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """最近 hours 小时的抓取耗时分布（p50 / p95）和占用抓取时间最多的 Feed"""
+    return get_fetch_stats(db, hours=hours, top=top)
 
 
 @app.get("/api/items", response_model=ItemsListResponse)
@@ -1022,6 +769,8 @@ def get_items(
             "content": item.content,
             "cover_image": item.cover_image,
             "thumbnail_image": item.thumbnail_image,
+            "thumbnail_status": item.thumbnail_status,
+            "thumbnail_widths": available_widths(item.thumbnail_max_width),
             "author": item.author,
             "categories": item.categories,
             "published_at": item.published_at,
@@ -1061,6 +810,8 @@ def get_item(item_id: str, db: Session = Depends(get_db)):
         content=item.content,
         cover_image=item.cover_image,
         thumbnail_image=item.thumbnail_image,
+        thumbnail_status=item.thumbnail_status,
+        thumbnail_widths=available_widths(item.thumbnail_max_width),
         author=item.author,
         categories=item.categories,
         published_at=item.published_at,
@@ -1089,6 +840,9 @@ def refresh_item_image(item_id: str, db: Session = Depends(get_db)):
         thumbnail_path = download_and_process_image(item.cover_image)
         if thumbnail_path:
             item.thumbnail_image = thumbnail_path
+            item.thumbnail_status = STATUS_DONE
+            item.thumbnail_retry_at = None
+            item.thumbnail_max_width = max_width(image_hash_of(thumbnail_path))
             db.commit()
             return {"success": True, "thumbnail_image": thumbnail_path}
         else:
@@ -1098,6 +852,25 @@ def refresh_item_image(item_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=f"Failed to refresh image: {str(e)}")
 
 
+@app.get(THUMB_PATH + "/{image_hash}")
+def get_thumbnail(image_hash: str, w: int = Query(THUMBNAIL_WIDTH, ge=1, le=10000)):
+    """
+    按宽度档位返回缩略图（见 app.image_variants），与 /uploads 一样不需要登录。
+    """
+    if not is_valid_hash(image_hash):
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    try:
+        path = get_variant(image_hash, w)
+    except Exception as e:
+        print(f"Error generating thumbnail {image_hash} at width {w}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to generate thumbnail")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    if touch(os.path.basename(path)):
+        flush_touches()
+    return FileResponse(path, media_type="image/webp", headers={"Cache-Control": "public, max-age=604800"})
+
+
 @app.patch("/api/items/{item_id}/komga-status")
 def update_item_komga_status(
     item_id: str,
@@ -1433,28 +1206,29 @@ async def proxy_request(request: ProxyRequest, db: Session = Depends(get_db)):
         headers["Content-Type"] = "application/json"
     
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            if request.method.upper() == "GET":
-                response = await client.get(request.url, headers=headers)
-            elif request.method.upper() == "POST":
-                response = await client.post(
-                    request.url,
-                    json=request.body,
-                    headers=headers
-                )
-            else:
-                raise HTTPException(status_code=400, detail=f"Unsupported method: {request.method}")
-            
-            # 尝试解析 JSON 响应
-            try:
-                return response.json()
-            except:
-                # 非 JSON 响应，返回包装后的结果
-                return {
-                    "success": response.is_success,
-                    "status_code": response.status_code,
-                    "message": response.text
-                }
+        client = get_async_client()
+        if request.method.upper() == "GET":
+            response = await client.get(request.url, headers=headers, timeout=30.0)
+        elif request.method.upper() == "POST":
+            response = await client.post(
+                request.url,
+                json=request.body,
+                headers=headers,
+                timeout=30.0
+            )
+        else:
+            raise HTTPException(status_code=400, detail=f"Unsupported method: {request.method}")
+        
+        # 尝试解析 JSON 响应
+        try:
+            return response.json()
+        except:
+            # 非 JSON 响应，返回包装后的结果
+            return {
+                "success": response.is_success,
+                "status_code": response.status_code,
+                "message": response.text
+            }
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="Proxy request timed out")
     except httpx.RequestError as e:
@@ -0,0 +1,98 @@
+"""
+Prometheus 指标
+
+API 进程通过 GET /metrics 暴露；独立 worker 进程（app.worker）设置 METRICS_PORT 后
+在该端口单独暴露（抓取、图片处理都在 worker 中执行）。
+
+/metrics 不在 auth_middleware 的保护范围内（不是 /api 路径）；
+设置 METRICS_TOKEN 后需要携带 `Authorization: Bearer <token>`。
+
+多个 uvicorn worker 时每个进程的指标相互独立，需要汇总时设置
+PROMETHEUS_MULTIPROC_DIR（见 prometheus_client 文档）。
+"""
+import hmac
+import os
+import time
+
+from fastapi import Request
+from fastapi.responses import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess, REGISTRY,
+)
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "").strip()
+
+# 秒级耗时的桶：覆盖从几毫秒的 304 到 60 秒超时
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+RSS_FETCH_SECONDS = Histogram(
+    'rss_fetch_seconds', 'fetch_rss_content 请求耗时', ['outcome'], buckets=_LATENCY_BUCKETS,
+)
+RSS_FETCH_FAILURES = Counter(
+    'rss_fetch_failures_total', 'fetch_rss_content 失败次数', ['reason'],
+)
+FEED_PARSE_SECONDS = Histogram(
+    'feed_parse_seconds', 'feedparser 解析及条目提取耗时', buckets=_LATENCY_BUCKETS,
+)
+IMAGE_STAGE_SECONDS = Histogram(
+    'image_process_seconds', 'download_and_process_image 各阶段耗时', ['stage'], buckets=_LATENCY_BUCKETS,
+)
+IMAGE_FAILURES = Counter(
+    'image_process_failures_total', '缩略图处理失败次数',
+)
+IMAGE_DEDUPLICATED = Counter(
+    'image_deduplicated_total', '复用已有缩略图的新图片 URL 数（exact=内容相同, perceptual=感知哈希相近）', ['match'],
+)
+IMAGE_CACHE_BYTES = Gauge(
+    'image_cache_bytes', '缩略图缓存目录大小（字节）', multiprocess_mode='max',
+)
+IMAGE_CACHE_EVICTIONS = Counter(
+    'image_cache_evictions_total', '缓存清理删除的文件数',
+)
+IMAGE_CACHE_EVICTED_BYTES = Counter(
+    'image_cache_evicted_bytes_total', '缓存清理释放的字节数',
+)
+SCHEDULER_LAG_SECONDS = Histogram(
+    'scheduler_lag_seconds', 'Feed 到期到实际提交抓取的延迟',
+    buckets=(1, 2.5, 5, 10, 15, 30, 60, 120, 300, 600, 1800),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'API 请求耗时', ['method', 'route', 'status'], buckets=_LATENCY_BUCKETS,
+)
+
+
+async def metrics_middleware(request: Request, call_next):
+    """按路由模板（而不是实际路径）记录请求耗时，避免标签基数爆炸"""
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.labels(
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=response.status_code,
+    ).observe(time.perf_counter() - started)
+    return response
+
+
+def _registry():
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_endpoint(request: Request) -> Response:
+    """Prometheus 文本格式的指标"""
+    if METRICS_TOKEN:
+        expected = f"Bearer {METRICS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), expected):
+            return Response(status_code=401, content="Unauthorized")
+    return Response(content=generate_latest(_registry()), media_type=CONTENT_TYPE_LATEST)
+
+
+def start_metrics_server(port: int):
+    """在独立端口暴露指标（worker 进程使用）"""
+    from prometheus_client import start_http_server
+    start_http_server(port, registry=_registry())
+    print(f"Metrics available on :{port}/metrics")
@@ -0,0 +1,96 @@
+"""
+OPML 导入 / 导出
+
+- 导入：解析 outline 中的 xmlUrl，外层 outline 的标题（或 outline 自身的 category 属性）作为分类
+- 导出：按分类分组，逐行生成，不在内存中拼接整个文档
+"""
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, Optional
+from urllib.parse import urlparse
+from xml.sax.saxutils import escape, quoteattr
+
+
+def _attr(outline: ET.Element, name: str) -> Optional[str]:
+    """属性名大小写不敏感（部分阅读器导出 xmlurl / htmlurl）"""
+    for key, value in outline.attrib.items():
+        if key.lower() == name.lower():
+            value = value.strip()
+            return value or None
+    return None
+
+
+def parse_opml(content: bytes) -> list[Dict[str, Any]]:
+    """
+    解析 OPML，返回订阅列表：url / title / site_url / category。
+    同一个 URL 只保留第一次出现的订阅，非 http(s) 地址被忽略。
+
+    Raises:
+        ValueError: 不是有效的 OPML
+    """
+    try:
+        root = ET.fromstring(content)
+    except ET.ParseError as e:
+        raise ValueError(f"Invalid OPML: {e}")
+
+    body = root.find('body')
+    if root.tag != 'opml' or body is None:
+        raise ValueError("Invalid OPML: missing <opml><body>")
+
+    feeds = []
+    seen = set()
+
+    def walk(outline: ET.Element, category: Optional[str]):
+        url = _attr(outline, 'xmlUrl')
+        title = _attr(outline, 'title') or _attr(outline, 'text')
+        if url:
+            if urlparse(url).scheme in ('http', 'https') and url not in seen:
+                seen.add(url)
+                # 只取第一级分类（本项目的分类不分层级）
+                own_category = _attr(outline, 'category')
+                if own_category:
+                    own_category = own_category.split(',')[0].strip('/ ') or None
+                feeds.append({
+                    'url': url,
+                    'title': title,
+                    'site_url': _attr(outline, 'htmlUrl'),
+                    'category': category or own_category,
+                })
+            return
+        # 没有 xmlUrl 的 outline 是分类文件夹
+        for child in outline.findall('outline'):
+            walk(child, category or title)
+
+    for outline in body.findall('outline'):
+        walk(outline, None)
+    return feeds
+
+
+def iter_opml(feeds: Iterable[Any], title: str = "RSS Image Wall") -> Iterator[str]:
+    """
+    逐行生成 OPML。feeds 需要按 category 排序，每项有 title / url / site_url / category 属性。
+    """
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<opml version="2.0">\n'
+    yield f'  <head>\n    <title>{escape(title)}</title>\n'
+    yield f'    <dateCreated>{datetime.utcnow().strftime("%a, %d %b %Y %H:%M:%S GMT")}</dateCreated>\n  </head>\n'
+    yield '  <body>\n'
+
+    current_category = None
+    for feed in feeds:
+        if feed.category != current_category:
+            if current_category:
+                yield '    </outline>\n'
+            current_category = feed.category
+            if current_category:
+                yield f'    <outline text={quoteattr(current_category)} title={quoteattr(current_category)}>\n'
+
+        indent = '      ' if current_category else '    '
+        attrs = f'type="rss" text={quoteattr(feed.title)} title={quoteattr(feed.title)} xmlUrl={quoteattr(feed.url)}'
+        if feed.site_url:
+            attrs += f' htmlUrl={quoteattr(feed.site_url)}'
+        yield f'{indent}<outline {attrs}/>\n'
+
+    if current_category:
+        yield '    </outline>\n'
+    yield '  </body>\n</opml>\n'
@@ -0,0 +1,128 @@
+"""
+自适应抓取间隔
+
+根据 Feed 最近条目的 published_at 估算发布频率，计算实际使用的抓取间隔 poll_interval：
+
+- 发布间隔的中位数 / ADAPTIVE_POLLS_PER_POST 作为目标间隔
+- 一次抓取全部是新条目时，说明可能漏抓，间隔减半
+- 连续 ADAPTIVE_EMPTY_FETCHES 次没有新条目后，间隔按 2 的幂次退避
+- 结果限制在 [ADAPTIVE_MIN_INTERVAL_MINUTES, ADAPTIVE_MAX_INTERVAL_MINUTES] 之间
+
+没有足够历史数据时使用 Feed 的 update_interval。
+"""
+import os
+import statistics
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.database import Feed, FeedItem, DEFAULT_UPDATE_INTERVAL
+
+ADAPTIVE_POLLING = os.getenv("ADAPTIVE_POLLING", "true").lower() in ("1", "true", "yes")
+ADAPTIVE_MIN_INTERVAL_MINUTES = int(os.getenv("ADAPTIVE_MIN_INTERVAL_MINUTES", "5"))
+ADAPTIVE_MAX_INTERVAL_MINUTES = int(os.getenv("ADAPTIVE_MAX_INTERVAL_MINUTES", "1440"))
+# 每个发布间隔内抓取几次
+ADAPTIVE_POLLS_PER_POST = float(os.getenv("ADAPTIVE_POLLS_PER_POST", "2"))
+# 连续多少次没有新条目后开始退避
+ADAPTIVE_EMPTY_FETCHES = int(os.getenv("ADAPTIVE_EMPTY_FETCHES", "3"))
+
+# 估算发布频率使用的样本数和时间窗口
+_SAMPLE_SIZE = 30
+_SAMPLE_WINDOW = timedelta(days=30)
+# 小于该值的间隔视为同一批发布（例如没有 pubDate 的条目会被赋予相差几秒的时间）
+_MIN_GAP_SECONDS = 60
+# 退避最多翻 2^5 = 32 倍
+_MAX_BACKOFF_EXPONENT = 5
+
+
+def estimate_publish_gap(published_times: list[datetime], now: Optional[datetime] = None) -> Optional[float]:
+    """
+    估算发布间隔（分钟），取相邻条目时间差的中位数。
+    样本不足时返回 None。
+    """
+    now = now or datetime.utcnow()
+    times = sorted(
+        (t for t in published_times if t and now - _SAMPLE_WINDOW <= t <= now),
+        reverse=True,
+    )
+    gaps = []
+    for newer, older in zip(times, times[1:]):
+        gap_seconds = (newer - older).total_seconds()
+        if gap_seconds >= _MIN_GAP_SECONDS:
+            gaps.append(gap_seconds / 60)
+
+    if len(gaps) < 2:
+        return None
+    return statistics.median(gaps)
+
+
+def compute_poll_interval(
+    base_interval: int,
+    current_interval: Optional[int],
+    publish_gap: Optional[float],
+    empty_fetch_count: int,
+    saturated: bool,
+) -> int:
+    """
+    计算新的抓取间隔（分钟）。
+
+    Args:
+        base_interval: Feed 配置的 update_interval
+        current_interval: 当前使用的 poll_interval
+        publish_gap: estimate_publish_gap 的结果
+        empty_fetch_count: 连续没有新条目的抓取次数
+        saturated: 本次抓取到的条目是否全部是新条目（可能漏抓）
+    """
+    if publish_gap is not None:
+        interval = publish_gap / ADAPTIVE_POLLS_PER_POST
+    else:
+        interval = float(base_interval)
+
+    if saturated:
+        interval = min(interval, (current_interval or base_interval) / 2)
+
+    if empty_fetch_count >= ADAPTIVE_EMPTY_FETCHES:
+        exponent = min(empty_fetch_count - ADAPTIVE_EMPTY_FETCHES + 1, _MAX_BACKOFF_EXPONENT)
+        interval *= 2 ** exponent
+
+    return int(round(min(max(interval, ADAPTIVE_MIN_INTERVAL_MINUTES), ADAPTIVE_MAX_INTERVAL_MINUTES)))
+
+
+def update_poll_interval(db: Session, feed: Feed, new_items: int, entries_seen: int):
+    """
+    抓取成功后更新 Feed 的空抓取计数和 poll_interval（不提交事务）。
+    调用前需要先 flush，使本次新增的条目参与计算。
+
+    Args:
+        new_items: 本次新增条目数
+        entries_seen: 本次 Feed 中的条目数（304 时为 0）
+    """
+    feed.empty_fetch_count = 0 if new_items > 0 else (feed.empty_fetch_count or 0) + 1
+
+    if not ADAPTIVE_POLLING:
+        feed.poll_interval = None
+        return
+
+    published_times = [
+        published_at for (published_at,) in db.query(FeedItem.published_at).filter(
+            FeedItem.feed_id == feed.id
+        ).order_by(
+            FeedItem.published_at.desc()
+        ).limit(_SAMPLE_SIZE).all()
+    ]
+
+    # 首次抓取（此前没有条目）时所有条目都是新的，不算漏抓
+    saturated = False
+    if entries_seen > 0 and new_items == entries_seen:
+        saturated = db.query(FeedItem.id).filter(
+            FeedItem.feed_id == feed.id
+        ).offset(new_items).first() is not None
+
+    feed.poll_interval = compute_poll_interval(
+        base_interval=feed.update_interval or DEFAULT_UPDATE_INTERVAL,
+        current_interval=feed.poll_interval,
+        publish_gap=estimate_publish_gap(published_times),
+        empty_fetch_count=feed.empty_fetch_count,
+        saturated=saturated,
+    )
@@ -1,6 +1,6 @@
 import feedparser
-import requests
-from urllib.parse import urljoin, urlparse
+import httpx
+from urllib.parse import urlparse
 from datetime import datetime, timedelta
 from PIL import Image
 from io import BytesIO
@@ -8,21 +8,59 @@ import os
 import hashlib
 import re
 import time
-import glob
 from typing import Optional, Dict, Any
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app import image_store
+from app.http_client import http_get_bytes, ResponseTooLarge
+from app.image_cache import UPLOAD_DIR, record_file
+from app.metrics import (
+    RSS_FETCH_SECONDS, RSS_FETCH_FAILURES, FEED_PARSE_SECONDS, IMAGE_STAGE_SECONDS, IMAGE_FAILURES, IMAGE_DEDUPLICATED,
+)
 
 
-UPLOAD_DIR = os.path.join(os.getenv("DATA_DIR", "./data"), "uploads")
 THUMBNAIL_WIDTH = int(os.getenv("THUMBNAIL_WIDTH", "600"))
 THUMBNAIL_HEIGHT = int(os.getenv("THUMBNAIL_HEIGHT", "1200"))
-
-# 缓存大小限制（单位：MB），默认 1GB，设置为 0 表示无限制
-CACHE_SIZE_LIMIT_MB = int(os.getenv("CACHE_SIZE_LIMIT_MB", "1000"))
+# 缩放使用的重采样滤镜：lanczos / bicubic / hamming / bilinear / box / nearest
+THUMBNAIL_RESAMPLE = os.getenv("THUMBNAIL_RESAMPLE", "lanczos").lower()
+# 先按整数倍快速缩小到目标尺寸的 THUMBNAIL_REDUCING_GAP 倍（JPEG 在解码时直接按 1/2、1/4、1/8 缩小），
+# 再用重采样滤镜缩放到目标尺寸；越大越接近完整解码的画质，0 表示完整解码后再缩放
+THUMBNAIL_REDUCING_GAP = float(os.getenv("THUMBNAIL_REDUCING_GAP", "2.0"))
+# WebP 编码质量（0-100）和压缩方法（0 最快、文件最大 ~ 6 最慢、文件最小）
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+THUMBNAIL_WEBP_METHOD = int(os.getenv("THUMBNAIL_WEBP_METHOD", "4"))
+# GET /thumb/{hash}?w= 的宽度档位（见 app.image_variants），请求的宽度向上取整到最近的档位
+THUMBNAIL_WIDTHS = sorted({
+    int(width) for width in os.getenv("THUMBNAIL_WIDTHS", "240,360,480,600,900,1200").split(",") if width.strip()
+}) or [THUMBNAIL_WIDTH]
+# 是否额外保存一份最大档位尺寸的源图，用于生成比默认缩略图更大的尺寸（占用更多缓存空间）
+THUMBNAIL_KEEP_SOURCE = os.getenv("THUMBNAIL_KEEP_SOURCE", "false").lower() in ("1", "true", "yes")
+# 源图的 WebP 质量
+THUMBNAIL_SOURCE_QUALITY = 90
 
 # RSS 请求配置
 RSS_REQUEST_TIMEOUT = int(os.getenv("RSS_REQUEST_TIMEOUT", "60"))  # 默认 60 秒超时
-RSS_MAX_RETRIES = int(os.getenv("RSS_MAX_RETRIES", "2"))  # 默认重试 2 次
-RSS_RETRY_DELAY = int(os.getenv("RSS_RETRY_DELAY", "3"))  # 重试间隔 3 秒
+# Feed 正文大小上限（字节），超出时中止下载，0 表示不限制
+RSS_MAX_BYTES = int(os.getenv("RSS_MAX_BYTES", str(20 * 1024 * 1024)))
+
+# 原图大小上限（字节）和像素数上限，防止异常图片（或解压炸弹）占满内存，0 表示不限制
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(20 * 1024 * 1024)))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(50_000_000)))
+# 下载单张图片的总时长上限（秒）
+IMAGE_DOWNLOAD_TIMEOUT = 30
+# Pillow 在超过 MAX_IMAGE_PIXELS 两倍时直接拒绝解码，1~2 倍之间由 download_and_process_image 拒绝
+Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS or None
+
+# 解析 Feed 的子进程数，0 表示在抓取线程中直接解析
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0"))
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+# 连续遇到多少个已知条目后停止解析剩余条目（Feed 按新到旧排列时），0 表示不提前停止
+EARLY_STOP_KNOWN_RUN = int(os.getenv("EARLY_STOP_KNOWN_RUN", "10"))
 
 # 模拟浏览器的请求头
 BROWSER_HEADERS = {
@@ -34,79 +72,22 @@ BROWSER_HEADERS = {
     'Cache-Control': 'no-cache',
 }
 
+_RESAMPLE_FILTERS = {
+    'nearest': Image.Resampling.NEAREST,
+    'box': Image.Resampling.BOX,
+    'bilinear': Image.Resampling.BILINEAR,
+    'hamming': Image.Resampling.HAMMING,
+    'bicubic': Image.Resampling.BICUBIC,
+    'lanczos': Image.Resampling.LANCZOS,
+}
+if THUMBNAIL_RESAMPLE not in _RESAMPLE_FILTERS:
+    print(f"Warning: Unknown THUMBNAIL_RESAMPLE {THUMBNAIL_RESAMPLE!r}, using lanczos")
+    THUMBNAIL_RESAMPLE = 'lanczos'
+
 # Ensure upload directory exists
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
-def get_cache_size() -> int:
-    """获取缓存目录的总大小（字节）"""
-    total_size = 0
-    for filepath in glob.glob(os.path.join(UPLOAD_DIR, "*")):
-        if os.path.isfile(filepath):
-            total_size += os.path.getsize(filepath)
-    return total_size
-
-
-def cleanup_old_cache(target_size_bytes: int):
-    """
-    清理旧缓存直到总大小低于目标值。
-    按文件访问时间（atime）排序，优先删除最久未访问的文件。
-    """
-    if target_size_bytes <= 0:
-        return
-    
-    # 获取所有缓存文件及其信息
-    cache_files = []
-    for filepath in glob.glob(os.path.join(UPLOAD_DIR, "*")):
-        if os.path.isfile(filepath):
-            try:
-                stat = os.stat(filepath)
-                cache_files.append({
-                    'path': filepath,
-                    'size': stat.st_size,
-                    'atime': stat.st_atime,  # 最后访问时间
-                })
-            except OSError:
-                continue
-    
-    # 按访问时间排序（最旧的在前）
-    cache_files.sort(key=lambda x: x['atime'])
-    
-    current_size = sum(f['size'] for f in cache_files)
-    deleted_count = 0
-    deleted_size = 0
-    
-    # 删除文件直到低于目标大小的 90%（留出一些余量）
-    target_after_cleanup = int(target_size_bytes * 0.9)
-    
-    for file_info in cache_files:
-        if current_size <= target_after_cleanup:
-            break
-        try:
-            os.remove(file_info['path'])
-            current_size -= file_info['size']
-            deleted_count += 1
-            deleted_size += file_info['size']
-        except OSError as e:
-            print(f"Failed to delete cache file {file_info['path']}: {e}")
-    
-    if deleted_count > 0:
-        print(f"Cache cleanup: deleted {deleted_count} files, freed {deleted_size / 1024 / 1024:.2f} MB")
-
-
-def check_and_cleanup_cache():
-    """检查缓存大小并在超限时清理"""
-    if CACHE_SIZE_LIMIT_MB <= 0:
-        return  # 无限制
-    
-    limit_bytes = CACHE_SIZE_LIMIT_MB * 1024 * 1024
-    current_size = get_cache_size()
-    
-    if current_size > limit_bytes:
-        print(f"Cache size ({current_size / 1024 / 1024:.2f} MB) exceeds limit ({CACHE_SIZE_LIMIT_MB} MB), cleaning up...")
-        cleanup_old_cache(limit_bytes)
-
-
 def is_valid_url(url: str) -> bool:
     """Check if URL is valid and uses http/https protocol"""
     try:
@@ -160,20 +141,142 @@ def get_cover_image(entry: Dict[str, Any]) -> Optional[str]:
     return None
 
 
+def _fit_size(size: tuple[int, int], max_size: tuple[int, int]) -> tuple[int, int]:
+    """等比缩放到不超过 max_size 的尺寸（不放大）"""
+    width, height = size
+    if width <= max_size[0] and height <= max_size[1]:
+        return size
+    scale = min(max_size[0] / width, max_size[1] / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def max_size_for_width(width: int) -> tuple[int, int]:
+    """指定宽度档位的最大尺寸，高度上限按 THUMBNAIL_HEIGHT / THUMBNAIL_WIDTH 的比例计算"""
+    return width, max(1, round(width * THUMBNAIL_HEIGHT / THUMBNAIL_WIDTH))
+
+
+def source_path(image_hash: str) -> str:
+    """THUMBNAIL_KEEP_SOURCE 保存的源图路径"""
+    return os.path.join(UPLOAD_DIR, f"{image_hash}.src.webp")
+
+
+def create_thumbnail(
+    data: bytes,
+    max_size: Optional[tuple[int, int]] = None,
+    resample: Optional[str] = None,
+    reducing_gap: Optional[float] = None,
+) -> Image.Image:
+    """
+    解码图片并缩放到 max_size 以内，返回 RGB / L 模式的图片（透明背景填充为白色）。
+    参数默认使用 THUMBNAIL_* 配置。
+
+    Raises:
+        ValueError: 像素数超过 IMAGE_MAX_PIXELS
+    """
+    max_size = max_size or (THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT)
+    reducing_gap = THUMBNAIL_REDUCING_GAP if reducing_gap is None else reducing_gap
+
+    with IMAGE_STAGE_SECONDS.labels(stage='decode').time():
+        img = Image.open(BytesIO(data))
+        # 只读取了文件头，解码前检查像素数
+        if IMAGE_MAX_PIXELS > 0 and img.width * img.height > IMAGE_MAX_PIXELS:
+            raise ValueError(f"Image too large: {img.width}x{img.height} pixels")
+        target = _fit_size(img.size, max_size)
+        if reducing_gap and target != img.size:
+            # JPEG：libjpeg 在解码时按 2 的幂缩小（不小于目标尺寸的 reducing_gap 倍），其他格式忽略
+            img.draft(None, (int(target[0] * reducing_gap), int(target[1] * reducing_gap)))
+        img.load()
+
+    return resize_image(img, max_size, resample, reducing_gap)
+
+
+def resize_image(
+    img: Image.Image,
+    max_size: tuple[int, int],
+    resample: Optional[str] = None,
+    reducing_gap: Optional[float] = None,
+) -> Image.Image:
+    """把已解码的图片缩放到 max_size 以内并转换为 RGB / L 模式"""
+    resample = _RESAMPLE_FILTERS[resample or THUMBNAIL_RESAMPLE]
+    reducing_gap = THUMBNAIL_REDUCING_GAP if reducing_gap is None else reducing_gap
+
+    with IMAGE_STAGE_SECONDS.labels(stage='resize').time():
+        # 调色板图像只能按 NEAREST 缩放，先转换为 RGBA
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        target = _fit_size(img.size, max_size)
+        if img.size != target:
+            img = img.resize(target, resample, reducing_gap=reducing_gap or None)
+
+        if img.mode in ('RGBA', 'LA'):
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        elif img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+    return img
+
+
+def save_webp(img: Image.Image, filepath: str, quality: Optional[int] = None, method: Optional[int] = None):
+    """按 THUMBNAIL_QUALITY / THUMBNAIL_WEBP_METHOD 编码为 WebP"""
+    with IMAGE_STAGE_SECONDS.labels(stage='encode').time():
+        img.save(
+            filepath, 'WEBP',
+            quality=THUMBNAIL_QUALITY if quality is None else quality,
+            method=THUMBNAIL_WEBP_METHOD if method is None else method,
+        )
+
+
+def save_to_cache(img: Image.Image, filepath: str, quality: Optional[int] = None):
+    """
+    保存到 UPLOAD_DIR 并登记到缓存索引（超过上限时清理）。
+    先写临时文件再原子替换，多个进程同时生成同一个文件时结果相同。
+    """
+    tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        save_webp(img, tmp_path, quality=quality)
+        os.replace(tmp_path, filepath)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    record_file(filepath)
+
+
+def perceptual_hash(img: Image.Image) -> str:
+    """dHash：缩小为 9x8 灰度图，逐行比较相邻像素，得到 64 位哈希（16 位十六进制）"""
+    small = img.convert('L').resize((9, 8), Image.Resampling.BILINEAR)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f"{value:016x}"
+
+
+def _thumbnail_url(image_hash: str) -> str:
+    return f"/uploads/{image_hash}.webp"
+
+
 def download_and_process_image(image_url: str) -> Optional[str]:
-    """Download image and create thumbnail"""
+    """
+    Download image and create thumbnail
+
+    缩略图按内容寻址（见 app.image_store）：不同 URL 的同一张图片只生成一次，
+    已知 URL 不发请求，内容相同的新 URL 只下载一次，不解码也不重新编码。
+    """
     try:
         if not is_valid_url(image_url):
             return None
         
-        # Generate unique filename
-        url_hash = hashlib.md5(image_url.encode()).hexdigest()
-        filename = f"{url_hash}.webp"
-        filepath = os.path.join(UPLOAD_DIR, filename)
+        # 已知 URL：直接返回共用的缩略图
+        content_hash = image_store.lookup(image_url)
+        if content_hash and os.path.exists(os.path.join(UPLOAD_DIR, f"{content_hash}.webp")):
+            return _thumbnail_url(content_hash)
         
-        # Check if already exists
-        if os.path.exists(filepath):
-            return f"/uploads/{filename}"
+        # 升级前按 md5(url) 命名的缩略图
+        url_hash = hashlib.md5(image_url.encode()).hexdigest()
+        if os.path.exists(os.path.join(UPLOAD_DIR, f"{url_hash}.webp")):
+            return _thumbnail_url(url_hash)
         
         # Download image with headers to bypass anti-hotlinking
         headers = {
@@ -181,86 +284,229 @@ def download_and_process_image(image_url: str) -> Optional[str]:
             'Referer': urlparse(image_url).scheme + '://' + urlparse(image_url).netloc
         }
         
-        response = requests.get(image_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        # Process image
-        img = Image.open(BytesIO(response.content))
+        # 流式下载，超过 IMAGE_MAX_BYTES 时中止
+        with IMAGE_STAGE_SECONDS.labels(stage='download').time():
+            response, body = http_get_bytes(
+                image_url, IMAGE_MAX_BYTES, max_seconds=IMAGE_DOWNLOAD_TIMEOUT, headers=headers, timeout=10
+            )
+            response.raise_for_status()
         
-        # Convert to RGB if necessary
-        if img.mode in ('RGBA', 'LA', 'P'):
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-            img = background
+        # 内容相同的图片已经生成过缩略图（其他 URL 或 CDN 地址）
+        content_hash = hashlib.sha256(body).hexdigest()
+        filepath = os.path.join(UPLOAD_DIR, f"{content_hash}.webp")
+        if os.path.exists(filepath):
+            IMAGE_DEDUPLICATED.labels(match='exact').inc()
+            image_store.record(image_url, content_hash)
+            return _thumbnail_url(content_hash)
         
-        # Resize
-        img.thumbnail((THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT), Image.Resampling.LANCZOS)
+        if THUMBNAIL_KEEP_SOURCE:
+            # 只解码一次：先缩放到最大档位作为源图，再从源图缩放出默认缩略图
+            source = create_thumbnail(body, max_size=max_size_for_width(max(THUMBNAIL_WIDTHS + [THUMBNAIL_WIDTH])))
+            img = resize_image(source, (THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT))
+        else:
+            source = None
+            img = create_thumbnail(body)
         
-        # Save as WebP
-        img.save(filepath, 'WEBP', quality=80)
+        # 感知哈希相近的图片（重新压缩 / 缩放过的同一张图）复用已有的缩略图，不再编码
+        phash = None
+        if image_store.THUMBNAIL_PHASH:
+            phash = perceptual_hash(img)
+            for similar_hash in image_store.find_similar(phash):
+                if os.path.exists(os.path.join(UPLOAD_DIR, f"{similar_hash}.webp")):
+                    IMAGE_DEDUPLICATED.labels(match='perceptual').inc()
+                    image_store.record(image_url, similar_hash)
+                    return _thumbnail_url(similar_hash)
         
-        # 检查并清理缓存
-        check_and_cleanup_cache()
+        if source is not None:
+            save_to_cache(source, source_path(content_hash), quality=THUMBNAIL_SOURCE_QUALITY)
+        save_to_cache(img, filepath)
+        image_store.record(image_url, content_hash, phash)
         
-        return f"/uploads/{filename}"
+        return _thumbnail_url(content_hash)
     
     except Exception as e:
+        IMAGE_FAILURES.inc()
         print(f"Error processing image {image_url}: {e}")
         return None
 
 
-def fetch_rss_content(feed_url: str) -> str:
+class FeedFetchError(ValueError):
+    """获取 Feed 失败，http_status 为上游返回的状态码（网络错误时为 None）"""
+
+    def __init__(self, message: str, http_status: Optional[int] = None):
+        super().__init__(message)
+        self.http_status = http_status
+
+
+def fetch_rss_content(feed_url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Dict[str, Any]:
     """
-    Fetch RSS content with retry mechanism and longer timeout.
+    Fetch RSS content with a longer timeout.
     Useful for services like RSSHub that may need time to generate content.
+
+    只请求一次，失败时抛出 FeedFetchError（ValueError 的子类）；失败重试由调用方的退避策略负责（见 app.backoff），
+    不在这里 sleep，避免占用抓取线程。
+
+    传入上次保存的 etag / last_modified 时发送条件请求，
+    上游返回 304 时不下载正文，返回 not_modified=True。
+
+    正文流式读取，Content-Length 或实际大小超过 RSS_MAX_BYTES 时中止。
+    content 为原始字节，连同 Content-Type 直接交给 feedparser 判断编码，不先解码成 str。
+
+    Returns:
+        {'content': bytes | None, 'content_type': str | None, 'not_modified': bool,
+         'etag': str | None, 'last_modified': str | None, 'http_status': int, 'bytes': int}
     """
-    last_error = None
-    
-    for attempt in range(RSS_MAX_RETRIES + 1):
-        try:
-            if attempt > 0:
-                print(f"Retry attempt {attempt} for {feed_url}")
-                time.sleep(RSS_RETRY_DELAY)
-            
-            response = requests.get(
-                feed_url,
-                headers=BROWSER_HEADERS,
-                timeout=RSS_REQUEST_TIMEOUT,
-                allow_redirects=True
-            )
-            response.raise_for_status()
-            
-            # 检查是否返回了有效内容
-            content = response.text
-            if not content or len(content.strip()) < 50:
-                raise ValueError("Empty or too short response")
-            
-            return content
-            
-        except requests.exceptions.Timeout as e:
-            last_error = f"Request timeout after {RSS_REQUEST_TIMEOUT}s"
-            print(f"Timeout fetching {feed_url}: {e}")
-        except requests.exceptions.RequestException as e:
-            last_error = str(e)
-            print(f"Error fetching {feed_url}: {e}")
-        except ValueError as e:
-            last_error = str(e)
-            print(f"Invalid response from {feed_url}: {e}")
-    
-    raise ValueError(f"Failed to fetch RSS after {RSS_MAX_RETRIES + 1} attempts: {last_error}")
+    headers = dict(BROWSER_HEADERS)
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
 
+    started = time.perf_counter()
+    try:
+        response, content = http_get_bytes(
+            feed_url,
+            RSS_MAX_BYTES,
+            max_seconds=RSS_REQUEST_TIMEOUT,
+            headers=headers,
+            timeout=RSS_REQUEST_TIMEOUT,
+        )
+    except ResponseTooLarge as e:
+        RSS_FETCH_SECONDS.labels(outcome='error').observe(time.perf_counter() - started)
+        RSS_FETCH_FAILURES.labels(reason='too_large').inc()
+        print(f"Error fetching {feed_url}: {e}")
+        raise FeedFetchError(f"Failed to fetch RSS: {e}")
+    except httpx.TimeoutException as e:
+        RSS_FETCH_SECONDS.labels(outcome='error').observe(time.perf_counter() - started)
+        RSS_FETCH_FAILURES.labels(reason='timeout').inc()
+        print(f"Timeout fetching {feed_url}: {e}")
+        raise FeedFetchError(f"Failed to fetch RSS: Request timeout after {RSS_REQUEST_TIMEOUT}s")
+    except httpx.HTTPError as e:
+        RSS_FETCH_SECONDS.labels(outcome='error').observe(time.perf_counter() - started)
+        RSS_FETCH_FAILURES.labels(reason='network').inc()
+        print(f"Error fetching {feed_url}: {e}")
+        raise FeedFetchError(f"Failed to fetch RSS: {e}")
+
+    # 内容未变化，跳过下载和解析
+    if response.status_code == 304:
+        RSS_FETCH_SECONDS.labels(outcome='not_modified').observe(time.perf_counter() - started)
+        return {
+            'content': None,
+            'content_type': None,
+            'not_modified': True,
+            'etag': response.headers.get('ETag') or etag,
+            'last_modified': response.headers.get('Last-Modified') or last_modified,
+            'http_status': response.status_code,
+            'bytes': 0,
+        }
 
-def parse_rss_feed(feed_url: str) -> Dict[str, Any]:
-    """Parse RSS feed and return feed info and entries"""
-    # 使用自定义的获取函数，支持重试和更长超时
     try:
-        content = fetch_rss_content(feed_url)
-        feed = feedparser.parse(content)
-    except ValueError:
-        # 如果自定义获取失败，尝试 feedparser 直接获取（作为备用方案）
-        feed = feedparser.parse(feed_url)
+        response.raise_for_status()
+    except httpx.HTTPStatusError:
+        RSS_FETCH_SECONDS.labels(outcome='error').observe(time.perf_counter() - started)
+        RSS_FETCH_FAILURES.labels(reason='http_status').inc()
+        error = f"HTTP {response.status_code} {response.reason_phrase}"
+        print(f"Error fetching {feed_url}: {error}")
+        raise FeedFetchError(f"Failed to fetch RSS: {error}", response.status_code)
+
+    # 检查是否返回了有效内容
+    RSS_FETCH_SECONDS.labels(outcome='ok').observe(time.perf_counter() - started)
+    if not content or len(content.strip()) < 50:
+        RSS_FETCH_FAILURES.labels(reason='empty').inc()
+        print(f"Invalid response from {feed_url}: Empty or too short response")
+        raise FeedFetchError("Failed to fetch RSS: Empty or too short response", response.status_code)
+
+    return {
+        'content': content,
+        'content_type': response.headers.get('Content-Type'),
+        'not_modified': False,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'http_status': response.status_code,
+        'bytes': len(content),
+    }
+
+
+def get_entry_guid(entry) -> str:
+    """Extract GUID (优先使用 RSS 标准的 id/guid，没有时使用 link 作为后备)"""
+    guid = None
+    if hasattr(entry, 'id') and entry.id:
+        guid = entry.id
+    elif hasattr(entry, 'guid') and entry.guid:
+        guid = entry.guid
+    if not guid:
+        guid = entry.get('link', '')
+    return guid
+
+
+def parse_rss_feed(
+    feed_url: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    known_guids: Optional[set] = None,
+) -> Dict[str, Any]:
+    """
+    Parse RSS feed and return feed info and entries.
+
+    传入 etag / last_modified 时使用条件请求；上游返回 304 时
+    不调用 feedparser，返回 not_modified=True、feed_info=None、entries=[]。
+
+    传入 known_guids 时，已知条目不做封面 / 内容等字段提取，直接跳过；
+    如果 Feed 按新到旧排列，连续遇到 EARLY_STOP_KNOWN_RUN 个已知条目后
+    停止处理剩余条目。total_entries 始终是 Feed 中的条目总数。
+
+    返回值还包含 http_status / bytes / fetch_seconds / parse_seconds，用于记录抓取历史。
+    """
+    # 使用自定义的获取函数（更长超时、按主机限流）；失败直接抛出，由调用方记录退避
+    fetch_started = time.monotonic()
+    fetched = fetch_rss_content(feed_url, etag=etag, last_modified=last_modified)
+    fetch_seconds = time.monotonic() - fetch_started
+    if fetched['not_modified']:
+        return {
+            'feed_info': None,
+            'entries': [],
+            'not_modified': True,
+            'total_entries': 0,
+            'etag': fetched['etag'],
+            'last_modified': fetched['last_modified'],
+            'http_status': fetched['http_status'],
+            'bytes': 0,
+            'fetch_seconds': fetch_seconds,
+            'parse_seconds': 0.0,
+        }
+
+    parse_started = time.monotonic()
+    parsed = parse_feed_content(fetched['content'], known_guids, fetched['content_type'])
+    parse_seconds = time.monotonic() - parse_started
+    FEED_PARSE_SECONDS.observe(parse_seconds)
+    return {
+        'feed_info': parsed['feed_info'],
+        'entries': parsed['entries'],
+        'not_modified': False,
+        'total_entries': parsed['total_entries'],
+        'etag': fetched['etag'],
+        'last_modified': fetched['last_modified'],
+        'http_status': fetched['http_status'],
+        'bytes': fetched['bytes'],
+        'fetch_seconds': fetch_seconds,
+        'parse_seconds': parse_seconds,
+    }
+
+
+def _parse_content(
+    content: bytes,
+    known_guids: Optional[set] = None,
+    content_type: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    用 feedparser 解析 Feed 正文并提取条目（纯 CPU 计算，可在子进程中执行）。
+    content_type 为响应的 Content-Type，feedparser 据此（及 XML 声明）判断编码。
+
+    Returns:
+        {'feed_info': dict, 'entries': list[dict], 'total_entries': int}
+    """
+    response_headers = {'content-type': content_type} if content_type else None
+    feed = feedparser.parse(content, response_headers=response_headers)
     
     if feed.bozo and not feed.entries:
         raise ValueError(f"Failed to parse RSS feed: {feed.get('bozo_exception', 'Unknown error')}")
@@ -269,10 +515,35 @@ def parse_rss_feed(feed_url: str) -> Dict[str, Any]:
         'title': feed.feed.get('title', 'Unknown Feed'),
         'site_url': feed.feed.get('link', ''),
         'description': feed.feed.get('description', ''),
+        'hub': None,  # WebSub hub（<link rel="hub">）
+        'self_url': None,  # <link rel="self">，作为 WebSub topic
     }
+    for link in feed.feed.get('links', []):
+        if link.get('rel') == 'hub' and not feed_info['hub']:
+            feed_info['hub'] = link.get('href')
+        elif link.get('rel') == 'self' and not feed_info['self_url']:
+            feed_info['self_url'] = link.get('href')
     
     entries = []
+    known_run = 0  # 连续已知条目数
+    newest_first = True  # 目前为止条目是否按时间从新到旧排列
+    previous_time = None
     for i, entry in enumerate(feed.entries):
+        entry_time = entry.get('published_parsed') or entry.get('updated_parsed')
+        if entry_time and previous_time and tuple(entry_time) > tuple(previous_time):
+            newest_first = False
+        if entry_time:
+            previous_time = entry_time
+
+        guid = get_entry_guid(entry)
+        if known_guids is not None and guid in known_guids:
+            known_run += 1
+            # 只有按新到旧排列时，后面才都是更旧的已知条目
+            if EARLY_STOP_KNOWN_RUN > 0 and known_run >= EARLY_STOP_KNOWN_RUN and newest_first:
+                break
+            continue
+        known_run = 0
+
         # Parse published date
         published_at = None
         if hasattr(entry, 'published_parsed') and entry.published_parsed:
@@ -303,16 +574,6 @@ def parse_rss_feed(feed_url: str) -> Dict[str, Any]:
         if hasattr(entry, 'tags'):
             categories = [tag.term for tag in entry.tags]
         
-        # Extract GUID (优先使用 RSS 标准的 id/guid)
-        guid = None
-        if hasattr(entry, 'id') and entry.id:
-            guid = entry.id
-        elif hasattr(entry, 'guid') and entry.guid:
-            guid = entry.guid
-        # 如果没有 guid,使用 link 作为后备
-        if not guid:
-            guid = entry.get('link', '')
-        
         entries.append({
             'title': entry.get('title', 'Untitled'),
             'guid': guid,
@@ -328,4 +589,44 @@ def parse_rss_feed(feed_url: str) -> Dict[str, Any]:
     return {
         'feed_info': feed_info,
         'entries': entries,
+        'total_entries': len(feed.entries),
     }
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    """获取共享的解析进程池（首次调用时创建）"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # spawn：抓取线程池正在运行时 fork 可能继承被其他线程持有的锁
+            _parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _parse_pool
+
+
+def shutdown_parse_pool():
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False, cancel_futures=True)
+            _parse_pool = None
+
+
+def parse_feed_content(
+    content: bytes,
+    known_guids: Optional[set] = None,
+    content_type: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    解析 Feed 正文。PARSE_WORKERS > 0 时在进程池中执行，
+    避免 feedparser 和正则提取长时间占用 GIL、拖慢 API 响应。
+    """
+    if PARSE_WORKERS <= 0:
+        return _parse_content(content, known_guids, content_type)
+
+    try:
+        return get_parse_pool().submit(_parse_content, content, known_guids, content_type).result()
+    except BrokenProcessPool as e:
+        # 子进程异常退出（例如被 OOM killer 杀掉），重建进程池，本次在当前进程中解析
+        print(f"Parse pool broken, parsing in-process: {e}")
+        shutdown_parse_pool()
+        return _parse_content(content, known_guids, content_type)
@@ -0,0 +1,202 @@
+"""
+按 Feed 调度抓取
+
+每个 Feed 的下次抓取时间 = last_fetched_at + 抓取间隔（带随机抖动），
+抓取间隔优先使用自适应计算的 poll_interval（见 app.polling），否则使用 update_interval。
+抓取失败的 Feed 使用退避 / 熔断计算出的 retry_at（见 app.backoff）。
+WebSub 推送订阅有效的 Feed 只按兜底间隔抓取（或不抓取），并定期续订（见 app.websub）。
+所有 Feed 按到期时间放进最小堆，APScheduler 定期检查堆顶，
+把到期的 Feed 提交到抓取线程池。
+
+- 启动时已经过期的 Feed 会分散在 SCHEDULER_STARTUP_SPREAD_SECONDS 内抓取，避免同时触发
+- 定期与数据库同步：新增 / 删除 / 停用 / 修改间隔 / 手动抓取过的 Feed 都会重新计算到期时间
+"""
+import heapq
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from app.database import SessionLocal, Feed, DEFAULT_UPDATE_INTERVAL
+from app.fetcher import submit_feed_fetch
+from app.fetch_history import prune_fetch_history
+from app.jobs import prune_jobs
+from app.metrics import SCHEDULER_LAG_SECONDS
+from app.websub import polling_interval, renew_subscriptions
+
+# 检查到期 Feed 的间隔（秒）
+SCHEDULER_TICK_SECONDS = int(os.getenv("SCHEDULER_TICK_SECONDS", "10"))
+# 与数据库同步 Feed 列表的间隔（秒）
+SCHEDULER_SYNC_SECONDS = int(os.getenv("SCHEDULER_SYNC_SECONDS", "60"))
+# 抖动比例：下次抓取时间在 interval × (1 ± SCHEDULER_JITTER) 之间随机
+SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER", "0.1"))
+# 已过期的 Feed 分散到多少秒内抓取
+SCHEDULER_STARTUP_SPREAD_SECONDS = int(os.getenv("SCHEDULER_STARTUP_SPREAD_SECONDS", "120"))
+
+
+def _to_timestamp(dt: datetime) -> float:
+    """数据库中的时间都是 naive UTC"""
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+
+class FeedScheduler:
+    """基于最小堆的按 Feed 抓取调度器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap: list[tuple[float, str]] = []  # (due_ts, feed_id)，过期条目惰性删除
+        self._due: dict[str, float] = {}  # feed_id -> 当前有效的 due_ts
+        self._basis: dict[str, tuple] = {}  # feed_id -> 计算 due 时使用的 (last_fetched_at, interval, retry_at)
+        self._running: set[str] = set()
+        self._scheduler: Optional[BackgroundScheduler] = None
+
+    def start(self):
+        """加载所有 Feed 并启动调度"""
+        self.sync()
+        self._scheduler = BackgroundScheduler()
+        self._scheduler.add_job(self.dispatch_due, 'interval', seconds=SCHEDULER_TICK_SECONDS, coalesce=True)
+        self._scheduler.add_job(self.sync, 'interval', seconds=SCHEDULER_SYNC_SECONDS, coalesce=True)
+        self._scheduler.add_job(self.prune_history, 'interval', hours=1, coalesce=True)
+        self._scheduler.add_job(renew_subscriptions, 'interval', hours=1, coalesce=True)
+        self._scheduler.start()
+        print(f"Feed scheduler started with {len(self._due)} feeds")
+
+    def shutdown(self):
+        if self._scheduler:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+
+    def _compute_due(
+        self,
+        last_fetched_at: Optional[datetime],
+        interval_minutes: Optional[int],
+        now: float,
+        retry_at: Optional[datetime] = None,
+    ) -> float:
+        interval = max(1, interval_minutes or DEFAULT_UPDATE_INTERVAL) * 60
+        spread = min(SCHEDULER_STARTUP_SPREAD_SECONDS, interval)
+
+        if retry_at is not None:
+            # 失败退避中，retry_at 已经带有抖动
+            due = _to_timestamp(retry_at)
+            return due if due >= now else now + random.uniform(0, spread)
+
+        if last_fetched_at is None:
+            return now + random.uniform(0, spread)
+
+        due = _to_timestamp(last_fetched_at) + interval * (1 + random.uniform(-SCHEDULER_JITTER, SCHEDULER_JITTER))
+        if due < now:
+            # 已经过期（例如服务停机期间），分散到接下来的一小段时间内
+            due = now + random.uniform(0, spread)
+        return due
+
+    def _push(self, feed_id: str, due: float, basis: tuple):
+        """在持有 self._lock 时调用"""
+        self._due[feed_id] = due
+        self._basis[feed_id] = basis
+        heapq.heappush(self._heap, (due, feed_id))
+
+    def _drop(self, feed_id: str):
+        """在持有 self._lock 时调用；堆中的旧条目在弹出时被忽略"""
+        self._due.pop(feed_id, None)
+        self._basis.pop(feed_id, None)
+
+    def sync(self):
+        """与数据库同步 Feed 列表和到期时间"""
+        db = SessionLocal()
+        try:
+            rows = db.query(
+                Feed.id, Feed.last_fetched_at, Feed.update_interval, Feed.poll_interval, Feed.retry_at,
+                Feed.websub_status, Feed.websub_expires_at,
+            ).filter(Feed.is_active == True).all()
+        except Exception as e:
+            print(f"Feed scheduler sync failed: {e}")
+            return
+        finally:
+            db.close()
+
+        now = time.time()
+        active_ids = set()
+        with self._lock:
+            for feed_id, last_fetched_at, update_interval, poll_interval, retry_at, websub_status, websub_expires_at in rows:
+                if feed_id in self._running:
+                    active_ids.add(feed_id)
+                    continue
+                interval = polling_interval(poll_interval or update_interval, websub_status, websub_expires_at)
+                if interval is None:
+                    continue  # 完全依赖 WebSub 推送
+                active_ids.add(feed_id)
+                basis = (last_fetched_at, interval, retry_at)
+                if feed_id in self._due and self._basis.get(feed_id) == basis:
+                    continue
+                self._push(feed_id, self._compute_due(last_fetched_at, interval, now, retry_at), basis)
+
+            for feed_id in list(self._due):
+                if feed_id not in active_ids:
+                    self._drop(feed_id)
+
+    def schedule_feed(self, feed_id: str):
+        """根据数据库中的最新状态重新计算某个 Feed 的到期时间"""
+        db = SessionLocal()
+        try:
+            row = db.query(
+                Feed.last_fetched_at, Feed.update_interval, Feed.poll_interval, Feed.retry_at, Feed.is_active,
+                Feed.websub_status, Feed.websub_expires_at,
+            ).filter(Feed.id == feed_id).first()
+        finally:
+            db.close()
+
+        with self._lock:
+            interval = None if row is None or not row.is_active else polling_interval(
+                row.poll_interval or row.update_interval, row.websub_status, row.websub_expires_at
+            )
+            if interval is None:
+                self._drop(feed_id)
+                return
+            basis = (row.last_fetched_at, interval, row.retry_at)
+            self._push(feed_id, self._compute_due(row.last_fetched_at, interval, time.time(), row.retry_at), basis)
+
+    def prune_history(self):
+        """清理过期的抓取记录和任务"""
+        db = SessionLocal()
+        try:
+            prune_fetch_history(db)
+            prune_jobs(db)
+        except Exception as e:
+            print(f"Failed to prune fetch history: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def dispatch_due(self):
+        """弹出所有到期的 Feed 并提交抓取"""
+        now = time.time()
+        due_ids = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due, feed_id = heapq.heappop(self._heap)
+                if self._due.get(feed_id) != due:
+                    continue  # 已被重新调度或移除
+                self._drop(feed_id)
+                self._running.add(feed_id)
+                SCHEDULER_LAG_SECONDS.observe(now - due)
+                due_ids.append(feed_id)
+
+        for feed_id in due_ids:
+            future = submit_feed_fetch(feed_id)
+            future.add_done_callback(lambda _, feed_id=feed_id: self._on_fetch_done(feed_id))
+
+    def _on_fetch_done(self, feed_id: str):
+        with self._lock:
+            self._running.discard(feed_id)
+        try:
+            self.schedule_feed(feed_id)
+        except Exception as e:
+            print(f"Failed to reschedule feed {feed_id}: {e}")
+
+
+feed_scheduler = FeedScheduler()
@@ -18,6 +18,7 @@ class FeedUpdate(BaseModel):
     category: Optional[str] = None
     enabled_integrations: Optional[List[str]] = None  # None 表示不修改，空列表表示禁用所有
     click_action: Optional[str] = None  # 卡片点击行为: 'modal' 或 'link'
+    update_interval: Optional[int] = None  # 抓取间隔（分钟），范围 1 ~ 10080
 
 
 class FeedBriefResponse(BaseModel):
@@ -53,6 +54,8 @@ class FeedItemResponse(BaseModel):
     content: Optional[str]
     cover_image: Optional[str]
     thumbnail_image: Optional[str]
+    thumbnail_status: Optional[str] = None  # pending / done / failed，见 app.thumbnails
+    thumbnail_widths: Optional[List[int]] = None  # GET /thumb/{hash}?w= 可用的宽度，用于 srcset
     author: Optional[str]
     categories: Optional[str]
     published_at: datetime
@@ -88,8 +91,12 @@ class FeedResponse(BaseModel):
     favicon: Optional[str]
     category: Optional[str]
     update_interval: int
+    poll_interval: Optional[int] = None  # 自适应抓取间隔（分钟），None 表示使用 update_interval
     last_fetched_at: Optional[datetime]
     last_fetch_error: Optional[str] = None  # 上次抓取失败的错误信息
+    consecutive_failures: int = 0  # 连续抓取失败次数
+    retry_at: Optional[datetime] = None  # 失败退避 / 熔断期间的下次抓取时间
+    websub_status: Optional[str] = None  # WebSub 推送订阅状态：pending / subscribed / failed / denied
     is_active: bool
     created_at: datetime
     items_count: Optional[int] = None
@@ -97,6 +104,7 @@ class FeedResponse(BaseModel):
     warning: Optional[str] = None  # 订阅存在问题时的警告信息
     enabled_integrations: Optional[List[str]] = None  # 启用的集成ID列表，None表示全部启用
     click_action: Optional[str] = None  # 卡片点击行为: 'modal' 或 'link'
+    job_id: Optional[str] = None  # 新建 Feed 时的后台任务，进度见 GET /api/jobs/{id}
 
     class Config:
         from_attributes = True
@@ -131,6 +139,110 @@ class ItemsListResponse(BaseModel):
         )
 
 
+# ========== 抓取历史相关 Schema ==========
+
+class FetchRunResponse(BaseModel):
+    id: int
+    feed_id: str
+    started_at: datetime
+    finished_at: datetime
+    duration_ms: int
+    fetch_ms: Optional[int] = None
+    parse_ms: Optional[int] = None
+    http_status: Optional[int] = None
+    bytes: Optional[int] = None
+    not_modified: Optional[bool] = None
+    entries_seen: Optional[int] = None
+    new_items: Optional[int] = None
+    images_processed: Optional[int] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+        populate_by_name = True
+        
+        alias_generator = lambda string: ''.join(
+            word.capitalize() if i > 0 else word 
+            for i, word in enumerate(string.split('_'))
+        )
+        
+        # 确保 datetime 序列化为 ISO 8601 格式并带 Z 后缀（UTC）
+        json_encoders = {
+            datetime: lambda v: v.isoformat() + 'Z' if v.tzinfo is None else v.isoformat()
+        }
+
+
+class FeedFetchStats(BaseModel):
+    feed_id: str
+    title: str
+    runs: int
+    failures: int
+    total_ms: int
+    p50_ms: Optional[int] = None
+    p95_ms: Optional[int] = None
+    max_ms: Optional[int] = None
+
+    class Config:
+        populate_by_name = True
+        
+        alias_generator = lambda string: ''.join(
+            word.capitalize() if i > 0 else word 
+            for i, word in enumerate(string.split('_'))
+        )
+
+
+class FetchStatsResponse(BaseModel):
+    hours: int
+    runs: int
+    failures: int
+    not_modified: int
+    new_items: int
+    p50_ms: Optional[int] = None
+    p95_ms: Optional[int] = None
+    max_ms: Optional[int] = None
+    slowest_feeds: List[FeedFetchStats]
+
+    class Config:
+        populate_by_name = True
+        
+        alias_generator = lambda string: ''.join(
+            word.capitalize() if i > 0 else word 
+            for i, word in enumerate(string.split('_'))
+        )
+
+
+class JobResponse(BaseModel):
+    id: str
+    type: str
+    feed_id: Optional[str] = None
+    status: str
+    stage: Optional[str] = None
+    total: int
+    completed: int
+    failed: int
+    new_items: int
+    not_modified: int
+    images_processed: Optional[int] = None
+    error: Optional[str] = None
+    results: Optional[List[dict]] = None  # opml_import 中每个 Feed 的结果
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+        populate_by_name = True
+        
+        alias_generator = lambda string: ''.join(
+            word.capitalize() if i > 0 else word 
+            for i, word in enumerate(string.split('_'))
+        )
+        
+        # 确保 datetime 序列化为 ISO 8601 格式并带 Z 后缀（UTC）
+        json_encoders = {
+            datetime: lambda v: v.isoformat() + 'Z' if v.tzinfo is None else v.isoformat()
+        }
+
+
 # 集成相关 Schema
 class IntegrationBase(BaseModel):
     name: str
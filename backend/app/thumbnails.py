@@ -0,0 +1,236 @@
+"""
+持久化的缩略图队列
+
+条目入库时立即提交，有封面的条目标记为 thumbnail_status='pending'，
+队列从数据库中按 published_at 从新到旧取出待处理的条目，交给 THUMBNAIL_WORKERS 个
+线程（或 THUMBNAIL_WORKER_MODE=process 时的子进程）下载并生成缩略图：
+
+- 队列状态保存在 feed_items 中，进程重启后未完成的条目继续处理
+- 新入库的条目会唤醒队列；执行中的任务数不超过 worker 数的两倍，
+  新条目总是排在积压的旧条目前面
+- 失败的条目按 THUMBNAIL_RETRY_SECONDS 指数退避重试，失败 THUMBNAIL_MAX_ATTEMPTS 次后
+  标记为 failed，不再自动重试（可通过 POST /api/items/{id}/refresh-image 手动重试）
+- 与抓取调度器一样只在 leader 进程中运行（见 app.leader），其他进程入库的条目
+  最迟 _POLL_SECONDS 秒后被处理
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, FeedItem, db_write_lock
+from app.fetch_history import add_images_processed
+from app.image_variants import image_hash_of, max_width
+from app.rss_parser import download_and_process_image
+
+# 同时生成缩略图的 worker 数
+THUMBNAIL_WORKERS = max(1, int(os.getenv("THUMBNAIL_WORKERS", "2")))
+# thread：在线程中处理；process：在子进程中处理，图片解码和缩放不占用 API 进程的 GIL
+THUMBNAIL_WORKER_MODE = os.getenv("THUMBNAIL_WORKER_MODE", "thread").lower()
+# 失败多少次后放弃
+THUMBNAIL_MAX_ATTEMPTS = max(1, int(os.getenv("THUMBNAIL_MAX_ATTEMPTS", "5")))
+# 第一次失败后的重试间隔（秒），之后每次翻倍，最长 1 天
+THUMBNAIL_RETRY_SECONDS = int(os.getenv("THUMBNAIL_RETRY_SECONDS", "600"))
+
+_RETRY_MAX = timedelta(days=1)
+# 没有新条目通知时检查到期重试（以及其他进程入库的条目）的间隔
+_POLL_SECONDS = 5
+
+STATUS_PENDING = 'pending'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+def initial_status(cover_image: Optional[str]) -> Optional[str]:
+    """新条目的缩略图状态：有封面时进入队列"""
+    return STATUS_PENDING if cover_image else None
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return min(timedelta(seconds=THUMBNAIL_RETRY_SECONDS * 2 ** (attempts - 1)), _RETRY_MAX)
+
+
+class ThumbnailQueue:
+    """从 feed_items 中取出待处理条目，交给线程池 / 进程池生成缩略图"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[Executor] = None
+        self._in_flight: set[str] = set()
+        self._item_runs: dict[str, int] = {}  # item_id -> fetch_run_id，用于累加 images_processed
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._executor = self._create_executor()
+        self._thread = threading.Thread(target=self._run, name="thumbnail-queue", daemon=True)
+        self._thread.start()
+        print(f"Thumbnail queue started with {THUMBNAIL_WORKERS} {THUMBNAIL_WORKER_MODE} workers")
+
+    def shutdown(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def notify(self, item_ids: Iterable[str], fetch_run_id: Optional[int] = None):
+        """新条目已入库，唤醒队列（队列不在当前进程运行时只会被轮询到）"""
+        if not self.is_running:
+            return
+        if fetch_run_id:
+            with self._lock:
+                for item_id in item_ids:
+                    self._item_runs[item_id] = fetch_run_id
+        self._wakeup.set()
+
+    def _create_executor(self) -> Executor:
+        if THUMBNAIL_WORKER_MODE == 'process':
+            # spawn：抓取线程池正在运行时 fork 可能继承被其他线程持有的锁
+            return ProcessPoolExecutor(max_workers=THUMBNAIL_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS, thread_name_prefix="thumbnail")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.clear()
+            try:
+                self._dispatch()
+            except Exception as e:
+                print(f"Thumbnail queue dispatch failed: {e}")
+            self._wakeup.wait(_POLL_SECONDS)
+
+    def _dispatch(self):
+        """按发布时间从新到旧补满执行中的任务"""
+        with self._lock:
+            capacity = THUMBNAIL_WORKERS * 2 - len(self._in_flight)
+            in_flight = set(self._in_flight)
+        if capacity <= 0:
+            return
+
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            rows = db.query(FeedItem.id, FeedItem.cover_image).filter(
+                FeedItem.thumbnail_status == STATUS_PENDING,
+                or_(FeedItem.thumbnail_retry_at == None, FeedItem.thumbnail_retry_at <= now),
+            ).order_by(FeedItem.published_at.desc()).limit(capacity + len(in_flight)).all()
+        finally:
+            db.close()
+
+        for item_id, cover_image in rows:
+            if capacity <= 0:
+                break
+            if item_id in in_flight:
+                continue
+            self._submit(item_id, cover_image)
+            capacity -= 1
+
+    def _submit(self, item_id: str, cover_image: str):
+        with self._lock:
+            if self._executor is None:
+                return
+            try:
+                future = self._executor.submit(download_and_process_image, cover_image)
+            except BrokenProcessPool as e:
+                # 子进程异常退出（例如被 OOM killer 杀掉），重建进程池
+                print(f"Thumbnail pool broken, recreating: {e}")
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._create_executor()
+                future = self._executor.submit(download_and_process_image, cover_image)
+            self._in_flight.add(item_id)
+        future.add_done_callback(lambda f: self._on_done(item_id, f))
+
+    def _on_done(self, item_id: str, future: Future):
+        thumbnail_path = None
+        if not future.cancelled():
+            try:
+                thumbnail_path = future.result()
+            except Exception as e:
+                print(f"Error processing image for item {item_id}: {e}")
+
+        with self._lock:
+            fetch_run_id = self._item_runs.pop(item_id, None)
+        try:
+            if not future.cancelled():
+                record_result(item_id, thumbnail_path, fetch_run_id)
+        finally:
+            # 结果写入之后再移出执行中集合，避免同一条目被再次取出
+            with self._lock:
+                self._in_flight.discard(item_id)
+            self._wakeup.set()
+
+
+def record_result(item_id: str, thumbnail_path: Optional[str], fetch_run_id: Optional[int] = None):
+    """记录一次缩略图生成的结果，失败时安排重试或放弃"""
+    # 读取文件头放在锁外
+    thumbnail_max_width = max_width(image_hash_of(thumbnail_path)) if thumbnail_path else None
+
+    db = SessionLocal()
+    try:
+        with db_write_lock:
+            item = db.query(FeedItem).filter(FeedItem.id == item_id).first()
+            if item is None:
+                return  # 条目已被清理
+            if thumbnail_path:
+                item.thumbnail_image = thumbnail_path
+                item.thumbnail_status = STATUS_DONE
+                item.thumbnail_retry_at = None
+                item.thumbnail_max_width = thumbnail_max_width
+            else:
+                item.thumbnail_attempts = (item.thumbnail_attempts or 0) + 1
+                if item.thumbnail_attempts >= THUMBNAIL_MAX_ATTEMPTS:
+                    item.thumbnail_status = STATUS_FAILED
+                    item.thumbnail_retry_at = None
+                    print(f"Giving up thumbnail for item {item_id} after {item.thumbnail_attempts} attempts")
+                else:
+                    item.thumbnail_retry_at = datetime.utcnow() + _retry_delay(item.thumbnail_attempts)
+            db.commit()
+        if thumbnail_path and fetch_run_id:
+            add_images_processed(db, fetch_run_id, 1)
+    except Exception as e:
+        print(f"Failed to record thumbnail result for item {item_id}: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def wait_for_feed(db: Session, feed_id: str, timeout: float, interval: float = 1.0) -> bool:
+    """
+    等待某个 Feed 的条目完成第一次缩略图尝试（失败后等待重试的条目不再等待）。
+    超时返回 False。
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = db.query(FeedItem.id).filter(
+            FeedItem.feed_id == feed_id,
+            FeedItem.thumbnail_status == STATUS_PENDING,
+            FeedItem.thumbnail_retry_at == None,
+        ).first()
+        if remaining is None:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+thumbnail_queue = ThumbnailQueue()
@@ -0,0 +1,219 @@
+"""
+WebSub（PubSubHubbub）推送订阅
+
+Feed 中声明了 `<link rel="hub">` 时，抓取成功后向 hub 订阅，hub 在 Feed 更新时把新内容
+POST 到 /websub/callback/{feed_id}，直接进入与定时抓取相同的去重 / 入库流程。
+
+- 设置 WEBSUB_CALLBACK_URL（本服务的公网地址）后启用，hub 必须能访问到该地址
+- 订阅请求发出后 hub 会 GET 回调地址验证意图（hub.challenge），验证通过后才算订阅成功
+- 每个 Feed 使用独立的随机 secret，推送内容必须带有正确的 X-Hub-Signature（HMAC），否则丢弃
+- 订阅有效期间调度器只按 WEBSUB_FALLBACK_POLL_HOURS 兜底抓取，为 0 时完全不轮询
+- 调度器定期续订即将到期的订阅，并重试失败的订阅
+"""
+import hashlib
+import hmac
+import os
+import secrets
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, Feed, db_write_lock
+from app.http_client import get_http_client
+
+# 本服务的公网地址，例如 https://wall.example.com；为空时不启用 WebSub
+WEBSUB_CALLBACK_URL = os.getenv("WEBSUB_CALLBACK_URL", "").strip().rstrip("/")
+# 向 hub 申请的订阅时长（秒），hub 可能返回更短的时长
+WEBSUB_LEASE_SECONDS = int(os.getenv("WEBSUB_LEASE_SECONDS", "864000"))
+# 订阅有效时的兜底抓取间隔（小时），0 表示完全依赖推送
+WEBSUB_FALLBACK_POLL_HOURS = int(os.getenv("WEBSUB_FALLBACK_POLL_HOURS", "24"))
+
+# 到期前多久续订
+_RENEW_BEFORE = timedelta(days=1)
+# 订阅失败或 hub 没有回调验证时，多久后重试
+_RETRY_AFTER = timedelta(hours=6)
+# 推送内容大小上限
+MAX_PUSH_BYTES = 10 * 1024 * 1024
+
+CALLBACK_PATH = "/websub/callback"
+
+# 支持的签名算法（X-Hub-Signature: <algo>=<hex>）
+_SIGNATURE_ALGORITHMS = {
+    'sha1': hashlib.sha1,
+    'sha256': hashlib.sha256,
+    'sha384': hashlib.sha384,
+    'sha512': hashlib.sha512,
+}
+
+
+def is_websub_enabled() -> bool:
+    return bool(WEBSUB_CALLBACK_URL)
+
+
+def callback_url(feed_id: str) -> str:
+    return f"{WEBSUB_CALLBACK_URL}{CALLBACK_PATH}/{feed_id}"
+
+
+def is_push_active(status: Optional[str], expires_at: Optional[datetime], now: Optional[datetime] = None) -> bool:
+    """订阅是否有效（已验证且未过期）"""
+    if not is_websub_enabled() or status != 'subscribed' or expires_at is None:
+        return False
+    return expires_at > (now or datetime.utcnow())
+
+
+def polling_interval(interval: int, status: Optional[str], expires_at: Optional[datetime]) -> Optional[int]:
+    """
+    调度器使用的抓取间隔（分钟）。推送订阅有效时放宽到兜底间隔，
+    返回 None 表示不需要轮询。
+    """
+    if not is_push_active(status, expires_at):
+        return interval
+    if WEBSUB_FALLBACK_POLL_HOURS <= 0:
+        return None
+    return max(interval, WEBSUB_FALLBACK_POLL_HOURS * 60)
+
+
+def _send_request(hub_url: str, topic_url: str, feed_id: str, mode: str, secret: Optional[str] = None):
+    """向 hub 发送订阅 / 取消订阅请求，hub 接受时返回 202（随后异步回调验证）"""
+    data = {
+        'hub.mode': mode,
+        'hub.topic': topic_url,
+        'hub.callback': callback_url(feed_id),
+    }
+    if mode == 'subscribe':
+        data['hub.lease_seconds'] = str(WEBSUB_LEASE_SECONDS)
+        data['hub.secret'] = secret
+    response = get_http_client().post(hub_url, data=data, timeout=10)
+    if response.status_code not in (202, 204):
+        raise ValueError(f"Hub returned HTTP {response.status_code}: {response.text[:200]}")
+
+
+def subscribe(db: Session, feed_id: str, hub_url: str, topic_url: str):
+    """订阅（或续订）一个 Feed。结果由 hub 的验证回调决定，这里只记录为 pending"""
+    with db_write_lock:
+        feed = db.query(Feed).filter(Feed.id == feed_id).first()
+        if feed is None:
+            return
+        # 换了 hub 或 topic 时重新生成 secret，旧订阅不再有效
+        changed = feed.websub_hub != hub_url or feed.websub_topic != topic_url
+        if not feed.websub_secret or changed:
+            feed.websub_secret = secrets.token_hex(20)
+        feed.websub_hub = hub_url
+        feed.websub_topic = topic_url
+        if changed or feed.websub_status != 'subscribed':
+            feed.websub_status = 'pending'
+            # hub 迟迟不回调验证时由续订任务重试
+            feed.websub_expires_at = datetime.utcnow() + _RETRY_AFTER
+        secret = feed.websub_secret
+        db.commit()
+
+    try:
+        _send_request(hub_url, topic_url, feed_id, 'subscribe', secret)
+        print(f"WebSub subscription requested for feed {feed_id} at {hub_url}")
+    except Exception as e:
+        print(f"WebSub subscription to {hub_url} failed for feed {feed_id}: {e}")
+        with db_write_lock:
+            db.query(Feed).filter(Feed.id == feed_id, Feed.websub_status != 'subscribed').update({
+                Feed.websub_status: 'failed',
+                Feed.websub_expires_at: datetime.utcnow() + _RETRY_AFTER,
+            }, synchronize_session=False)
+            db.commit()
+
+
+def unsubscribe(feed_id: str, hub_url: str, topic_url: str):
+    """取消订阅（Feed 删除后调用，hub 回调验证时 Feed 已不存在，直接确认）"""
+    try:
+        _send_request(hub_url, topic_url, feed_id, 'unsubscribe')
+    except Exception as e:
+        print(f"WebSub unsubscribe from {hub_url} failed for feed {feed_id}: {e}")
+
+
+def maybe_subscribe(db: Session, feed_id: str, feed_info: Optional[Dict[str, Any]]):
+    """抓取成功后调用：Feed 声明了 hub 且尚未订阅（或 hub / topic 变化）时发起订阅"""
+    if not is_websub_enabled() or not feed_info or not feed_info.get('hub'):
+        return
+    hub_url = feed_info['hub']
+    topic_url = feed_info.get('self_url')
+    if not topic_url:
+        return
+
+    feed = db.query(Feed).filter(Feed.id == feed_id).first()
+    if feed is None:
+        return
+    unchanged = feed.websub_hub == hub_url and feed.websub_topic == topic_url
+    # 已订阅 / 等待验证 / 失败等待重试的由续订任务处理
+    if unchanged and feed.websub_status in ('subscribed', 'pending', 'failed', 'denied'):
+        return
+    subscribe(db, feed_id, hub_url, topic_url)
+
+
+def verify_intent(db: Session, feed_id: str, mode: str, topic: str, lease_seconds: Optional[int]) -> bool:
+    """
+    处理 hub 的验证回调。返回 True 时应原样返回 hub.challenge。
+    mode 为 denied 时 hub 拒绝了订阅，记录后返回 False。
+    """
+    feed = db.query(Feed).filter(Feed.id == feed_id).first()
+
+    if mode == 'unsubscribe':
+        # 只确认我们确实不再需要的订阅
+        return feed is None or not is_websub_enabled() or feed.websub_topic != topic
+
+    if feed is None or feed.websub_topic != topic or not is_websub_enabled():
+        return False
+
+    with db_write_lock:
+        if mode == 'denied':
+            feed.websub_status = 'denied'
+            feed.websub_expires_at = datetime.utcnow() + _RETRY_AFTER
+            db.commit()
+            print(f"WebSub subscription denied for feed {feed.title}")
+            return False
+
+        if mode != 'subscribe':
+            return False
+        lease = lease_seconds if lease_seconds and lease_seconds > 0 else WEBSUB_LEASE_SECONDS
+        feed.websub_status = 'subscribed'
+        feed.websub_expires_at = datetime.utcnow() + timedelta(seconds=lease)
+        db.commit()
+    print(f"WebSub subscription verified for feed {feed.title} (lease {lease}s)")
+    return True
+
+
+def verify_signature(secret: Optional[str], body: bytes, signature_header: Optional[str]) -> bool:
+    """校验 X-Hub-Signature"""
+    if not secret or not signature_header or '=' not in signature_header:
+        return False
+    algorithm, _, signature = signature_header.partition('=')
+    digest = _SIGNATURE_ALGORITHMS.get(algorithm.strip().lower())
+    if digest is None:
+        return False
+    expected = hmac.new(secret.encode(), body, digest).hexdigest()
+    return hmac.compare_digest(expected, signature.strip().lower())
+
+
+def renew_subscriptions():
+    """续订即将到期的订阅，重试失败 / 未验证的订阅（调度器定期调用）"""
+    if not is_websub_enabled():
+        return
+
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        rows = db.query(
+            Feed.id, Feed.websub_hub, Feed.websub_topic, Feed.websub_status, Feed.websub_expires_at
+        ).filter(Feed.websub_hub != None, Feed.is_active == True).all()
+        for feed_id, hub_url, topic_url, status, expires_at in rows:
+            if expires_at is None:
+                due = True
+            elif status == 'subscribed':
+                due = expires_at - _RENEW_BEFORE <= now
+            else:
+                due = expires_at <= now
+            if due:
+                subscribe(db, feed_id, hub_url, topic_url)
+    except Exception as e:
+        print(f"WebSub renewal failed: {e}")
+        db.rollback()
+    finally:
+        db.close()
@@ -0,0 +1,59 @@
+"""
+独立的后台任务进程
+
+    python -m app.worker
+
+运行抓取调度器、入库流水线和缩略图队列，不提供 HTTP 接口。
+配合 API 进程的 BACKGROUND_JOBS=false 使用，两者共享同一个 DATA_DIR 和数据库，
+可以分别扩容或绑定到不同的 CPU / 容器。
+
+多个 worker 同时运行时同样通过 app.leader 的文件锁选出一个运行调度器，其余待命。
+"""
+import asyncio
+import os
+import signal
+import threading
+
+from app.database import prepare_database
+from app.image_cache import start_reconcile_if_empty
+from app.http_client import open_http_clients, close_http_clients
+from app.leader import leader_election
+from app.metrics import start_metrics_server
+from app.rss_parser import shutdown_parse_pool
+from app.scheduler import feed_scheduler
+from app.thumbnails import thumbnail_queue
+
+# 暴露 Prometheus 指标的端口，0 表示不暴露（该端口不校验 METRICS_TOKEN）
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+
+def main():
+    prepare_database()
+    open_http_clients()
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    def start_background_jobs():
+        feed_scheduler.start()
+        thumbnail_queue.start()
+        start_reconcile_if_empty()
+
+    leader_election.start(on_elected=start_background_jobs)
+    print("Worker started, waiting for jobs (Ctrl+C to stop)")
+    try:
+        stop.wait()
+    finally:
+        print("Worker shutting down...")
+        feed_scheduler.shutdown()
+        thumbnail_queue.shutdown()
+        leader_election.stop()
+        shutdown_parse_pool()
+        asyncio.run(close_http_clients())
+
+
+if __name__ == "__main__":
+    main()
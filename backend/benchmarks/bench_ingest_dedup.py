@@ -0,0 +1,133 @@
+"""
+入库去重微基准
+
+比较 feed_items 表从 1 万行增长到 100 万行时，一次抓取（默认 100 个条目，一半已存在）
+的去重开销：
+
+- legacy (no link index): 旧实现，每个条目先按 guid 查询再按 link 查询，link 没有索引
+- legacy (link index):    旧实现 + link 索引
+- set-based:              app.ingest.filter_new_entries，批量 IN 查询
+
+用法（在 backend 目录下）：
+
+    python benchmarks/bench_ingest_dedup.py
+    python benchmarks/bench_ingest_dedup.py --sizes 10000,100000 --entries 200 --repeat 3
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Base, Feed, FeedItem  # noqa: E402
+from app.ingest import filter_new_entries  # noqa: E402
+
+_INSERT_BATCH = 20000
+
+
+def legacy_filter(db, entries):
+    """旧实现：每个条目最多两次查询"""
+    new_entries = []
+    for entry_data in entries:
+        existing = None
+        if entry_data.get('guid'):
+            existing = db.query(FeedItem).filter(FeedItem.guid == entry_data['guid']).first()
+        if not existing and entry_data.get('link'):
+            existing = db.query(FeedItem).filter(FeedItem.link == entry_data['link']).first()
+        if not existing:
+            new_entries.append(entry_data)
+    return new_entries
+
+
+def populate(engine, rows: int) -> str:
+    """写入一个 Feed 和 rows 个条目，返回 feed_id"""
+    feed_id = str(uuid.uuid4())
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(Feed.__table__.insert(), [{'id': feed_id, 'title': 'bench', 'url': 'http://bench.local/feed'}])
+        for start in range(0, rows, _INSERT_BATCH):
+            conn.execute(FeedItem.__table__.insert(), [
+                {
+                    'id': f"item-{i}",
+                    'feed_id': feed_id,
+                    'title': f"Item {i}",
+                    'guid': f"guid-{i}",
+                    'link': f"https://example.com/posts/{i}",
+                    'published_at': now,
+                    'created_at': now,
+                    'updated_at': now,
+                }
+                for i in range(start, min(start + _INSERT_BATCH, rows))
+            ])
+    return feed_id
+
+
+def make_entries(rows: int, count: int) -> list[dict]:
+    """一半是已存在的条目（随机抽取），一半是新条目"""
+    existing = random.sample(range(rows), count // 2)
+    entries = [{'guid': f"guid-{i}", 'link': f"https://example.com/posts/{i}"} for i in existing]
+    entries += [
+        {'guid': f"new-{uuid.uuid4()}", 'link': f"https://example.com/new/{uuid.uuid4()}"}
+        for _ in range(count - len(entries))
+    ]
+    random.shuffle(entries)
+    return entries
+
+
+def time_filter(session_factory, func, entries, repeat: int) -> float:
+    """返回多次运行的最短耗时（毫秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        db = session_factory()
+        try:
+            started = time.perf_counter()
+            func(db, entries)
+            best = min(best, time.perf_counter() - started)
+        finally:
+            db.close()
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,100000,1000000', help='feed_items 行数，逗号分隔')
+    parser.add_argument('--entries', type=int, default=100, help='每次抓取的条目数')
+    parser.add_argument('--repeat', type=int, default=3, help='每种实现重复次数（取最短）')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    print(f"{'rows':>10} | {'legacy (no link index)':>22} | {'legacy (link index)':>19} | {'set-based':>9}")
+    print('-' * 72)
+
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            Base.metadata.create_all(bind=engine)
+            session_factory = sessionmaker(bind=engine, autoflush=False)
+            populate(engine, rows)
+            entries = make_entries(rows, args.entries)
+
+            with engine.begin() as conn:
+                conn.execute(text("DROP INDEX IF EXISTS ix_feed_items_link"))
+            legacy_no_index = time_filter(session_factory, legacy_filter, entries, args.repeat)
+
+            with engine.begin() as conn:
+                conn.execute(text("CREATE INDEX ix_feed_items_link ON feed_items (link)"))
+            legacy_index = time_filter(session_factory, legacy_filter, entries, args.repeat)
+            set_based = time_filter(session_factory, filter_new_entries, entries, args.repeat)
+
+            engine.dispose()
+
+        print(f"{rows:>10} | {legacy_no_index:>19.1f} ms | {legacy_index:>16.1f} ms | {set_based:>6.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
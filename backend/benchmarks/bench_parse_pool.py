@@ -0,0 +1,176 @@
+"""
+解析进程池基准
+
+在一次全量抓取进行期间持续请求 /api/items，比较 PARSE_WORKERS=0（在抓取线程中解析）
+和 PARSE_WORKERS>0（在子进程中解析）时的 API 延迟。
+
+Feed 由本地 HTTP 服务提供：每个 Feed 是一个包含大段 HTML 正文的 Atom 文档，
+解析时间主要花在 feedparser 的 HTML 清理和封面提取上，与网络无关。
+
+每种模式在独立的子进程中运行（PARSE_WORKERS 等配置在导入 app 时读取）。
+
+用法（在 backend 目录下，需要安装 httpx 以使用 TestClient）：
+
+    python benchmarks/bench_parse_pool.py
+    python benchmarks/bench_parse_pool.py --feeds 40 --entries 200 --workers 4
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PARAGRAPH = (
+    "<p>Lorem ipsum <b>dolor</b> sit amet, <a href=\"https://example.com/tag/{i}\">consectetur</a> "
+    "adipiscing elit, sed do <i>eiusmod</i> tempor incididunt ut labore et dolore magna aliqua.</p>"
+)
+
+
+def build_atom_feed(feed_no: int, entries: int, paragraphs: int) -> bytes:
+    """生成一个 Atom 文档，条目按新到旧排列，正文为较长的 HTML"""
+    html = "".join(_PARAGRAPH.format(i=i) for i in range(paragraphs))
+    parts = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        f'<title>Bench feed {feed_no}</title><link href="https://example.com/{feed_no}"/>',
+        f'<id>urn:bench:{feed_no}</id><updated>2026-01-01T00:00:00Z</updated>',
+    ]
+    for i in range(entries):
+        ts = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(1767225600 - i * 600))
+        parts.append(
+            f'<entry><title>Entry {feed_no}-{i}</title>'
+            f'<id>urn:bench:{feed_no}:{i}</id>'
+            f'<link href="https://example.com/{feed_no}/{i}"/>'
+            f'<updated>{ts}</updated><published>{ts}</published>'
+            f'<content type="html"><![CDATA[{html}]]></content></entry>'
+        )
+    parts.append('</feed>')
+    return "".join(parts).encode('utf-8')
+
+
+def serve_feeds(feeds: int, entries: int, paragraphs: int) -> ThreadingHTTPServer:
+    documents = {f"/feed/{n}": build_atom_feed(n, entries, paragraphs) for n in range(feeds)}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = documents.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/atom+xml')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_mode(args) -> dict:
+    """在当前进程中运行一种模式（环境变量已由父进程设置）"""
+    sys.path.insert(0, BACKEND_DIR)
+
+    import uuid
+    from fastapi.testclient import TestClient
+    from app.database import init_db, SessionLocal, Feed
+    from app.fetcher import fetch_all_feeds
+    from app.rss_parser import shutdown_parse_pool
+    import app.main as main_module
+
+    init_db()
+    server = serve_feeds(args.feeds, args.entries, args.paragraphs)
+    port = server.server_address[1]
+    db = SessionLocal()
+    for n in range(args.feeds):
+        db.add(Feed(id=str(uuid.uuid4()), title=f"bench {n}", url=f"http://127.0.0.1:{port}/feed/{n}"))
+    db.commit()
+    db.close()
+
+    client = TestClient(main_module.app)
+
+    def sample() -> float:
+        started = time.perf_counter()
+        response = client.get('/api/items', params={'limit': 50})
+        response.raise_for_status()
+        return (time.perf_counter() - started) * 1000
+
+    idle = [sample() for _ in range(20)]
+
+    cycle = threading.Thread(target=fetch_all_feeds)
+    cycle_started = time.perf_counter()
+    cycle.start()
+    busy = []
+    while cycle.is_alive():
+        busy.append(sample())
+        time.sleep(args.interval / 1000)
+    cycle_seconds = time.perf_counter() - cycle_started
+
+    shutdown_parse_pool()
+    server.shutdown()
+    return {
+        'cycle_seconds': cycle_seconds,
+        'idle_p50': statistics.median(idle),
+        'samples': len(busy),
+        'p50': statistics.median(busy) if busy else 0.0,
+        'p95': percentile(busy, 95) if busy else 0.0,
+        'max': max(busy) if busy else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--feeds', type=int, default=20, help='Feed 数量')
+    parser.add_argument('--entries', type=int, default=100, help='每个 Feed 的条目数')
+    parser.add_argument('--paragraphs', type=int, default=30, help='每个条目正文的 HTML 段落数')
+    parser.add_argument('--workers', type=int, default=4, help='开启进程池时的 PARSE_WORKERS')
+    parser.add_argument('--interval', type=float, default=20, help='API 请求间隔（毫秒）')
+    parser.add_argument('--run', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_mode(args)))
+        return
+
+    print(f"{'mode':>16} | {'cycle':>7} | {'idle p50':>9} | {'p50':>8} | {'p95':>8} | {'max':>8} | samples")
+    print('-' * 82)
+    for label, workers in (('in-thread', 0), (f'pool ({args.workers})', args.workers)):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                DATA_DIR=tmp,
+                DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                PARSE_WORKERS=str(workers),
+                HOST_RATE_LIMIT='0',
+                HOST_MAX_CONCURRENCY='64',
+            )
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run',
+                 '--feeds', str(args.feeds), '--entries', str(args.entries),
+                 '--paragraphs', str(args.paragraphs), '--interval', str(args.interval)],
+                env=env, cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+        print(f"{label:>16} | {result['cycle_seconds']:>6.1f}s | {result['idle_p50']:>6.1f} ms | "
+              f"{result['p50']:>5.1f} ms | {result['p95']:>5.1f} ms | {result['max']:>5.1f} ms | {result['samples']}")
+
+
+if __name__ == '__main__':
+    main()
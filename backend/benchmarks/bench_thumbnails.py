@@ -0,0 +1,174 @@
+"""
+缩略图生成基准
+
+对一组图片按不同配置执行 create_thumbnail + save_webp，比较解码 / 缩放 / 编码耗时、
+峰值内存（RSS）和输出大小：
+
+- full decode：THUMBNAIL_REDUCING_GAP=0，完整解码后再缩放（旧行为）
+- draft：JPEG 按 2 的幂缩小解码，再用不同的重采样滤镜缩放
+- WebP method 0 / 4 / 6：编码速度与文件大小的取舍
+
+默认生成一组合成图片（大尺寸 JPEG 扫描图 + 少量带透明通道的 PNG），也可以用 --corpus 指定真实图片目录。
+图片生成和每种配置都在独立的子进程中运行，峰值 RSS 互不影响。
+
+用法（在 backend 目录下）：
+
+    python benchmarks/bench_thumbnails.py
+    python benchmarks/bench_thumbnails.py --corpus /path/to/images --repeat 3
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (名称, reducing_gap, resample, WebP method)
+SETTINGS = [
+    ('full decode, lanczos', 0, 'lanczos', 4),
+    ('draft, lanczos', 2.0, 'lanczos', 4),
+    ('draft x1, lanczos', 1.0, 'lanczos', 4),
+    ('draft, bicubic', 2.0, 'bicubic', 4),
+    ('draft, bilinear', 2.0, 'bilinear', 4),
+    ('draft, lanczos, m0', 2.0, 'lanczos', 0),
+    ('draft, lanczos, m6', 2.0, 'lanczos', 6),
+]
+
+
+def build_corpus(directory: str, jpegs: int, pngs: int):
+    """生成合成图片：渐变 + 噪点的大尺寸 JPEG（模拟扫描图），以及带透明通道的 PNG"""
+    from PIL import Image, ImageDraw, ImageFilter
+
+    rng = random.Random(42)
+    for i in range(jpegs):
+        width, height = rng.choice([(4000, 5600), (3500, 5000), (4960, 7016), (2480, 3508)])
+        img = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+        noise = Image.effect_noise((width, height), 40).convert('RGB')
+        img = Image.blend(img, noise, 0.3)
+        draw = ImageDraw.Draw(img)
+        for _ in range(60):
+            x, y = rng.randrange(width), rng.randrange(height)
+            draw.rectangle((x, y, x + rng.randrange(50, 600), y + rng.randrange(20, 200)),
+                           fill=tuple(rng.randrange(256) for _ in range(3)))
+        img.filter(ImageFilter.SMOOTH).save(os.path.join(directory, f"scan_{i}.jpg"), 'JPEG', quality=90)
+
+    for i in range(pngs):
+        img = Image.new('RGBA', (1600, 1200), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(img)
+        for _ in range(40):
+            x, y = rng.randrange(1600), rng.randrange(1200)
+            draw.ellipse((x, y, x + rng.randrange(50, 400), y + rng.randrange(50, 400)),
+                         fill=tuple(rng.randrange(256) for _ in range(4)))
+        img.save(os.path.join(directory, f"art_{i}.png"), 'PNG')
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位为 KB，macOS 上为字节
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def run_setting(args) -> dict:
+    """在当前进程中运行一种配置"""
+    sys.path.insert(0, BACKEND_DIR)
+
+    from prometheus_client import REGISTRY
+    from app.rss_parser import create_thumbnail, save_webp
+
+    files = sorted(
+        os.path.join(args.corpus, name) for name in os.listdir(args.corpus)
+        if os.path.isfile(os.path.join(args.corpus, name))
+    )
+
+    def stage_seconds(stage: str) -> float:
+        return REGISTRY.get_sample_value('image_process_seconds_sum', {'stage': stage}) or 0.0
+
+    baseline_rss = _peak_rss_mb()
+    output_bytes = 0
+    processed = 0
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as out_dir:
+        for _ in range(args.repeat):
+            for path in files:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                img = create_thumbnail(data, resample=args.resample, reducing_gap=args.gap)
+                out_path = os.path.join(out_dir, os.path.basename(path) + '.webp')
+                save_webp(img, out_path, quality=args.quality, method=args.method)
+                output_bytes += os.path.getsize(out_path)
+                processed += 1
+    total = time.perf_counter() - started
+
+    return {
+        'images': processed,
+        'decode_ms': stage_seconds('decode') / processed * 1000,
+        'resize_ms': stage_seconds('resize') / processed * 1000,
+        'encode_ms': stage_seconds('encode') / processed * 1000,
+        'total_ms': total / processed * 1000,
+        'peak_rss_mb': _peak_rss_mb(),
+        'rss_growth_mb': _peak_rss_mb() - baseline_rss,
+        'output_kb': output_bytes / processed / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='图片目录，不指定时生成合成图片')
+    parser.add_argument('--jpegs', type=int, default=8, help='生成的 JPEG 数量')
+    parser.add_argument('--pngs', type=int, default=2, help='生成的 PNG 数量')
+    parser.add_argument('--repeat', type=int, default=2, help='每种配置重复处理整个目录的次数')
+    parser.add_argument('--quality', type=int, default=80, help='WebP 质量')
+    parser.add_argument('--run', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--generate', help=argparse.SUPPRESS)
+    parser.add_argument('--gap', type=float, help=argparse.SUPPRESS)
+    parser.add_argument('--resample', help=argparse.SUPPRESS)
+    parser.add_argument('--method', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_setting(args)))
+        return
+    if args.generate:
+        build_corpus(args.generate, args.jpegs, args.pngs)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = args.corpus
+        if not corpus:
+            corpus = os.path.join(tmp, 'corpus')
+            os.makedirs(corpus)
+            print(f"Generating {args.jpegs} JPEGs and {args.pngs} PNGs...")
+            # 子进程中生成，父进程的峰值 RSS 会被 fork 出的子进程继承
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--generate', corpus,
+                 '--jpegs', str(args.jpegs), '--pngs', str(args.pngs)],
+                check=True,
+            )
+        corpus_mb = sum(os.path.getsize(os.path.join(corpus, name)) for name in os.listdir(corpus)) / 1024 / 1024
+        print(f"Corpus: {len(os.listdir(corpus))} files, {corpus_mb:.1f} MB\n")
+
+        print(f"{'setting':>22} | {'decode':>8} | {'resize':>8} | {'encode':>8} | {'total':>8} | "
+              f"{'peak RSS':>9} | {'growth':>8} | output")
+        print('-' * 104)
+        for label, gap, resample, method in SETTINGS:
+            env = dict(os.environ, DATA_DIR=tmp, IMAGE_MAX_PIXELS='0')
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run', '--corpus', corpus,
+                 '--repeat', str(args.repeat), '--quality', str(args.quality),
+                 '--gap', str(gap), '--resample', resample, '--method', str(method)],
+                env=env, cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{label:>22} | {result['decode_ms']:>5.1f} ms | {result['resize_ms']:>5.1f} ms | "
+                  f"{result['encode_ms']:>5.1f} ms | {result['total_ms']:>5.1f} ms | "
+                  f"{result['peak_rss_mb']:>6.1f} MB | {result['rss_growth_mb']:>5.1f} MB | "
+                  f"{result['output_kb']:.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# app.database 在导入时读取 DATABASE_URL / DATA_DIR，必须在导入 app 之前设置
+_data_dir = tempfile.mkdtemp(prefix="rss-wall-test-")
+os.environ["DATA_DIR"] = _data_dir
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_data_dir, 'test.db')}"
+os.environ["HOST_RATE_LIMIT"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,85 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import prepare_database, SessionLocal, Feed, FeedItem
+from app.fetcher import fetch_single_feed
+from app.main import app
+
+
+def _rss(name: str, count: int) -> bytes:
+    items = "".join(
+        f"<item><title>{name} {i}</title><link>http://example.com/{name}/{i}</link>"
+        f"<guid>{name}-{i}</guid><pubDate>Mon, 0{i + 1} Jan 2024 00:00:00 GMT</pubDate></item>"
+        for i in range(count)
+    )
+    return (
+        f'<?xml version="1.0"?><rss version="2.0"><channel><title>{name}</title>'
+        f"<description>{name}</description>{items}</channel></rss>"
+    ).encode()
+
+
+class _FeedHandler(BaseHTTPRequestHandler):
+    """/old 和 /new 两个 Feed，支持 ETag 条件请求"""
+    requests: list[tuple[str, int]] = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        name = self.path.strip("/")
+        if name not in ("old", "new"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        etag = f'"{name}-v1"'
+        if self.headers.get("If-None-Match") == etag:
+            self.requests.append((name, 304))
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.requests.append((name, 200))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(_rss(name, 3))
+
+
+@pytest.fixture(scope="module")
+def feed_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture(scope="module")
+def client():
+    prepare_database()
+    # 不执行 startup：不启动调度器和缩略图队列
+    return TestClient(app)
+
+
+def test_changing_url_ingests_items_of_new_feed(client, feed_server):
+    db = SessionLocal()
+    db.add(Feed(id="f-update", title="old", url=f"{feed_server}/old"))
+    db.commit()
+    fetch_single_feed("f-update")
+
+    response = client.put("/api/feeds/f-update", json={"url": f"{feed_server}/new"})
+    assert response.status_code == 200
+
+    # 保存了新地址的 ETag，下次抓取是条件请求并返回 304
+    _FeedHandler.requests.clear()
+    stats = fetch_single_feed("f-update")
+    assert stats["not_modified"]
+    assert _FeedHandler.requests == [("new", 304)]
+
+    # 切换地址时新 Feed 的当前条目已经入库
+    db.expire_all()
+    titles = {title for (title,) in db.query(FeedItem.title).filter(FeedItem.feed_id == "f-update")}
+    assert {"new 0", "new 1", "new 2"} <= titles
+    db.close()
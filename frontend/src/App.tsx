@@ -800,15 +800,23 @@ function App() {
       setPage(1);
       triggerRefresh();
 
-      // 如果有警告信息，显示给用户
-      if (result.warning) {
-        alert(result.warning);
+      // 首次抓取、favicon 和缩略图在后台执行，每个阶段完成后刷新列表
+      if (result.jobId) {
+        let lastStage: string | undefined;
+        api.waitForJob(result.jobId, (job) => {
+          if (job.stage !== lastStage && lastStage !== undefined) {
+            loadFeeds();
+            triggerRefresh();
+          }
+          lastStage = job.stage;
+        }).then((job) => {
+          loadFeeds();
+          triggerRefresh();
+          if (job.status === 'failed') {
+            alert(`订阅已添加，但获取内容时出现问题: ${job.error}。系统将在后续自动重试获取内容。`);
+          }
+        }).catch((error) => console.error('Failed to track feed creation:', error));
       }
-
-      // Refresh items after 3 seconds to get processed images
-      setTimeout(() => {
-        triggerRefresh();
-      }, 3000);
     } catch (error) {
       console.error('Failed to add feed:', error);
       // 提取并显示后端返回的具体错误信息
@@ -100,8 +100,15 @@ interface ImageWallProps {
   refreshIntegrationsTrigger?: number; // 用于触发刷新集成列表
 }
 
+// 根据 /uploads/{hash}.webp 和可用宽度生成 /thumb 的 srcset
+function buildSrcSet(thumbnailImage: string | undefined, widths: number[] | null | undefined): string | undefined {
+  const match = thumbnailImage?.match(/^\/uploads\/([0-9a-f]+)\.webp$/);
+  if (!match || !widths || widths.length === 0) return undefined;
+  return widths.map(w => `/thumb/${match[1]}?w=${w} ${w}w`).join(', ');
+}
+
 // 单个图片卡片组件，处理加载失败和重试逻辑
-function ImageCard({ item, onRetry }: { item: FeedItem; onRetry: (itemId: string) => Promise<string | null> }) {
+function ImageCard({ item, onRetry, sizes }: { item: FeedItem; onRetry: (itemId: string) => Promise<string | null>; sizes?: string }) {
   const [imageState, setImageState] = useState<'loading' | 'loaded' | 'error' | 'retrying'>('loading');
   const [currentSrc, setCurrentSrc] = useState(item.thumbnailImage || item.coverImage);
   const [retryCount, setRetryCount] = useState(0);
@@ -184,10 +191,13 @@ function ImageCard({ item, onRetry }: { item: FeedItem; onRetry: (itemId: string
     );
   }
 
-  // 正常显示图片
+  // 正常显示图片（显示的是服务端缩略图时按列宽选择合适的尺寸）
+  const srcSet = currentSrc === item.thumbnailImage ? buildSrcSet(item.thumbnailImage, item.thumbnailWidths) : undefined;
   return (
     <img
       src={currentSrc}
+      srcSet={srcSet}
+      sizes={srcSet ? sizes : undefined}
       alt={item.title}
       className="w-full h-auto max-h-[200%] object-contain group-hover:scale-105 transition-transform duration-300"
       loading="lazy"
@@ -757,7 +767,7 @@ export default function ImageWall({ items, onItemClick, cardSizeTier = 3, onItem
           >
             {/* Image */}
             <div className="relative bg-gray-200 dark:bg-neutral-700 overflow-hidden">
-              <ImageCard item={item} onRetry={handleImageRetry} />
+              <ImageCard item={item} onRetry={handleImageRetry} sizes={`${Math.ceil(100 / dynamicColumns)}vw`} />
 
               {/* Komga 收录标记 */}
               {item.komgaStatus === 1 && (
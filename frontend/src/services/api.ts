@@ -1,4 +1,4 @@
-import type { Feed, FeedItem, ItemsResponse, CustomIntegration, PresetIntegration } from '../types';
+import type { Feed, FeedItem, ItemsResponse, CustomIntegration, PresetIntegration, Job } from '../types';
 
 const API_BASE = '/api';
 
@@ -123,11 +123,51 @@ export const api = {
     return handleResponse<Feed>(response);
   },
 
-  async fetchFeed(id: string): Promise<{ success: boolean; newItems: number }> {
+  /** 创建刷新任务，立即返回任务，进度通过 getJob 查询 */
+  async fetchFeed(id: string): Promise<Job> {
     const response = await apiFetch(`${API_BASE}/feeds/${id}/fetch`, {
       method: 'POST',
     });
-    return handleResponse<{ success: boolean; newItems: number }>(response);
+    return handleResponse<Job>(response);
+  },
+
+  /** 导入 OPML，首次抓取在后台执行，每个 Feed 的结果见任务的 results */
+  async importOpml(file: File): Promise<{ success: boolean; imported: number; skipped: string[]; jobId: string }> {
+    const formData = new FormData();
+    formData.append('file', file);
+    const response = await apiFetch(`${API_BASE}/opml/import`, {
+      method: 'POST',
+      body: formData,
+    });
+    return handleResponse<{ success: boolean; imported: number; skipped: string[]; jobId: string }>(response);
+  },
+
+  /** OPML 导出地址（浏览器直接下载） */
+  getOpmlExportUrl(): string {
+    return `${API_BASE}/opml/export`;
+  },
+
+  /** 刷新所有启用的 Feed */
+  async fetchAllFeeds(): Promise<Job> {
+    const response = await apiFetch(`${API_BASE}/feeds/fetch-all`, {
+      method: 'POST',
+    });
+    return handleResponse<Job>(response);
+  },
+
+  async getJob(jobId: string): Promise<Job> {
+    const response = await apiFetch(`${API_BASE}/jobs/${jobId}`);
+    return handleResponse<Job>(response);
+  },
+
+  /** 轮询任务直到结束，onProgress 在每次查询后调用 */
+  async waitForJob(jobId: string, onProgress?: (job: Job) => void, intervalMs = 1000): Promise<Job> {
+    for (;;) {
+      const job = await api.getJob(jobId);
+      onProgress?.(job);
+      if (job.status !== 'running') return job;
+      await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
   },
 
   async markFeedAsRead(id: string, latestItemTime?: string): Promise<{ success: boolean; lastViewedAt: string }> {
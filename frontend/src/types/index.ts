@@ -9,12 +9,14 @@ export interface Feed {
   updateInterval: number;
   lastFetchedAt?: string;
   lastFetchError?: string;  // 上次抓取失败的错误信息
+  websubStatus?: 'pending' | 'subscribed' | 'failed' | 'denied';  // WebSub 推送订阅状态
   isActive: boolean;
   enabledIntegrations?: string[] | null;  // 启用的集成 ID 列表，null 表示全部启用
   clickAction?: ClickAction;  // 卡片点击行为
   createdAt: string;
   updatedAt: string;
   itemsCount?: number;
+  jobId?: string;  // 新建 Feed 时的后台任务
   unreadCount?: number;
   warning?: string;  // 订阅存在问题时的警告信息
 }
@@ -31,6 +33,8 @@ export interface FeedItem {
   content?: string;
   coverImage?: string;
   thumbnailImage?: string;
+  thumbnailStatus?: 'pending' | 'done' | 'failed' | null;
+  thumbnailWidths?: number[] | null; // GET /thumb/{hash}?w= 可用的宽度
   author?: string;
   categories?: string;
   publishedAt: string;
@@ -127,3 +131,31 @@ export interface IntegrationSettings {
   presets: PresetIntegration[];
   custom: CustomIntegration[];
 }
+
+// 后台任务（手动刷新）
+export interface Job {
+  id: string;
+  type: 'feed_refresh' | 'refresh_all' | 'feed_create' | 'opml_import';
+  feedId?: string;
+  status: 'running' | 'succeeded' | 'failed';
+  stage?: 'fetch' | 'favicon' | 'thumbnails' | 'done';  // feed_create 的当前阶段
+  total: number;
+  completed: number;
+  failed: number;
+  newItems: number;
+  notModified: number;
+  imagesProcessed?: number;
+  error?: string;
+  results?: JobFeedResult[];  // opml_import 中每个 Feed 的结果
+  createdAt: string;
+  finishedAt?: string;
+}
+
+export interface JobFeedResult {
+  feedId: string;
+  url: string;
+  title: string;
+  success: boolean;
+  newItems: number;
+  error?: string;
+}
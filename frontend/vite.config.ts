@@ -89,7 +89,8 @@ export default defineConfig({
     host: true, // 监听所有网络接口，允许远程访问
     proxy: {
       '/api': 'http://localhost:3001',
-      '/uploads': 'http://localhost:3001'
+      '/uploads': 'http://localhost:3001',
+      '/thumb': 'http://localhost:3001'
     }
   }
 })